@@ -0,0 +1,13 @@
+"""acceso cacheado a ContentFilterConfig para el camino caliente del chat"""
+from .versioning import VersionedLocalCache
+
+VERSION_CACHE_KEY = 'chat:filtro_config:version'
+
+
+def _load_config():
+    from .models import ContentFilterConfig
+    return ContentFilterConfig.get_config()
+
+
+#copia por proceso; manage_filter_config (post_save) incrementa la version compartida
+filter_config_cache = VersionedLocalCache(VERSION_CACHE_KEY, _load_config)
@@ -1,17 +1,56 @@
+import asyncio
+import functools
 import json
 import logging
-from channels.generic.websocket import AsyncWebsocketConsumer
+from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
+from channels.consumer import get_handler_name
+from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from .models import ChatMessage
+from .persistence import get_message_buffer
+from .moderation import get_moderation_stage
+from .presence import get_presence_registry, get_presence_ticker
+from .history import get_room_history
+from .frames import (
+    SUBPROTOCOL_MSGPACK, chat_message_event, decode_compact, encode, encode_compact, event_frame, msgpack_available
+)
+from .outbound import OutboundQueue, get_outbound_registry
+from .metrics import get_chat_metrics
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+
+def _cursor(value):
+    """cursor entero enviado por el cliente (none si falta o no es valido)"""
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
 class ChatConsumer(AsyncWebsocketConsumer):
-    #presencia simple en memoria: conexiones por sala (no distribuido)
-    room_connections = {}
-    
+    heartbeat_task = None
+    outbound = None
+    #true si el cliente negocio el subprotocolo msgpack
+    binary = False
+
+    #cierre por cliente demasiado lento (supero el umbral de frames descartados)
+    SLOW_CLIENT_CLOSE_CODE = 4008
+
+    #eventos de difusion que no tocan la base de datos
+    DB_FREE_HANDLERS = frozenset({'chat_message', 'chat_cleared', 'presence'})
+
+    async def dispatch(self, message):
+        #channels llama aclose_old_connections (un salto al hilo sync) antes de cada handler;
+        #con miles de oyentes ese salto por evento y por conexion domina el costo del fan-out
+        if message['type'] in self.DB_FREE_HANDLERS:
+            await getattr(self, get_handler_name(message))(message)
+            return
+        await super().dispatch(message)
+
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = f'chat_{self.room_name}'
@@ -24,25 +63,48 @@ class ChatConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-        await self.accept()
+        #json por defecto; msgpack compacto si el cliente lo pide en Sec-WebSocket-Protocol
+        if SUBPROTOCOL_MSGPACK in self.scope.get('subprotocols', []) and msgpack_available():
+            self.binary = True
+            await self.accept(subprotocol=SUBPROTOCOL_MSGPACK)
+        else:
+            await self.accept()
+
+        #los eventos de la sala pasan por una cola acotada; una conexion lenta no frena ni infla al resto
+        self.metrics = get_chat_metrics()
+        self.outbound = OutboundQueue(
+            self.send,
+            name=self.channel_name,
+            close=self.close,
+            on_sent=functools.partial(self.metrics.outbound, self.room_name)
+        )
+        self.outbound.start()
+        self.metrics.connected(self.room_name)
+
+        #track presence (registro compartido entre procesos)
+        self.presence_registry = get_presence_registry()
+        users_count = await self.presence_registry.join(self.room_group_name, self.channel_name)
+        self.heartbeat_task = asyncio.ensure_future(self.presence_heartbeat())
 
-        #track presence
-        room_set = self.room_connections.setdefault(self.room_group_name, set())
-        room_set.add(self.channel_name)
-        
-        users_count = len(room_set)
         logger.info(f"User connected to {self.room_name}. Total connections: {users_count}")
 
-        #broadcast updated users_online
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'presence',
-                'users_online': users_count
-            }
+        #el cliente nuevo recibe el conteo de inmediato; la sala recibe el update agrupado del ticker
+        await self.presence({'users_online': users_count})
+        get_presence_ticker().mark_dirty(self.room_group_name)
+
+        #backlog de la sala desde memoria; en reconexiones ?since_seq=<seq> (o since_id / since) envia solo lo nuevo
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        await self.send_history(
+            since_seq=query.get('since_seq', [None])[0],
+            since_id=query.get('since_id', [None])[0],
+            since=query.get('since', [None])[0]
         )
 
     async def disconnect(self, close_code):
+        if self.outbound is not None:
+            self.outbound.stop()
+            self.metrics.disconnected(self.room_name)
+
         #leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -50,62 +112,146 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         #update presence
-        room_set = self.room_connections.get(self.room_group_name)
-        if room_set and self.channel_name in room_set:
-            room_set.discard(self.channel_name)
-            users_count = len(room_set)
-            logger.info(f"User disconnected from {self.room_name}. Remaining connections: {users_count}")
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'presence',
-                    'users_online': users_count
-                }
+        if self.heartbeat_task is None:
+            return
+        self.heartbeat_task.cancel()
+        self.heartbeat_task = None
+
+        users_count = await self.presence_registry.leave(self.room_group_name, self.channel_name)
+        logger.info(f"User disconnected from {self.room_name}. Remaining connections: {users_count}")
+        get_presence_ticker().mark_dirty(self.room_group_name)
+
+    async def presence_heartbeat(self):
+        """renovar periodicamente el ttl de esta conexion en el registro de presencia"""
+        while True:
+            await asyncio.sleep(self.presence_registry.heartbeat_interval)
+            try:
+                await self.presence_registry.heartbeat(self.room_group_name, self.channel_name)
+            except Exception as e:
+                logger.warning(f"Presence heartbeat failed for {self.channel_name}: {e}")
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            if not self.binary:
+                return
+            text_data_json = decode_compact(bytes_data)
+        else:
+            text_data_json = json.loads(text_data)
+
+        #ping del cliente: solo renueva presencia
+        if text_data_json.get('type') == 'ping':
+            await self.presence_registry.heartbeat(self.room_group_name, self.channel_name)
+            return
+
+        #replay pedido por el cliente sin reconectar
+        if text_data_json.get('type') == 'history':
+            await self.send_history(
+                text_data_json.get('since_seq'), text_data_json.get('since_id'), text_data_json.get('since')
             )
+            return
 
-    async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
         message = text_data_json['message']
         user = self.scope['user']
+        self.metrics.inbound(self.room_name)
 
         if user.is_authenticated:
-            #save message to database
-            chat_message = await self.save_message(user, message)
-            
-            #send message to room group
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'chat_message',
-                    'message': message,
-                    'user_name': user.username,
-                    'username': user.username,
-                    'timestamp': chat_message.fecha_envio.isoformat()
-                }
+            if user.chat_bloqueado:
+                await self.send_error('Has sido bloqueado del chat. Contacta con un administrador.')
+                return
+
+            #moderar en el executor acotado sin bloquear el event loop
+            with self.metrics.timer(self.metrics.moderation):
+                analysis = await get_moderation_stage().moderate(message, user.id, user.username)
+            if not analysis['allowed']:
+                if analysis.get('auto_blocked'):
+                    user.chat_bloqueado = True
+                await self.send_error(analysis['reason'], analysis.get('infraction_type'))
+                return
+
+            chat_message = ChatMessage(
+                usuario=user,
+                usuario_nombre=user.username,
+                contenido=message,
+                sala=self.room_name,
+                tipo='user',
+                fecha_envio=timezone.now(),
+                #el id llega recien con el insert en lote: la secuencia es el cursor de replay del cliente
+                secuencia=await database_sync_to_async(get_room_history().next_sequence)(self.room_name)
             )
 
+            #send message to room group (sin esperar a la base de datos). se serializa una vez para toda la sala
+            with self.metrics.timer(self.metrics.group_send):
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    chat_message_event({
+                        'seq': chat_message.secuencia,
+                        'message': message,
+                        'user_name': user.username,
+                        'username': user.username,
+                        'timestamp': chat_message.fecha_envio.isoformat()
+                    })
+                )
+
+            #save message to database (write-behind en lotes)
+            await self.save_message(chat_message)
+
+            #advertencia solo para el emisor (modo advertir)
+            if analysis.get('warning'):
+                await self.send_payload({
+                    'type': 'warning',
+                    'message': analysis['warning']
+                })
+
+    def encode_payload(self, payload):
+        return encode_compact(payload) if self.binary else encode(payload)
+
+    async def send_payload(self, payload):
+        #respuesta directa solo para esta conexion, en el formato negociado
+        if self.binary:
+            await self.send(bytes_data=encode_compact(payload))
+        else:
+            await self.send(text_data=encode(payload))
+
+    async def send_history(self, since_seq=None, since_id=None, since=None):
+        messages, truncated = await database_sync_to_async(get_room_history().backlog)(
+            self.room_name, since_seq=_cursor(since_seq), since_id=_cursor(since_id), since=since or None
+        )
+        await self.send_payload({
+            'type': 'history',
+            'messages': messages,
+            'truncated': truncated
+        })
+
+    async def send_error(self, reason, infraction_type=None):
+        #rechazo de moderacion solo para el emisor
+        await self.send_payload({
+            'type': 'error',
+            'message': reason,
+            'infraction_type': infraction_type
+        })
+
     async def chat_message(self, event):
-        #send message to websocket
-        await self.send(text_data=json.dumps({
-            'message': event['message'],
-            'user_name': event['user_name'],
-            'username': event['username'],
-            'timestamp': event['timestamp']
-        }))
+        #encolar el frame ya codificado por el emisor (se cuenta como entregado al enviarse)
+        if not self.outbound.push(event_frame(event, self.binary)):
+            logger.warning(f"Closing slow chat client {self.channel_name} ({self.outbound.dropped} frames dropped)")
+            get_outbound_registry().disconnected += 1
+            await self.close(code=self.SLOW_CLIENT_CLOSE_CODE)
+
+    async def chat_cleared(self, event):
+        #la sala fue limpiada desde el dashboard: mismo camino que un mensaje
+        await self.chat_message(event)
 
     async def presence(self, event):
-        #send presence updates
-        await self.send(text_data=json.dumps({
-            'type': 'presence',
-            'users_online': event.get('users_online', 0)
-        }))
-
-    @database_sync_to_async
-    def save_message(self, user, message):
-        return ChatMessage.objects.create(
-            usuario=user,
-            usuario_nombre=user.username,
-            contenido=message,
-            sala=self.room_name,
-            tipo='user'
-        )
+        #send presence updates (coalescido: solo viaja el conteo mas reciente)
+        if 'text' in event:
+            frame = event_frame(event, self.binary)
+        else:
+            frame = self.encode_payload({
+                'type': 'presence',
+                'users_online': event.get('users_online', 0)
+            })
+        self.outbound.set_presence(frame)
+
+    async def save_message(self, chat_message):
+        if not await get_message_buffer().put(chat_message):
+            logger.warning(f"Chat write buffer full, message from {chat_message.usuario_nombre} not persisted")
@@ -0,0 +1,107 @@
+"""frames del chat serializados una sola vez por difusion (no una vez por cada consumer destinatario).
+json es el formato por defecto; los clientes que negocian SUBPROTOCOL_MSGPACK reciben msgpack con claves cortas"""
+import json
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+#valor de Sec-WebSocket-Protocol para el formato compacto
+SUBPROTOCOL_MSGPACK = 'radiooriente.msgpack.v1'
+
+
+def msgpack_available():
+    return msgpack is not None
+
+
+def encode(payload):
+    return json.dumps(payload)
+
+
+def to_epoch_ms(timestamp):
+    return int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+
+
+def _compact_message(payload):
+    #user_name y username son el mismo valor en todos los emisores: viaja una sola vez
+    compact = {
+        'm': payload['message'],
+        'u': payload['username'],
+        's': to_epoch_ms(payload['timestamp']),
+    }
+    if payload.get('id') is not None:
+        compact['i'] = payload['id']
+    if payload.get('seq') is not None:
+        compact['q'] = payload['seq']
+    return compact
+
+
+def _compact(payload):
+    kind = payload.get('type')
+    if kind is None:
+        return {'t': 'm', **_compact_message(payload)}
+    if kind == 'presence':
+        return {'t': 'p', 'n': payload['users_online']}
+    if kind == 'history':
+        return {
+            't': 'h',
+            'l': [_compact_message(m) for m in payload['messages']],
+            'x': payload['truncated'],
+        }
+    if kind == 'error':
+        return {'t': 'e', 'm': payload['message'], 'k': payload.get('infraction_type')}
+    if kind == 'warning':
+        return {'t': 'w', 'm': payload['message']}
+    if kind == 'cleared':
+        return {'t': 'c', 'r': payload['sala']}
+    return payload
+
+
+def encode_compact(payload):
+    """version msgpack de un frame json: claves cortas y timestamps en epoch ms"""
+    return msgpack.packb(_compact(payload))
+
+
+def decode_compact(data):
+    """frame binario del cliente. usa las mismas claves que los frames json (type, message, since_seq)"""
+    frame = msgpack.unpackb(data)
+    if not isinstance(frame, dict):
+        raise ValueError('Frame msgpack invalido')
+    return frame
+
+
+def _event(kind, payload):
+    event = {'type': kind, 'text': encode(payload)}
+    if msgpack is not None:
+        event['bytes'] = encode_compact(payload)
+    return event
+
+
+def chat_message_event(payload):
+    """evento group_send con el frame ya codificado; cada consumer solo reenvia el texto o los bytes"""
+    event = _event('chat_message', payload)
+    if payload.get('seq') is not None:
+        #secuencia como id del feed sse (Last-Event-ID): existe tambien antes del insert write-behind
+        event['id'] = payload['seq']
+    return event
+
+
+def presence_event(users_online):
+    return _event('presence', {'type': 'presence', 'users_online': users_online})
+
+
+def cleared_event(room):
+    """aviso de limpieza de la sala: los clientes vacian los mensajes mostrados"""
+    return _event('chat_cleared', {'type': 'cleared', 'sala': room})
+
+
+def event_frame(event, binary):
+    """frame listo para enviar segun el formato negociado por la conexion"""
+    if not binary:
+        return event['text']
+    if 'bytes' in event:
+        return event['bytes']
+    #emitido por un proceso sin msgpack
+    return encode_compact(json.loads(event['text']))
@@ -0,0 +1,230 @@
+"""historial reciente por sala en memoria (ring buffer) para enviar el backlog al conectar por websocket"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage
+
+
+def message_payload(message):
+    """mismo formato que los frames chat_message del consumer, mas el id"""
+    return {
+        'id': message.id,
+        'seq': message.secuencia,
+        'message': message.contenido,
+        'user_name': message.usuario_nombre,
+        'username': message.usuario_nombre,
+        'timestamp': message.fecha_envio.isoformat(),
+    }
+
+
+def parse_since(value):
+    """timestamp iso del cliente como datetime aware (none si no es valido).
+    parse_qs convierte el '+' del offset en espacio: se restaura antes de parsear"""
+    if not value:
+        return None
+    value = re.sub(r' (\d{2}:?\d{2})$', r'+\1', str(value).strip())
+    parsed = parse_datetime(value)
+    if parsed is None:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _entry_time(entry):
+    return datetime.fromisoformat(entry['timestamp'])
+
+
+def _entry_seq(entry):
+    #mensajes anteriores a la secuencia no tienen cursor
+    return entry.get('seq') or 0
+
+
+class _Ring:
+    __slots__ = ('entries', 'version', 'checked_at')
+
+    def __init__(self, entries, version, checked_at):
+        self.entries = entries
+        self.version = version
+        self.checked_at = checked_at
+
+
+class RoomHistory:
+    """ultimos n mensajes por sala. se carga de ChatMessage en el primer uso y se alimenta en cada guardado.
+    otros procesos se enteran por un contador de version en la cache compartida (como VersionedLocalCache)"""
+
+    #cada cuanto revisar la version compartida de una sala (segundos)
+    version_check_interval = 1.0
+
+    def __init__(self, capacity=None, clock=time.monotonic, max_rooms=None):
+        self.capacity = capacity or getattr(settings, 'CHAT_HISTORY_SIZE', 200)
+        self.max_rooms = max_rooms or getattr(settings, 'CHAT_HISTORY_MAX_ROOMS', 50)
+        self.clock = clock
+        #lru: el nombre de la sala lo elige el cliente, asi que el numero de rings debe estar acotado
+        self._rooms = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def version_key(room):
+        return f'chat:historial:{room}:version'
+
+    @staticmethod
+    def sequence_key(room):
+        return f'chat:historial:{room}:secuencia'
+
+    def next_sequence(self, room):
+        """siguiente numero de secuencia de la sala, compartido entre procesos. si la cache lo perdio
+        se retoma desde el maximo guardado (lo pendiente en el write-behind de un proceso caido se pierde igual)"""
+        key = self.sequence_key(room)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            last = ChatMessage.objects.filter(sala=room).aggregate(last=Max('secuencia'))['last'] or 0
+            cache.add(key, last, None)
+            return cache.incr(key)
+
+    @staticmethod
+    def floor_key(room):
+        return f'chat:historial:{room}:corte'
+
+    def floor(self, room):
+        """id maximo ya limpiado de la sala (0 si nunca se limpio)"""
+        return cache.get(self.floor_key(room), 0)
+
+    def set_floor(self, room, last_id):
+        """ocultar desde ya los mensajes hasta last_id mientras la limpieza los borra en segundo plano"""
+        cache.set(self.floor_key(room), last_id, None)
+        self.invalidate(room)
+
+    def _bump(self, room):
+        key = self.version_key(room)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+            return 1
+
+    def _load(self, room):
+        rows = ChatMessage.objects.filter(sala=room, id__gt=self.floor(room)).order_by('-id')[:self.capacity]
+        entries = deque((message_payload(m) for m in reversed(rows)), maxlen=self.capacity)
+        self.loads += 1
+        return entries
+
+    def _ring(self, room):
+        """ring vigente de la sala, recargando si otro proceso cambio la version"""
+        now = self.clock()
+        with self._lock:
+            ring = self._rooms.get(room)
+            if ring is not None:
+                self._rooms.move_to_end(room)
+        if ring is not None and now - ring.checked_at < self.version_check_interval:
+            self.hits += 1
+            return ring
+
+        version = cache.get(self.version_key(room), 0)
+        if ring is not None and ring.version == version:
+            ring.checked_at = now
+            self.hits += 1
+            return ring
+
+        entries = self._load(room)
+        with self._lock:
+            ring = _Ring(entries, version, now)
+            self._rooms[room] = ring
+            self._rooms.move_to_end(room)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+                self.evictions += 1
+        return ring
+
+    def backlog(self, room, since_seq=None, since_id=None, since=None):
+        """mensajes de la sala en orden cronologico. para reconexiones: since_seq (campo seq de los frames en vivo),
+        since_id o since (timestamp iso, se compara como fecha). devuelve (mensajes, truncado): truncado si el
+        cliente pidio algo mas antiguo que el ring"""
+        ring = self._ring(room)
+        with self._lock:
+            entries = list(ring.entries)
+        full = len(entries) == self.capacity and bool(entries)
+
+        if since_seq is not None:
+            messages = [e for e in entries if _entry_seq(e) > since_seq]
+            truncated = full and _entry_seq(entries[0]) > since_seq + 1
+        elif since_id is not None:
+            messages = [e for e in entries if e['id'] > since_id]
+            truncated = full and entries[0]['id'] > since_id + 1
+        elif since is not None:
+            since = since if isinstance(since, datetime) else parse_since(since)
+            if since is None:
+                return entries, False
+            messages = [e for e in entries if _entry_time(e) > since]
+            truncated = full and _entry_time(entries[0]) > since
+        else:
+            messages, truncated = entries, False
+        return messages, truncated
+
+    def append(self, messages):
+        """registrar mensajes recien guardados (con id). llamar despues del insert"""
+        by_room = {}
+        for message in messages:
+            by_room.setdefault(message.sala, []).append(message)
+
+        for room, room_messages in by_room.items():
+            if any(m.id is None for m in room_messages):
+                #la base de datos no devolvio ids: forzar recarga
+                self.invalidate(room)
+                continue
+
+            version = self._bump(room)
+            with self._lock:
+                ring = self._rooms.get(room)
+                if ring is None:
+                    #aun no cargada: se cargara completa en el primer uso
+                    continue
+                if version != ring.version + 1:
+                    #otro proceso escribio entre medio: recargar en el proximo uso
+                    del self._rooms[room]
+                    continue
+                known = {e['id'] for e in ring.entries}
+                payloads = [message_payload(m) for m in room_messages if m.id not in known]
+                merged = sorted([*ring.entries, *payloads], key=lambda e: e['id'])
+                ring.entries = deque(merged, maxlen=self.capacity)
+                ring.version = version
+
+    def invalidate(self, room):
+        """descartar el historial de la sala en todos los procesos (mensajes eliminados)"""
+        self._bump(room)
+        with self._lock:
+            self._rooms.pop(room, None)
+
+    def stats(self):
+        return {
+            'rooms': len(self._rooms),
+            'max_rooms': self.max_rooms,
+            'evictions': self.evictions,
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'loads': self.loads,
+        }
+
+
+_history = None
+
+
+def get_room_history():
+    """obtener historial de salas unico del proceso"""
+    global _history
+    if _history is None:
+        _history = RoomHistory()
+    return _history
@@ -0,0 +1,158 @@
+"""servicio local de inferencia de toxicidad: un solo modelo por maquina, micro-batching sobre unix socket.
+protocolo: una linea json por mensaje. peticion {"id": n, "text": "..."}, respuesta {"id": n, "scores": {...}} o {"id": n, "error": "..."}.
+{"id": n, "ping": true} responde {"id": n, "pong": true} sin pasar por el modelo (chequeo de salud)"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceServer:
+    """agrupa peticiones concurrentes y llama model.predict(lista) una vez por lote"""
+
+    def __init__(self, model, socket_path, max_batch=32, max_wait_ms=10):
+        #model: cualquier objeto con predict(list[str]) -> {categoria: [score, ...]} (detoxify o un modelo de prueba)
+        self.model = model
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.requests = 0
+        self.batches = 0
+
+    async def serve(self):
+        self.queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        batcher = asyncio.ensure_future(self._batch_loop())
+        logger.info(f"Toxicity inference worker listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                asyncio.ensure_future(self._answer(line, writer, write_lock))
+        except (asyncio.CancelledError, ConnectionResetError):
+            #apagado del worker o cliente caido con la conexion abierta
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer, write_lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            if request.get('ping'):
+                response = {'id': request_id, 'pong': True}
+            else:
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((request['text'], future))
+                response = {'id': request_id, 'scores': await future}
+        except Exception as e:
+            response = {'id': request_id, 'error': str(e)}
+        async with write_lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            #esperar la primera peticion y juntar mas hasta max_batch o max_wait
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                #el modelo corre fuera del loop para seguir aceptando peticiones
+                results = await loop.run_in_executor(None, self.model.predict, texts)
+                for index, (_, future) in enumerate(batch):
+                    if not future.done():
+                        future.set_result({
+                            category: float(scores[index]) for category, scores in results.items()
+                        })
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.requests += len(batch)
+            self.batches += 1
+
+
+class InferenceClient:
+    """cliente sincrono del worker. misma interfaz que Detoxify.predict(texto) para ContentAnalyzer"""
+
+    def __init__(self, socket_path, timeout_ms=2000):
+        self.socket_path = socket_path
+        self.timeout = timeout_ms / 1000
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self):
+        #una conexion persistente por hilo: los hilos de moderacion piden en paralelo y el worker los agrupa
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def _request(self, payload):
+        request_id = next(self._ids)
+        try:
+            sock, reader = self._connection()
+            sock.sendall((json.dumps({'id': request_id, **payload}) + '\n').encode())
+            response = json.loads(reader.readline())
+        except (OSError, ValueError):
+            #conexion rota o timeout: descartarla para que el siguiente mensaje reconecte
+            self._reset()
+            raise
+        if response.get('id') != request_id:
+            self._reset()
+            raise RuntimeError('Respuesta desfasada del worker de inferencia')
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def predict(self, text):
+        return self._request({'text': text})['scores']
+
+    def ping(self):
+        """true si el worker responde"""
+        try:
+            return bool(self._request({'ping': True}).get('pong'))
+        except (OSError, ValueError, RuntimeError):
+            return False
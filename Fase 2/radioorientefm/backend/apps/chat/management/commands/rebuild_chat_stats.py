@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del chat por día, sala y usuario a partir de mensajes e infracciones'
+
+    def handle(self, *args, **options):
+        days, users = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Estadísticas del chat recalculadas: {days} filas diarias, {users} usuarios'
+        ))
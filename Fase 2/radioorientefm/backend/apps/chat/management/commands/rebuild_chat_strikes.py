@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from apps.chat.models import ContentFilterConfig
+from apps.chat.strikes import rebuild_strikes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el contador de strikes por usuario a partir de InfraccionUsuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            dest='usuarios',
+            help='Recalcular solo este usuario (se puede repetir).',
+        )
+        parser.add_argument(
+            '--vida-media-horas',
+            type=int,
+            default=None,
+            help='Horas tras las que se olvida un strike (por defecto las de la configuración del filtro).',
+        )
+
+    def handle(self, *args, **options):
+        period = options['vida_media_horas']
+        if period is None:
+            period = ContentFilterConfig.get_config().vida_media_strikes_horas
+
+        total = rebuild_strikes(period, usuario_ids=options['usuarios'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Strikes recalculados para {total} usuarios '
+            f'({f"un strike menos cada {period} h" if period else "los strikes no se olvidan"})'
+        ))
@@ -0,0 +1,52 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chat.inference import InferenceServer
+
+
+class Command(BaseCommand):
+    help = 'Inicia el worker local de inferencia de toxicidad (un modelo Detoxify compartido por todos los procesos web)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=settings.CHAT_INFERENCE_SOCKET or '/tmp/radiooriente-toxicity.sock',
+            help='Ruta del unix socket donde escuchar.',
+        )
+        parser.add_argument(
+            '--max-batch',
+            type=int,
+            default=settings.CHAT_INFERENCE_MAX_BATCH,
+            help='Máximo de mensajes por lote de inferencia.',
+        )
+        parser.add_argument(
+            '--max-wait-ms',
+            type=int,
+            default=settings.CHAT_INFERENCE_MAX_WAIT_MS,
+            help='Espera máxima para completar un lote antes de inferir.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            from detoxify import Detoxify
+        except ImportError:
+            raise CommandError('Detoxify no está instalado (pip install detoxify)')
+
+        self.stdout.write('Cargando modelo Detoxify para análisis de toxicidad...')
+        model = Detoxify(settings.CHAT_TOXICITY_MODEL)
+
+        server = InferenceServer(
+            model,
+            options['socket'],
+            max_batch=options['max_batch'],
+            max_wait_ms=options['max_wait_ms'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Worker de inferencia escuchando en {options['socket']}"))
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f'Worker detenido ({server.requests} mensajes en {server.batches} lotes)'
+            ))
@@ -0,0 +1,68 @@
+"""matcher precompilado de palabras prohibidas con normalizacion de acentos y leetspeak"""
+import re
+import unicodedata
+from collections import namedtuple
+
+from .versioning import VersionedLocalCache
+
+PalabraMatch = namedtuple('PalabraMatch', ['id', 'palabra', 'severidad'])
+
+VERSION_CACHE_KEY = 'chat:palabras_prohibidas:version'
+
+#sustituciones tipicas para evadir el filtro (h0l4 -> hola, $apo -> sapo)
+LEET_TABLE = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's',
+    '7': 't', '8': 'b', '@': 'a', '$': 's',
+})
+
+
+def normalize_text(text):
+    """minusculas, sin acentos y sin leetspeak. la ñ se conserva (año != ano)"""
+    text = unicodedata.normalize('NFKD', text.lower().replace('ñ', '\0'))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.replace('\0', 'ñ').translate(LEET_TABLE)
+
+
+class ProhibitedWordMatcher:
+    """una sola alternacion regex compilada para todas las palabras activas. se reconstruye solo cuando cambia la version"""
+
+    def __init__(self):
+        self._compiled = VersionedLocalCache(VERSION_CACHE_KEY, self._build)
+
+    def invalidate(self):
+        """reconstruir el patron en este y en los demas procesos"""
+        self._compiled.invalidate()
+
+    def _build(self):
+        from .models import PalabraProhibida
+
+        words = {}
+        for palabra_id, palabra, severidad in PalabraProhibida.objects.filter(activa=True).values_list(
+            'id', 'palabra', 'severidad'
+        ):
+            normalized = normalize_text(palabra.strip())
+            if normalized:
+                words[normalized] = PalabraMatch(palabra_id, palabra, severidad)
+
+        pattern = None
+        if words:
+            #las mas largas primero para que la alternacion prefiera la coincidencia completa
+            alternation = '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+            pattern = re.compile(r'(?<!\w)(?:' + alternation + r')(?!\w)')
+        return pattern, words
+
+    def find(self, text):
+        """devolver PalabraMatch de la primera palabra prohibida encontrada o None"""
+        pattern, words = self._compiled.get()
+        if pattern is None:
+            return None
+        match = pattern.search(normalize_text(text))
+        if match is None:
+            return None
+        return words.get(match.group(0))
+
+    def stats(self):
+        return self._compiled.stats()
+
+
+prohibited_word_matcher = ProhibitedWordMatcher()
@@ -0,0 +1,267 @@
+"""instrumentacion en vivo del chat por proceso: conexiones por sala, mensajes/s y latencias.
+se expone en formato de texto prometheus (sin dependencia de prometheus_client) y como snapshot para el dashboard"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+#etiqueta de las salas que no entran en el tope de etiquetas por sala
+OTHER_ROOM = 'other'
+
+#limites en segundos: cubren desde group_send en memoria (<1 ms) hasta el presupuesto de moderacion y lotes lentos
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """histograma acumulativo de latencias (mismo modelo que prometheus)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """estimacion por limite superior del bucket"""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return float('inf')
+
+
+class RateMeter:
+    """eventos por segundo en una ventana corta, con buckets de un segundo.
+    lo usan a la vez el event loop y los hilos de las vistas rest: el dict se toca solo con el lock"""
+
+    def __init__(self, window=60, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._buckets = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, n=1):
+        second = int(self.clock())
+        with self._lock:
+            self._buckets[second] += n
+            if len(self._buckets) > self.window * 2:
+                cutoff = second - self.window
+                for key in [k for k in self._buckets if k < cutoff]:
+                    del self._buckets[key]
+
+    def rate(self, seconds=10):
+        now = int(self.clock())
+        #el segundo en curso esta incompleto: se promedian los anteriores
+        with self._lock:
+            total = sum(self._buckets.get(now - offset, 0) for offset in range(1, seconds + 1))
+        return total / seconds
+
+
+class ChatMetrics:
+    """contadores del chat en este proceso. las operaciones son O(1) y no bloquean el event loop"""
+
+    def __init__(self, known_rooms=None, max_rooms=None):
+        self._lock = threading.Lock()
+        #el nombre de sala lo elige el cliente: solo las salas conocidas y las primeras max_rooms tienen etiqueta
+        #propia, el resto se agrega en 'other' (acota memoria y cardinalidad de /metrics)
+        self.known_rooms = set(getattr(settings, 'CHAT_METRICS_ROOMS', []) if known_rooms is None else known_rooms)
+        self.max_rooms = max_rooms or getattr(settings, 'CHAT_METRICS_MAX_ROOMS', 20)
+        self._labeled = set()
+        self.connections = defaultdict(int)
+        self.messages_in = defaultdict(int)
+        self.messages_out = defaultdict(int)
+        self.in_rate = RateMeter()
+        self.out_rate = RateMeter()
+        self.group_send = Histogram()
+        self.moderation = Histogram()
+        self.db_save = Histogram()
+        self.db_saved = 0
+
+    def _label(self, room):
+        """etiqueta de la sala; llamar con el lock. una sala etiquetada lo sigue siendo (conexiones cuadran)"""
+        if room in self.known_rooms or room in self._labeled:
+            return room
+        if len(self._labeled) < self.max_rooms:
+            self._labeled.add(room)
+            return room
+        return OTHER_ROOM
+
+    def connected(self, room):
+        with self._lock:
+            self.connections[self._label(room)] += 1
+
+    def disconnected(self, room):
+        with self._lock:
+            label = self._label(room)
+            self.connections[label] = max(0, self.connections[label] - 1)
+
+    def inbound(self, room):
+        #tambien desde hilos de las vistas rest
+        with self._lock:
+            self.messages_in[self._label(room)] += 1
+        self.in_rate.add()
+
+    def outbound(self, room, n=1):
+        """frames de mensajes ya enviados al cliente (los descartados por la cola de salida no cuentan)"""
+        with self._lock:
+            self.messages_out[self._label(room)] += n
+        self.out_rate.add(n)
+
+    @contextmanager
+    def timer(self, histogram):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            #db_save se observa desde hilos del executor
+            with self._lock:
+                histogram.observe(elapsed)
+
+    def saved(self, n):
+        with self._lock:
+            self.db_saved += n
+
+    def _extra_gauges(self):
+        """estado de los componentes del chat ya instrumentados en sus propios modulos"""
+        from .moderation import get_moderation_stage
+        from .outbound import get_outbound_registry
+        from .persistence import get_message_buffer
+        from .presence import get_presence_ticker
+        from .sse import get_room_broadcaster
+        from .utils import content_analyzer
+
+        buffer = get_message_buffer().stats()
+        moderation = get_moderation_stage().stats()
+        outbound = get_outbound_registry().stats(top=0)
+        sse = get_room_broadcaster().stats()
+        presence = get_presence_ticker().stats()
+        scores = content_analyzer.score_cache.stats()
+        return [
+            ('chat_write_pending', 'gauge', 'Mensajes en el buffer write-behind', buffer['pending']),
+            ('chat_write_dropped_total', 'counter', 'Mensajes descartados por el buffer', buffer['dropped']),
+            ('chat_write_failed_total', 'counter', 'Mensajes que fallaron al guardarse', buffer['failed']),
+            ('chat_write_retries_total', 'counter', 'Reintentos de lotes que fallaron al guardarse', buffer['retried']),
+            ('chat_moderation_pending', 'gauge', 'Mensajes esperando moderacion', moderation['pending']),
+            ('chat_moderation_timeouts_total', 'counter', 'Moderaciones fuera de presupuesto', moderation['timeouts']),
+            ('chat_moderation_overloaded_total', 'counter', 'Mensajes sin veredicto por cola de moderacion llena',
+             moderation['overloaded']),
+            ('chat_moderation_fallback_allowed_total', 'counter',
+             'Mensajes publicados sin veredicto por la politica allow (presupuesto o cola)', moderation['fallback_allowed']),
+            ('chat_outbound_queued_frames', 'gauge', 'Frames en colas de salida', outbound['queued_frames']),
+            ('chat_outbound_dropped_total', 'counter', 'Frames descartados a clientes lentos', outbound['dropped']),
+            ('chat_sse_clients', 'gauge', 'Clientes del feed sse', sse['clients']),
+            ('chat_sse_rooms', 'gauge', 'Salas con suscripcion sse', sse['rooms']),
+            ('chat_sse_rejected_total', 'counter', 'Conexiones sse rechazadas por tope de salas o clientes',
+             sse['rejected']),
+            ('chat_presence_sent_total', 'counter', 'Updates de presencia difundidos por el ticker', presence['sent']),
+            ('chat_presence_suppressed_total', 'counter', 'Cambios de presencia agrupados en un update ya pendiente',
+             presence['suppressed']),
+            ('chat_presence_dirty_rooms', 'gauge', 'Salas con presencia pendiente de difundir', presence['dirty_rooms']),
+            ('chat_moderation_ml_fallback_total', 'counter', 'Analisis ml fallidos tratados como score 0 (sin moderacion ml)',
+             content_analyzer.ml_fallbacks),
+            ('chat_score_cache_hits_total', 'counter', 'Scores de toxicidad servidos desde la cache', scores['hits']),
+            ('chat_score_cache_misses_total', 'counter', 'Scores de toxicidad calculados por el modelo', scores['misses']),
+            ('chat_score_cache_evictions_total', 'counter', 'Entradas expulsadas de la cache de scores', scores['evictions']),
+            ('chat_score_cache_entries', 'gauge', 'Textos en la cache de scores', scores['entries']),
+            ('chat_score_cache_bytes', 'gauge', 'Bytes usados por la cache de scores', scores['bytes_used']),
+        ]
+
+    def prometheus(self):
+        """texto de exposicion prometheus 0.0.4"""
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            connections = dict(self.connections)
+            messages_in = dict(self.messages_in)
+            messages_out = dict(self.messages_out)
+
+        metric('chat_connections', 'gauge', 'Conexiones websocket abiertas por sala')
+        for room, value in sorted(connections.items()):
+            lines.append(f'chat_connections{{room="{_escape(room)}"}} {value}')
+        metric('chat_messages_in_total', 'counter', 'Mensajes recibidos de clientes por sala')
+        for room, value in sorted(messages_in.items()):
+            lines.append(f'chat_messages_in_total{{room="{_escape(room)}"}} {value}')
+        metric('chat_messages_out_total', 'counter', 'Frames de mensajes entregados a clientes por sala')
+        for room, value in sorted(messages_out.items()):
+            lines.append(f'chat_messages_out_total{{room="{_escape(room)}"}} {value}')
+        metric('chat_db_saved_total', 'counter', 'Mensajes guardados en la base de datos')
+        lines.append(f'chat_db_saved_total {self.db_saved}')
+
+        for name, help_text, histogram in (
+            ('chat_group_send_seconds', 'Latencia de group_send al difundir un mensaje', self.group_send),
+            ('chat_moderation_seconds', 'Latencia de moderacion por mensaje', self.moderation),
+            ('chat_db_save_seconds', 'Latencia de guardado por lote (bulk_create)', self.db_save),
+        ):
+            metric(name, 'histogram', help_text)
+            for bound, total in histogram.cumulative():
+                lines.append(f'{name}_bucket{{le="{bound}"}} {total}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum {histogram.sum:.6f}')
+            lines.append(f'{name}_count {histogram.count}')
+
+        for name, kind, help_text, value in self._extra_gauges():
+            metric(name, kind, help_text)
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """resumen para el panel del dashboard"""
+
+        def latency(histogram):
+            p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+            return {
+                'count': histogram.count,
+                'avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else None,
+                'p50_ms': round(p50 * 1000, 2) if p50 not in (None, float('inf')) else None,
+                'p99_ms': round(p99 * 1000, 2) if p99 not in (None, float('inf')) else None,
+            }
+
+        with self._lock:
+            connections = dict(self.connections)
+        return {
+            'connections': connections,
+            'connections_total': sum(connections.values()),
+            'messages_in_per_s': round(self.in_rate.rate(), 2),
+            'messages_out_per_s': round(self.out_rate.rate(), 2),
+            'group_send': latency(self.group_send),
+            'moderation': latency(self.moderation),
+            'db_save': latency(self.db_save),
+        }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_metrics = None
+
+
+def get_chat_metrics():
+    """obtener metricas del chat unicas del proceso"""
+    global _metrics
+    if _metrics is None:
+        _metrics = ChatMetrics()
+    return _metrics
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_add_palabra_prohibida_fk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='fecha_envio',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_chatmessage_fecha_envio_default'),
+        ('users', '0002_user_chat_bloqueado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StrikeUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='strikes_chat', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('strikes', models.FloatField(default=0.0)),
+                ('total_infracciones', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Strikes de Usuario',
+                'verbose_name_plural': 'Strikes de Usuarios',
+                'db_table': 'strikes_usuario',
+            },
+        ),
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='vida_media_strikes_horas',
+            field=models.PositiveIntegerField(default=168, help_text='Horas en que un strike pierde la mitad de su peso (0 = los strikes no decaen)'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_strikeusuario_vida_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='spam_activo',
+            field=models.BooleanField(default=True, help_text='Rechazar floods y mensajes repetidos'),
+        ),
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='spam_distancia_simhash',
+            field=models.PositiveSmallIntegerField(default=10, help_text='Bits distintos (de 64) para considerar dos mensajes casi idénticos'),
+        ),
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='spam_max_mensajes',
+            field=models.PositiveIntegerField(default=8, help_text='Mensajes permitidos por usuario dentro de la ventana'),
+        ),
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='spam_max_repetidos',
+            field=models.PositiveIntegerField(default=2, help_text='Mensajes casi idénticos permitidos dentro de la ventana antes de rechazar'),
+        ),
+        migrations.AddField(
+            model_name='contentfilterconfig',
+            name='spam_ventana_segundos',
+            field=models.PositiveIntegerField(default=10, help_text='Ventana deslizante (segundos) para contar mensajes por usuario'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_contentfilterconfig_spam_activo_and_more'),
+        ('users', '0002_user_chat_bloqueado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaChatDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('sala', models.CharField(max_length=50)),
+                ('mensajes', models.PositiveIntegerField(default=0)),
+                ('usuarios_activos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estadística Diaria del Chat',
+                'verbose_name_plural': 'Estadísticas Diarias del Chat',
+                'db_table': 'estadisticas_chat_diarias',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'sala'), name='estadistica_chat_fecha_sala_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticaChatUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas_chat', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('usuario_nombre', models.CharField(blank=True, max_length=100, null=True)),
+                ('mensajes', models.PositiveIntegerField(default=0)),
+                ('ultimo_mensaje', models.DateTimeField(blank=True, null=True)),
+                ('infracciones', models.PositiveIntegerField(default=0)),
+                ('ultima_infraccion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.infraccionusuario')),
+            ],
+            options={
+                'verbose_name': 'Estadística de Usuario del Chat',
+                'verbose_name_plural': 'Estadísticas de Usuarios del Chat',
+                'db_table': 'estadisticas_chat_usuario',
+                'indexes': [models.Index(fields=['-mensajes'], name='estadistica_chat_mensajes_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_estadisticas_chat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='secuencia',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
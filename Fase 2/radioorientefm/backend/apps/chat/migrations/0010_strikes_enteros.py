@@ -0,0 +1,50 @@
+#strikes enteros: cada infraccion cuenta 1 y se olvida un strike por periodo. los contadores con decaimiento
+#exponencial se recalculan desde InfraccionUsuario antes de pasar la columna a entero
+
+from django.db import migrations, models
+
+
+def rebuild_strikes(apps, schema_editor):
+    """repetir las infracciones en orden con el periodo configurado (mismo calculo que strikes.rebuild_strikes)"""
+    from apps.chat.strikes import decay
+
+    ContentFilterConfig = apps.get_model('chat', 'ContentFilterConfig')
+    InfraccionUsuario = apps.get_model('chat', 'InfraccionUsuario')
+    StrikeUsuario = apps.get_model('chat', 'StrikeUsuario')
+
+    config = ContentFilterConfig.objects.filter(pk=1).first()
+    period = config.vida_media_strikes_horas if config is not None else 168
+
+    counters = {}
+    infracciones = InfraccionUsuario.objects.order_by('usuario_id', 'fecha_infraccion')
+    for usuario_id, fecha in infracciones.values_list('usuario_id', 'fecha_infraccion').iterator():
+        strikes, since, total = counters.get(usuario_id, (0, fecha, 0))
+        strikes, since = decay(strikes, since, fecha, period)
+        counters[usuario_id] = (strikes + 1, since, total + 1)
+
+    StrikeUsuario.objects.all().delete()
+    StrikeUsuario.objects.bulk_create([
+        StrikeUsuario(usuario_id=usuario_id, strikes=strikes, total_infracciones=total, fecha_actualizacion=since)
+        for usuario_id, (strikes, since, total) in counters.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0009_chatmessage_secuencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contentfilterconfig',
+            name='vida_media_strikes_horas',
+            field=models.PositiveIntegerField(default=168, help_text='Horas sin infracciones tras las que se olvida un strike (0 = los strikes no se olvidan)'),
+        ),
+        migrations.RunPython(rebuild_strikes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='strikeusuario',
+            name='strikes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
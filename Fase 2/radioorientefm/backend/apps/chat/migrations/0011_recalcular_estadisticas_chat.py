@@ -0,0 +1,27 @@
+#las tablas de estadisticas (0008) se crearon vacias y solo suman mensajes nuevos: recalcularlas desde el historial
+#de mensajes e infracciones. equivale a correr rebuild_chat_stats tras migrar
+
+from django.db import migrations
+
+
+def rebuild_stats(apps, schema_editor):
+    """mismo calculo que stats.rebuild_stats, con los modelos historicos"""
+    from apps.chat.stats import rebuild_stats as rebuild
+
+    rebuild(models=(
+        apps.get_model('chat', 'ChatMessage'),
+        apps.get_model('chat', 'InfraccionUsuario'),
+        apps.get_model('chat', 'EstadisticaChatDiaria'),
+        apps.get_model('chat', 'EstadisticaChatUsuario'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0010_strikes_enteros'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_stats, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class ChatMessage(models.Model):
     #relación con usuario
@@ -11,10 +12,13 @@ class ChatMessage(models.Model):
         help_text="Usuario que envió el mensaje"
     )
     contenido = models.TextField()
-    fecha_envio = models.DateTimeField(auto_now_add=True)
+    #default en vez de auto_now_add: el buffer write-behind conserva la hora difundida por websocket
+    fecha_envio = models.DateTimeField(default=timezone.now, editable=False)
     usuario_nombre = models.CharField(max_length=100, blank=True, null=True)
     tipo = models.CharField(max_length=20, default='user')
     sala = models.CharField(max_length=50, default='general')
+    #secuencia monotonica por sala asignada al difundir (antes del insert write-behind): cursor de reconexion
+    secuencia = models.BigIntegerField(null=True, blank=True, editable=False)
 
     class Meta:
         db_table = 'mensajes'
@@ -56,6 +60,28 @@ class ContentFilterConfig(models.Model):
         default=3,
         help_text="Número de infracciones antes de bloquear usuario"
     )
+    vida_media_strikes_horas = models.PositiveIntegerField(
+        default=168,
+        help_text="Horas sin infracciones tras las que se olvida un strike (0 = los strikes no se olvidan)"
+    )
+    #pre-filtro de spam (en memoria, antes del analisis ml)
+    spam_activo = models.BooleanField(default=True, help_text="Rechazar floods y mensajes repetidos")
+    spam_ventana_segundos = models.PositiveIntegerField(
+        default=10,
+        help_text="Ventana deslizante (segundos) para contar mensajes por usuario"
+    )
+    spam_max_mensajes = models.PositiveIntegerField(
+        default=8,
+        help_text="Mensajes permitidos por usuario dentro de la ventana"
+    )
+    spam_max_repetidos = models.PositiveIntegerField(
+        default=2,
+        help_text="Mensajes casi idénticos permitidos dentro de la ventana antes de rechazar"
+    )
+    spam_distancia_simhash = models.PositiveSmallIntegerField(
+        default=10,
+        help_text="Bits distintos (de 64) para considerar dos mensajes casi idénticos"
+    )
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
 
@@ -161,3 +187,79 @@ class InfraccionUsuario(models.Model):
     def id_usuario(self):
         """propiedad de compatibilidad para codigo existente"""
         return self.usuario_id
+
+
+class StrikeUsuario(models.Model):
+    """contador denormalizado de strikes por usuario que olvida un strike por periodo (evita contar todo el historial)"""
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='strikes_chat',
+        db_column='id_usuario'
+    )
+    #strikes vigentes; fecha_actualizacion marca el inicio del periodo de olvido en curso
+    strikes = models.PositiveIntegerField(default=0)
+    total_infracciones = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'strikes_usuario'
+        verbose_name = 'Strikes de Usuario'
+        verbose_name_plural = 'Strikes de Usuarios'
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.strikes} strikes"
+
+
+class EstadisticaChatDiaria(models.Model):
+    """contadores del chat por dia y sala, actualizados al guardar mensajes (el dashboard no recorre la tabla mensajes)"""
+    fecha = models.DateField()
+    sala = models.CharField(max_length=50)
+    mensajes = models.PositiveIntegerField(default=0)
+    #usuarios cuyo primer mensaje del dia fue en esta sala: la suma de las salas es el total de usuarios distintos
+    usuarios_activos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'estadisticas_chat_diarias'
+        verbose_name = 'Estadística Diaria del Chat'
+        verbose_name_plural = 'Estadísticas Diarias del Chat'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'sala'], name='estadistica_chat_fecha_sala_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.sala}: {self.mensajes} mensajes"
+
+
+class EstadisticaChatUsuario(models.Model):
+    """contadores del chat por usuario (top de usuarios y listado de bloqueados sin consultas por usuario)"""
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estadisticas_chat',
+        db_column='id_usuario'
+    )
+    usuario_nombre = models.CharField(max_length=100, blank=True, null=True)
+    mensajes = models.PositiveIntegerField(default=0)
+    ultimo_mensaje = models.DateTimeField(null=True, blank=True)
+    infracciones = models.PositiveIntegerField(default=0)
+    ultima_infraccion = models.ForeignKey(
+        InfraccionUsuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    class Meta:
+        db_table = 'estadisticas_chat_usuario'
+        verbose_name = 'Estadística de Usuario del Chat'
+        verbose_name_plural = 'Estadísticas de Usuarios del Chat'
+        indexes = [
+            models.Index(fields=['-mensajes'], name='estadistica_chat_mensajes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_nombre or self.usuario_id}: {self.mensajes} mensajes"
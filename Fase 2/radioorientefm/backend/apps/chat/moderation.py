@@ -0,0 +1,115 @@
+"""etapa de moderacion no bloqueante para el chat. el websocket usa el presupuesto de latencia; rest espera el veredicto"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from channels.db import database_sync_to_async
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationStage:
+    """ejecuta ContentAnalyzer en un executor acotado con presupuesto de latencia por mensaje"""
+
+    FALLBACK_POLICIES = ('allow', 'block')
+
+    def __init__(self, analyzer=None, max_workers=None, max_pending=None, budget_ms=None, fallback=None):
+        self._analyzer = analyzer
+        self.max_workers = max_workers or getattr(settings, 'CHAT_MODERATION_WORKERS', 2)
+        self.max_pending = max_pending or getattr(settings, 'CHAT_MODERATION_MAX_PENDING', 64)
+        self.budget = (budget_ms or getattr(settings, 'CHAT_MODERATION_BUDGET_MS', 300)) / 1000
+        self.fallback = fallback or getattr(settings, 'CHAT_MODERATION_FALLBACK', 'block')
+        if self.fallback not in self.FALLBACK_POLICIES:
+            raise ValueError(f'Politica de moderacion invalida: {self.fallback}')
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='chat-moderation')
+        self._counter_lock = threading.Lock()
+        self.pending = 0
+        self.analyzed = 0
+        self.timeouts = 0
+        self.overloaded = 0
+        self.fallback_allowed = 0
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from .utils import content_analyzer
+            self._analyzer = content_analyzer
+        return self._analyzer
+
+    def _fallback_result(self, reason):
+        """resultado cuando no hay veredicto dentro del presupuesto"""
+        allowed = self.fallback == 'allow'
+        if allowed:
+            #mensaje publicado sin veredicto: contarlo para poder alertar
+            with self._counter_lock:
+                self.fallback_allowed += 1
+        return {
+            'allowed': allowed,
+            'reason': None if allowed else 'El filtro de contenido está saturado, intenta nuevamente en unos segundos',
+            'score': 0.0,
+            'infraction_type': None,
+            'fallback': reason,
+        }
+
+    def _acquire(self):
+        """reservar un cupo en la cola del executor. false si esta saturada"""
+        with self._counter_lock:
+            if self.pending >= self.max_pending:
+                self.overloaded += 1
+                return False
+            self.pending += 1
+            return True
+
+    def _analyze(self, contenido, id_usuario, usuario_nombre):
+        try:
+            return self.analyzer.analyze_message(contenido, id_usuario, usuario_nombre)
+        finally:
+            with self._counter_lock:
+                self.pending -= 1
+                self.analyzed += 1
+
+    async def moderate(self, contenido, id_usuario, usuario_nombre):
+        """analizar sin bloquear el event loop. si se excede el presupuesto aplica la politica de fallback.
+        el analisis tardio sigue corriendo y registra la infraccion igualmente"""
+        if not self._acquire():
+            return self._fallback_result('overloaded')
+
+        analysis = database_sync_to_async(self._analyze, thread_sensitive=False, executor=self.executor)
+        task = asyncio.ensure_future(analysis(contenido, id_usuario, usuario_nombre))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Moderation budget exceeded for message from {usuario_nombre}")
+            return self._fallback_result('timeout')
+
+    def moderate_sync(self, contenido, id_usuario, usuario_nombre):
+        """version para vistas sincronas (rest): sin presupuesto ni fallback, espera el veredicto completo.
+        el hilo de la peticion no es el event loop, asi que el analisis corre en el mismo hilo y un modelo lento
+        solo demora esa respuesta en vez de publicar texto sin moderar"""
+        with self._counter_lock:
+            self.pending += 1
+        return self._analyze(contenido, id_usuario, usuario_nombre)
+
+    def stats(self):
+        return {
+            'pending': self.pending,
+            'analyzed': self.analyzed,
+            'timeouts': self.timeouts,
+            'overloaded': self.overloaded,
+            'fallback_allowed': self.fallback_allowed,
+        }
+
+
+_stage = None
+
+
+def get_moderation_stage():
+    """obtener etapa de moderacion unica del proceso"""
+    global _stage
+    if _stage is None:
+        _stage = ModerationStage()
+    return _stage
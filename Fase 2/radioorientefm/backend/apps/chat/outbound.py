@@ -0,0 +1,164 @@
+"""cola de salida acotada por conexion websocket: un cliente lento no acumula frames sin limite"""
+import asyncio
+import logging
+import weakref
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OutboundQueue:
+    """frames del chat en fifo acotada + ultimo frame de presencia (coalescido).
+    una tarea escritora envia en orden; los handlers del consumer solo encolan.
+    el limite cubre solo los frames que esperan aqui: el send de daphne no aplica contrapresion (escribe en el
+    buffer del transporte y retorna), asi que un cliente lento acumula bytes en ese buffer sin que esta cola se llene.
+    la cola evita el crecimiento por frames pendientes en el proceso, no reemplaza un limite del servidor"""
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'disconnect')
+
+    def __init__(self, send, name='', max_size=None, policy=None, disconnect_after=None, close=None, on_sent=None):
+        self._send = send
+        #se llama tras cada frame del chat enviado con exito (metricas de entrega)
+        self._on_sent = on_sent
+        #corrutina para cerrar la conexion si un envio falla
+        self._close = close
+        self.closed = False
+        self.name = name
+        self.max_size = max_size or getattr(settings, 'CHAT_SEND_QUEUE_MAX', 100)
+        self.policy = policy or getattr(settings, 'CHAT_SEND_OVERFLOW', 'drop_oldest')
+        if self.policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'Politica de cola de salida invalida: {self.policy}')
+        self.disconnect_after = disconnect_after or getattr(settings, 'CHAT_SEND_DISCONNECT_AFTER', 50)
+
+        self.frames = deque()
+        self.presence = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+        get_outbound_registry().add(self)
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        get_outbound_registry().discard(self)
+
+    def push(self, frame):
+        """encolar un frame del chat (texto json o bytes msgpack). false si la conexion supero el umbral de descartes y debe cerrarse"""
+        if self.closed:
+            return True
+        if len(self.frames) >= self.max_size:
+            self.frames.popleft()
+            self.dropped += 1
+        self.frames.append(frame)
+        self.max_depth = max(self.max_depth, len(self.frames))
+        self._wakeup.set()
+        return not (self.policy == 'disconnect' and self.dropped >= self.disconnect_after)
+
+    def set_presence(self, frame):
+        """solo importa el ultimo conteo: reemplaza el que aun no se envio"""
+        if self.closed:
+            return
+        if self.presence is not None:
+            self.coalesced += 1
+        self.presence = frame
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.frames or self.presence is not None:
+                chat_frame = bool(self.frames)
+                if chat_frame:
+                    frame = self.frames.popleft()
+                else:
+                    frame, self.presence = self.presence, None
+                try:
+                    if isinstance(frame, bytes):
+                        await self._send(bytes_data=frame)
+                    else:
+                        await self._send(text_data=frame)
+                    self.sent += 1
+                    if chat_frame and self._on_sent is not None:
+                        self._on_sent()
+                except Exception as e:
+                    logger.error(f"Outbound send failed for {self.name}, closing connection: {e}")
+                    await self._fail()
+                    return
+
+    async def _fail(self):
+        """conexion rota: no seguir encolando en una cola sin escritor, soltar el registro y cerrar el socket"""
+        self.closed = True
+        self.dropped += len(self.frames)
+        self.frames.clear()
+        self.presence = None
+        self._task = None
+        get_outbound_registry().discard(self)
+        if self._close is not None:
+            try:
+                await self._close()
+            except Exception as e:
+                logger.warning(f"Could not close connection {self.name}: {e}")
+
+    @property
+    def depth(self):
+        return len(self.frames) + (self.presence is not None)
+
+    def stats(self):
+        return {
+            'connection': self.name,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+        }
+
+
+class OutboundRegistry:
+    """colas vivas del proceso para exponer metricas por conexion"""
+
+    def __init__(self):
+        self._queues = weakref.WeakSet()
+        #descartes de conexiones ya cerradas
+        self.closed_dropped = 0
+        self.disconnected = 0
+
+    def add(self, queue):
+        self._queues.add(queue)
+
+    def discard(self, queue):
+        if queue in self._queues:
+            self._queues.discard(queue)
+            self.closed_dropped += queue.dropped
+
+    def stats(self, top=20):
+        queues = list(self._queues)
+        slowest = sorted(queues, key=lambda q: (q.depth, q.dropped), reverse=True)[:top]
+        return {
+            'connections': len(queues),
+            'queued_frames': sum(q.depth for q in queues),
+            'dropped': self.closed_dropped + sum(q.dropped for q in queues),
+            'disconnected_slow': self.disconnected,
+            'slowest': [q.stats() for q in slowest],
+        }
+
+
+_registry = None
+
+
+def get_outbound_registry():
+    """obtener registro de colas de salida unico del proceso"""
+    global _registry
+    if _registry is None:
+        _registry = OutboundRegistry()
+    return _registry
@@ -0,0 +1,191 @@
+"""persistencia write-behind de mensajes del chat en lotes"""
+import asyncio
+import atexit
+import logging
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from channels.db import database_sync_to_async
+
+from .models import ChatMessage
+from .history import get_room_history
+from .metrics import get_chat_metrics
+from .stats import record_messages
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriteBuffer:
+    """buffer por proceso: los mensajes se difunden al instante y se guardan con bulk_create cada n ms o m mensajes"""
+
+    OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+    def __init__(self, flush_interval_ms=None, batch_size=None, max_queue=None, overflow_policy=None):
+        self.flush_interval = (flush_interval_ms or getattr(settings, 'CHAT_WRITE_FLUSH_MS', 250)) / 1000
+        self.batch_size = batch_size or getattr(settings, 'CHAT_WRITE_BATCH_SIZE', 100)
+        self.max_queue = max_queue or getattr(settings, 'CHAT_WRITE_QUEUE_MAX', 5000)
+        self.overflow_policy = overflow_policy or getattr(settings, 'CHAT_WRITE_OVERFLOW', 'block')
+        self.retries = getattr(settings, 'CHAT_WRITE_RETRIES', 3)
+        self.retry_backoff = getattr(settings, 'CHAT_WRITE_RETRY_BACKOFF_MS', 100) / 1000
+        if self.overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f'Politica de desborde invalida: {self.overflow_policy}')
+
+        self.pending = deque()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retried = 0
+        self._task = None
+        self._wakeup = None
+        self._lock = None
+
+    async def put(self, message):
+        """encolar un ChatMessage sin guardar. devuelve false si la politica lo descarto"""
+        self._ensure_running()
+
+        if len(self.pending) >= self.max_queue:
+            if self.overflow_policy == 'drop_newest':
+                self.dropped += 1
+                return False
+            if self.overflow_policy == 'drop_oldest':
+                self.pending.popleft()
+                self.dropped += 1
+            else:
+                #block: el emisor espera a que la base de datos drene la cola
+                await self.flush()
+
+        self.pending.append(message)
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Chat write-behind flush failed: {e}")
+
+    async def flush(self):
+        """guardar todo lo pendiente en lotes de batch_size"""
+        async with self._lock:
+            while self.pending:
+                await self._write_batch_async(self._take_batch())
+
+    def _take_batch(self):
+        size = min(self.batch_size, len(self.pending))
+        return [self.pending.popleft() for _ in range(size)]
+
+    def _backoff(self, attempt):
+        return self.retry_backoff * (2 ** attempt)
+
+    async def _write_batch_async(self, batch):
+        """un intento por salto al executor de base de datos; la espera entre intentos es del event loop,
+        asi el hilo unico de database_sync_to_async queda libre para moderacion, historial y vistas"""
+        for attempt in range(self.retries + 1):
+            if await database_sync_to_async(self._attempt)(batch, attempt):
+                return
+            if attempt < self.retries:
+                await asyncio.sleep(self._backoff(attempt))
+        self._lost(batch)
+
+    def _write_batch(self, batch):
+        """version sincrona (apagado del proceso, sin event loop): aqui si se puede dormir el hilo"""
+        for attempt in range(self.retries + 1):
+            if self._attempt(batch, attempt):
+                return
+            if attempt < self.retries:
+                time.sleep(self._backoff(attempt))
+        self._lost(batch)
+
+    def _attempt(self, batch, attempt):
+        """un bulk_create del lote (atomico: entra todo o nada). devuelve true si se guardo"""
+        metrics = get_chat_metrics()
+        try:
+            with metrics.timer(metrics.db_save):
+                ChatMessage.objects.bulk_create(batch)
+        except Exception as e:
+            if attempt < self.retries:
+                self.retried += 1
+                logger.warning(f"Error guardando lote de {len(batch)} mensajes del chat (intento {attempt + 1}): {e}")
+            else:
+                logger.error(f"Error guardando lote de {len(batch)} mensajes del chat tras {attempt + 1} intentos: {e}")
+            #una conexion caida no se recupera sola: descartarla para que el reintento abra otra
+            if not connection.in_atomic_block:
+                connection.close_if_unusable_or_obsolete()
+            return False
+
+        self.written += len(batch)
+        self.batches += 1
+        metrics.saved(len(batch))
+
+        try:
+            #con los ids ya asignados el historial en memoria puede servir reconexiones "since id"
+            get_room_history().append(batch)
+        except Exception as e:
+            logger.warning(f"Chat history append failed: {e}")
+
+        try:
+            record_messages(batch)
+        except Exception as e:
+            logger.warning(f"Chat stats update failed: {e}")
+        return True
+
+    def _lost(self, batch):
+        self.failed += len(batch)
+        for message in batch:
+            logger.error(
+                f"Mensaje del chat perdido: sala={message.sala} usuario={message.usuario_id} "
+                f"seq={message.secuencia} fecha={message.fecha_envio} contenido={message.contenido[:200]!r}"
+            )
+
+    def flush_sync(self):
+        """vaciar la cola sin event loop (apagado del proceso)"""
+        while self.pending:
+            self._write_batch(self._take_batch())
+
+    async def close(self):
+        """detener la tarea de fondo y guardar lo pendiente"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._lock is not None:
+            await self.flush()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retried': self.retried,
+        }
+
+
+_buffer = None
+
+
+def get_message_buffer():
+    """obtener buffer write-behind unico del proceso"""
+    global _buffer
+    if _buffer is None:
+        _buffer = MessageWriteBuffer()
+        #al apagar daphne el loop ya termino: guardar lo pendiente de forma sincrona
+        atexit.register(_buffer.flush_sync)
+    return _buffer
@@ -0,0 +1,198 @@
+"""registro de presencia del chat compartido entre procesos daphne"""
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from channels.layers import get_channel_layer
+
+from .frames import presence_event
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryPresenceStore:
+    """almacen de presencia en memoria del proceso (capa InMemoryChannelLayer o tests)"""
+
+    def __init__(self):
+        #sala -> {channel_name: expira_en}
+        self._rooms = {}
+        #sala -> ultimo barrido de canales vencidos
+        self._last_sweep = {}
+
+    async def touch(self, room, channel, expires_at):
+        self._rooms.setdefault(room, {})[channel] = expires_at
+
+    async def remove(self, room, channel):
+        members = self._rooms.get(room)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                self._rooms.pop(room, None)
+                self._last_sweep.pop(room, None)
+
+    async def count(self, room, now, sweep_every):
+        members = self._rooms.get(room)
+        if not members:
+            return 0
+        #el barrido es lazy: como maximo una vez por intervalo, el conteo queda en o(1)
+        if now - self._last_sweep.get(room, 0) >= sweep_every:
+            self._last_sweep[room] = now
+            for channel in [c for c, exp in members.items() if exp <= now]:
+                del members[channel]
+        return len(members)
+
+    async def claim_tick(self, room, interval):
+        #un solo proceso: el ticker local ya limita la frecuencia
+        return True
+
+
+class RedisPresenceStore:
+    """almacen de presencia en redis: un sorted set por sala con score = expiracion"""
+
+    def __init__(self, client=None, channel_layer=None, prefix='asgi'):
+        #client permite inyectar fakeredis.aioredis.FakeRedis() en pruebas
+        self._client = client
+        self._channel_layer = channel_layer
+        self.prefix = prefix
+
+    def _get_client(self):
+        if self._client is not None:
+            return self._client
+        #reutilizar el pool de conexiones de channels_redis (uno por event loop)
+        return self._channel_layer.connection(0)
+
+    def _key(self, room):
+        return f'{self.prefix}:presence:{room}'
+
+    async def touch(self, room, channel, expires_at):
+        await self._get_client().zadd(self._key(room), {channel: expires_at})
+
+    async def remove(self, room, channel):
+        await self._get_client().zrem(self._key(room), channel)
+
+    async def count(self, room, now, sweep_every):
+        key = self._key(room)
+        async with self._get_client().pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, '-inf', now)
+            pipe.zcard(key)
+            _, total = await pipe.execute()
+        return int(total)
+
+    async def claim_tick(self, room, interval):
+        """solo un proceso del cluster emite presencia por sala en cada intervalo"""
+        claimed = await self._get_client().set(
+            f'{self._key(room)}:tick', 1, nx=True, px=int(interval * 1000)
+        )
+        return bool(claimed)
+
+
+class PresenceRegistry:
+    """presencia por sala con heartbeats por conexion y expiracion ttl de canales muertos"""
+
+    def __init__(self, store, ttl=None, heartbeat_interval=None, clock=time.time):
+        self.store = store
+        self.ttl = ttl or getattr(settings, 'CHAT_PRESENCE_TTL', 60)
+        self.heartbeat_interval = heartbeat_interval or getattr(settings, 'CHAT_PRESENCE_HEARTBEAT', 20)
+        self.clock = clock
+
+    async def join(self, room, channel):
+        """registrar conexion y devolver usuarios conectados en la sala"""
+        await self.heartbeat(room, channel)
+        return await self.count(room)
+
+    async def heartbeat(self, room, channel):
+        """renovar el ttl de la conexion"""
+        await self.store.touch(room, channel, self.clock() + self.ttl)
+
+    async def leave(self, room, channel):
+        """quitar conexion y devolver usuarios restantes"""
+        await self.store.remove(room, channel)
+        return await self.count(room)
+
+    async def count(self, room):
+        return await self.store.count(room, self.clock(), self.heartbeat_interval)
+
+
+class PresenceTicker:
+    """agrupa cambios de presencia: marca salas sucias y emite como maximo un users_online por sala e intervalo"""
+
+    def __init__(self, registry, interval=None, channel_layer=None):
+        self.registry = registry
+        self.interval = interval or getattr(settings, 'CHAT_PRESENCE_BROADCAST_INTERVAL', 2.0)
+        self.channel_layer = channel_layer
+        self.dirty = set()
+        self.sent = 0
+        self.suppressed = 0
+        self._task = None
+
+    def mark_dirty(self, room):
+        """registrar un cambio de presencia en la sala"""
+        if room in self.dirty:
+            #ya hay un envio pendiente para la sala: este cambio viaja en el mismo frame
+            self.suppressed += 1
+        else:
+            self.dirty.add(room)
+        self._ensure_running()
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Presence tick failed: {e}")
+
+    async def flush(self):
+        """emitir users_online para cada sala sucia"""
+        channel_layer = self.channel_layer or get_channel_layer()
+        for room in list(self.dirty):
+            if not await self.registry.store.claim_tick(room, self.interval):
+                #otro proceso ya emitio en este intervalo; reintentar en el siguiente tick
+                continue
+            self.dirty.discard(room)
+            users_count = await self.registry.count(room)
+            await channel_layer.group_send(room, presence_event(users_count))
+            self.sent += 1
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'dirty_rooms': len(self.dirty),
+        }
+
+
+_registry = None
+_ticker = None
+
+
+def build_presence_store(channel_layer):
+    """elegir almacen segun la capa de canales configurada"""
+    if channel_layer is not None and hasattr(channel_layer, 'connection'):
+        return RedisPresenceStore(
+            channel_layer=channel_layer,
+            prefix=getattr(channel_layer, 'prefix', 'asgi'),
+        )
+    return MemoryPresenceStore()
+
+
+def get_presence_registry():
+    """obtener registro de presencia unico del proceso"""
+    global _registry
+    if _registry is None:
+        _registry = PresenceRegistry(build_presence_store(get_channel_layer()))
+    return _registry
+
+
+def get_presence_ticker():
+    """obtener ticker de presencia unico del proceso"""
+    global _ticker
+    if _ticker is None:
+        _ticker = PresenceTicker(get_presence_registry())
+    return _ticker
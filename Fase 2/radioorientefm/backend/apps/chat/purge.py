@@ -0,0 +1,161 @@
+"""limpieza del chat en segundo plano: borra una sala por rangos de id en lotes pequeños.
+cada lote es su propia transaccion corta, el progreso queda en la cache compartida y los clientes se enteran una sola vez"""
+import logging
+import threading
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .frames import cleared_event
+from .history import get_room_history
+from .models import ChatMessage
+from .stats import DeletedMessages
+
+logger = logging.getLogger(__name__)
+
+#cuanto tiempo se conserva el progreso de un trabajo terminado (segundos)
+JOB_TTL = 24 * 3600
+
+
+def job_key(job_id):
+    return f'chat:purga:{job_id}'
+
+
+def room_lock_key(room):
+    return f'chat:purga:sala:{room}'
+
+
+def get_purge_job(job_id):
+    """progreso de un trabajo (o None si no existe o expiro)"""
+    return cache.get(job_key(job_id))
+
+
+class RoomPurge:
+    """un trabajo por sala a la vez. los mensajes enviados despues de iniciar la limpieza no se tocan"""
+
+    def __init__(self, batch_size=None, pause_ms=None):
+        self.batch_size = batch_size or getattr(settings, 'CHAT_PURGE_BATCH_SIZE', 1000)
+        self.pause = (pause_ms if pause_ms is not None else getattr(settings, 'CHAT_PURGE_PAUSE_MS', 50)) / 1000
+
+    def start(self, room, background=True):
+        """iniciar la limpieza de la sala y devolver el estado del trabajo.
+        si ya hay una limpieza en curso para la sala se devuelve esa"""
+        job_id = uuid.uuid4().hex
+        if not cache.add(room_lock_key(room), job_id, JOB_TTL):
+            current = get_purge_job(cache.get(room_lock_key(room)) or '')
+            if current is not None:
+                return current
+            #candado huerfano (trabajo expirado): tomarlo
+            cache.set(room_lock_key(room), job_id, JOB_TTL)
+
+        #corte: todo lo que exista hasta este id se considera borrado desde ya
+        last = ChatMessage.objects.filter(sala=room).order_by('-id').values_list('id', flat=True).first() or 0
+        job = {
+            'job_id': job_id,
+            'sala': room,
+            'status': 'queued',
+            'max_id': last,
+            'total': None,
+            'deleted': 0,
+            'batches': 0,
+            'started_at': timezone.now().isoformat(),
+            'finished_at': None,
+            'error': None,
+        }
+        self._save(job)
+        get_room_history().set_floor(room, last)
+
+        if not background:
+            self.run(job)
+            return job
+        #copia: el hilo sigue actualizando job
+        snapshot = dict(job)
+        threading.Thread(target=self._run_in_thread, args=(job,), name=f'chat-purge-{room}', daemon=True).start()
+        return snapshot
+
+    def _save(self, job):
+        cache.set(job_key(job['job_id']), job, JOB_TTL)
+
+    def _run_in_thread(self, job):
+        #hilo propio: gestionar la conexion a la base de datos como hace channels
+        close_old_connections()
+        try:
+            self.run(job)
+        finally:
+            close_old_connections()
+
+    def run(self, job):
+        room = job['sala']
+        try:
+            self._notify(room)
+            job['status'] = 'running'
+            job['total'] = ChatMessage.objects.filter(sala=room, id__lte=job['max_id']).count()
+            self._save(job)
+
+            last_id = 0
+            #lo borrado se descuenta de las estadisticas del dashboard una sola vez al terminar
+            removed = DeletedMessages()
+            try:
+                while True:
+                    rows = list(
+                        ChatMessage.objects.filter(sala=room, id__gt=last_id, id__lte=job['max_id'])
+                        .order_by('id')
+                        .values_list('id', 'usuario_id', 'fecha_envio')[:self.batch_size]
+                    )
+                    if not rows:
+                        break
+                    #rango acotado: el collector solo pone en null las infracciones de este lote
+                    deleted = ChatMessage.objects.filter(sala=room, id__gte=rows[0][0], id__lte=rows[-1][0]).delete()[1]
+                    for _, usuario_id, fecha_envio in rows:
+                        removed.add(usuario_id, room, fecha_envio)
+                    job['deleted'] += deleted.get(ChatMessage._meta.label, 0)
+                    job['batches'] += 1
+                    self._save(job)
+                    last_id = rows[-1][0]
+                    if self.pause:
+                        #ceder la base de datos a las escrituras del chat entre lotes
+                        time.sleep(self.pause)
+            finally:
+                #tambien si fallo a mitad: los lotes ya borrados no deben seguir contando
+                try:
+                    removed.apply()
+                except Exception as e:
+                    logger.warning(f"Chat stats update after purge {job['job_id']} failed: {e}")
+
+            job['status'] = 'done'
+            logger.info(f"Chat purge {job['job_id']} finished: {job['deleted']} messages from {room}")
+        except Exception as e:
+            job['status'] = 'error'
+            job['error'] = str(e)
+            logger.exception(f"Chat purge {job['job_id']} failed for room {room}")
+        finally:
+            job['finished_at'] = timezone.now().isoformat()
+            self._save(job)
+            cache.delete(room_lock_key(room))
+
+    def _notify(self, room):
+        """un solo evento a la sala: los clientes vacian su vista sin esperar a que termine el borrado"""
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(f'chat_{room}', cleared_event(room))
+        except Exception as e:
+            logger.warning(f"Could not notify chat clear for room {room}: {e}")
+
+
+_purge = None
+
+
+def get_room_purge():
+    """obtener limpiador de salas unico del proceso"""
+    global _purge
+    if _purge is None:
+        _purge = RoomPurge()
+    return _purge
@@ -1,7 +1,7 @@
 from django.urls import re_path
 from . import consumers
 
-#permitir guiones y guiones bajos en el nombre de la sala
+#permitir guiones y guiones bajos en el nombre de la sala (hasta 50, el largo de ChatMessage.sala)
 websocket_urlpatterns = [
-    re_path(r'ws/chat/(?P<room_name>[-\w]+)/$', consumers.ChatConsumer.as_asgi()),
+    re_path(r'ws/chat/(?P<room_name>[-\w]{1,50})/$', consumers.ChatConsumer.as_asgi()),
 ]
@@ -0,0 +1,95 @@
+"""memoizacion de scores de toxicidad para mensajes repetidos del chat"""
+import hashlib
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+#costo aproximado por entrada: nodo del OrderedDict + tupla (score, expira_en) + dos floats
+ENTRY_OVERHEAD_BYTES = 120
+
+
+def normalize_for_cache(text):
+    """los saludos repetidos difieren solo en mayusculas o espacios"""
+    return _WHITESPACE.sub(' ', text.strip().lower())
+
+
+class ToxicityScoreCache:
+    """lru acotado en bytes con ttl, clave = hash del texto normalizado.
+    se vacia cuando cambia la generacion (version del modelo o umbral_toxicidad)"""
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, ttl=3600, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(text):
+        return hashlib.blake2b(normalize_for_cache(text).encode('utf-8'), digest_size=16).digest()
+
+    @staticmethod
+    def _entry_size(key):
+        return sys.getsizeof(key) + ENTRY_OVERHEAD_BYTES
+
+    def set_generation(self, generation):
+        """vaciar la cache si cambio el modelo o el umbral"""
+        if generation == self._generation:
+            return
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+            self._generation = generation
+
+    def get(self, text):
+        key = self.make_key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            score, expires_at = entry
+            if expires_at <= self.clock():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def set(self, text, score):
+        key = self.make_key(text)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (score, self.clock() + self.ttl)
+            self.bytes_used += self._entry_size(key)
+            while self.bytes_used > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        del self._entries[key]
+        self.bytes_used -= self._entry_size(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes_used': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+        }
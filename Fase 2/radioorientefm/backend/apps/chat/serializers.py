@@ -8,8 +8,8 @@ class ChatMessageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ChatMessage
-        fields = ['id', 'id_usuario', 'contenido', 'fecha_envio', 'usuario_nombre', 'tipo', 'sala', 'usuario_bloqueado']
-        read_only_fields = ['id', 'fecha_envio', 'id_usuario', 'usuario_nombre', 'tipo', 'sala', 'usuario_bloqueado']
+        fields = ['id', 'secuencia', 'id_usuario', 'contenido', 'fecha_envio', 'usuario_nombre', 'tipo', 'sala', 'usuario_bloqueado']
+        read_only_fields = ['id', 'secuencia', 'fecha_envio', 'id_usuario', 'usuario_nombre', 'tipo', 'sala', 'usuario_bloqueado']
 
     def get_usuario_bloqueado(self, obj):
         try:
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import PalabraProhibida, ContentFilterConfig
+from .matcher import prohibited_word_matcher
+from .config_cache import filter_config_cache
+
+
+@receiver(post_save, sender=PalabraProhibida)
+@receiver(post_delete, sender=PalabraProhibida)
+def invalidar_matcher_palabras(sender, instance, **kwargs):
+    """reconstruir el matcher de palabras prohibidas en este y en los demas procesos"""
+    prohibited_word_matcher.invalidate()
+
+
+@receiver(post_save, sender=ContentFilterConfig)
+def invalidar_config_filtro(sender, instance, **kwargs):
+    """recargar la configuracion del filtro en todos los procesos"""
+    filter_config_cache.invalidate()
@@ -0,0 +1,108 @@
+"""pre-filtro de spam en memoria: ventana deslizante por usuario y deteccion de casi-duplicados con simhash"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .matcher import normalize_text
+
+SIMHASH_BITS = 64
+_MASK = (1 << SIMHASH_BITS) - 1
+SHINGLE_SIZE = 3
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def simhash(text):
+    """huella de 64 bits sobre trigramas de caracteres: textos parecidos difieren en pocos bits"""
+    #sin puntuacion ni espacios repetidos: 'hola!!!' y 'hola' son el mismo mensaje
+    text = ' '.join(_PUNCTUATION.sub('', normalize_text(text)).split())
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    #contar por columna de bits con cadenas binarias (zip/count en c en vez de 64 sumas en python)
+    rows = [format(hash(s) & _MASK, '064b') for s in shingles]
+    threshold = len(rows) / 2
+    fingerprint = 0
+    for column in zip(*rows):
+        fingerprint = (fingerprint << 1) | (column.count('1') > threshold)
+    return fingerprint
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class SpamDetector:
+    """historial reciente por usuario (timestamp, simhash). O(historial) por mensaje, sin base de datos"""
+
+    def __init__(self, history_size=20, max_users=10000, clock=time.monotonic):
+        self.history_size = history_size
+        self.max_users = max_users
+        self.clock = clock
+        self._history = OrderedDict()
+        self._flagged_at = {}
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = 0
+
+    def check(self, id_usuario, text, config):
+        """registrar el intento y devolver 'flood', 'duplicado' o None.
+        los intentos rechazados tambien cuentan para que un flood siga frenado mientras dure"""
+        now = self.clock()
+        fingerprint = simhash(text)
+        window = config.spam_ventana_segundos
+        #el historial debe poder contener el umbral de flood: con un deque mas corto nunca se alcanzaria
+        capacity = max(self.history_size, config.spam_max_mensajes + 1, config.spam_max_repetidos + 1)
+
+        with self._lock:
+            self.checked += 1
+            history = self._history.get(id_usuario)
+            if history is None:
+                history = deque(maxlen=capacity)
+                self._history[id_usuario] = history
+                if len(self._history) > self.max_users:
+                    stale, _ = self._history.popitem(last=False)
+                    self._flagged_at.pop(stale, None)
+            else:
+                if history.maxlen < capacity:
+                    #la configuracion subio el umbral despues de crear el historial
+                    history = deque(history, maxlen=capacity)
+                    self._history[id_usuario] = history
+                self._history.move_to_end(id_usuario)
+
+            while history and now - history[0][0] > window:
+                history.popleft()
+
+            verdict = None
+            if len(history) >= config.spam_max_mensajes:
+                verdict = 'flood'
+            else:
+                repeated = sum(
+                    1 for _, previous in history
+                    if hamming(previous, fingerprint) <= config.spam_distancia_simhash
+                )
+                if repeated >= config.spam_max_repetidos:
+                    verdict = 'duplicado'
+
+            history.append((now, fingerprint))
+            if verdict:
+                self.rejected += 1
+            return verdict
+
+    def should_register(self, id_usuario, config):
+        """una sola infraccion por usuario y ventana: un flood no debe convertirse en un flood de escrituras"""
+        now = self.clock()
+        with self._lock:
+            flagged_at = self._flagged_at.get(id_usuario)
+            if flagged_at is not None and now - flagged_at <= config.spam_ventana_segundos:
+                return False
+            self._flagged_at[id_usuario] = now
+            return True
+
+    def stats(self):
+        return {
+            'users': len(self._history),
+            'checked': self.checked,
+            'rejected': self.rejected,
+        }
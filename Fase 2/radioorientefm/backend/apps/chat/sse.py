@@ -0,0 +1,155 @@
+"""feed de solo lectura del chat por server-sent events.
+una suscripcion al grupo de la sala por proceso; cada evento se codifica una vez y se reparte a todos los clientes sse"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+#comentario sse periodico para que proxies y navegadores no cierren la conexion
+KEEPALIVE = b': keepalive\n\n'
+
+
+def sse_frame(event_name, data, event_id=None):
+    """frame sse ya codificado. data es json de una sola linea (json.dumps no emite saltos de linea)"""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {event_name}\ndata: {data}\n\n'.encode('utf-8')
+
+
+class SSEClient:
+    """cola acotada de un cliente sse: si no alcanza a leer se descartan los frames mas antiguos"""
+
+    def __init__(self, max_size):
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def put(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+class BroadcasterFull(Exception):
+    """se alcanzo el tope de salas o de clientes sse del proceso"""
+
+
+class RoomBroadcaster:
+    """tarea unica por sala y proceso suscrita al grupo chat_<sala>, sin consumer ni sesion por oyente"""
+
+    #re-registrar el canal en el grupo antes de que expire en channels_redis (group_expiry)
+    group_refresh_interval = 3600
+
+    def __init__(self, channel_layer=None, client_queue_max=None, max_rooms=None, max_clients=None):
+        self.channel_layer = channel_layer
+        self.client_queue_max = client_queue_max or getattr(settings, 'CHAT_SEND_QUEUE_MAX', 100)
+        self.max_rooms = max_rooms or getattr(settings, 'CHAT_SSE_MAX_ROOMS', 20)
+        self.max_clients = max_clients or getattr(settings, 'CHAT_SSE_MAX_CLIENTS', 2000)
+        self._rooms = {}
+        self.events = 0
+        self.rejected = 0
+
+    def subscribe(self, room):
+        """registrar un cliente sse en la sala; inicia la suscripcion al grupo si es el primero.
+        lanza BroadcasterFull si la sala seria nueva y ya hay max_rooms, o si ya hay max_clients"""
+        state = self._rooms.get(room)
+        if self.client_count() >= self.max_clients or (state is None and len(self._rooms) >= self.max_rooms):
+            self.rejected += 1
+            raise BroadcasterFull(room)
+        if state is None or state['task'].done():
+            state = {'clients': set(), 'task': None}
+            self._rooms[room] = state
+            state['task'] = asyncio.ensure_future(self._listen(room, state))
+        client = SSEClient(self.client_queue_max)
+        state['clients'].add(client)
+        return client
+
+    def client_count(self):
+        #las salas estan acotadas por max_rooms: sumar es barato
+        return sum(len(state['clients']) for state in self._rooms.values())
+
+    def unsubscribe(self, room, client):
+        state = self._rooms.get(room)
+        if state is None:
+            return
+        state['clients'].discard(client)
+        if not state['clients']:
+            #ultimo oyente: soltar la suscripcion al grupo
+            state['task'].cancel()
+            del self._rooms[room]
+
+    async def _listen(self, room, state):
+        channel_layer = self.channel_layer or get_channel_layer()
+        group = f'chat_{room}'
+        channel = await channel_layer.new_channel('sse.')
+        await channel_layer.group_add(group, channel)
+        loop = asyncio.get_running_loop()
+        refresh_at = loop.time() + self.group_refresh_interval
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(channel_layer.receive(channel), timeout=self.group_refresh_interval)
+                except asyncio.TimeoutError:
+                    event = None
+                if loop.time() >= refresh_at:
+                    await channel_layer.group_add(group, channel)
+                    refresh_at = loop.time() + self.group_refresh_interval
+                if event is None:
+                    continue
+
+                frame = self._encode(event)
+                if frame is None:
+                    continue
+                self.events += 1
+                for client in list(state['clients']):
+                    client.put(frame)
+        except Exception as e:
+            logger.error(f"SSE broadcaster for {room} stopped: {e}")
+            #cerrar los streams: EventSource reconecta solo y levanta una suscripcion nueva
+            for client in list(state['clients']):
+                client.put(None)
+        finally:
+            try:
+                await channel_layer.group_discard(group, channel)
+            except Exception:
+                pass
+
+    @staticmethod
+    def _encode(event):
+        if event.get('type') == 'chat_message':
+            return sse_frame('message', event['text'], event.get('id'))
+        if event.get('type') == 'presence':
+            return sse_frame('presence', event['text'])
+        if event.get('type') == 'chat_cleared':
+            return sse_frame('cleared', event['text'])
+        return None
+
+    def stats(self):
+        return {
+            'rooms': len(self._rooms),
+            'clients': self.client_count(),
+            'rejected': self.rejected,
+            'events': self.events,
+            'dropped': sum(c.dropped for state in self._rooms.values() for c in state['clients']),
+        }
+
+
+def history_frame(messages, truncated):
+    """backlog inicial; la ultima secuencia sirve como Last-Event-ID si el navegador reconecta"""
+    last_id = messages[-1].get('seq') if messages else None
+    data = json.dumps({'type': 'history', 'messages': messages, 'truncated': truncated})
+    return sse_frame('history', data, last_id)
+
+
+_broadcaster = None
+
+
+def get_room_broadcaster():
+    """obtener broadcaster sse unico del proceso"""
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = RoomBroadcaster()
+    return _broadcaster
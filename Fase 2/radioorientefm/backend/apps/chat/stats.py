@@ -0,0 +1,188 @@
+"""contadores incrementales del chat por dia, sala y usuario. se actualizan por lote de mensajes guardados
+con un numero fijo de consultas, y el dashboard los lee sin recorrer la tabla mensajes"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ChatMessage, EstadisticaChatDiaria, EstadisticaChatUsuario, InfraccionUsuario
+
+
+def record_messages(messages):
+    """sumar mensajes recien guardados a los contadores (llamar despues del insert)"""
+    if not messages:
+        return
+
+    by_user = defaultdict(list)
+    for message in messages:
+        by_user[message.usuario_id].append(message)
+
+    daily_messages = Counter((timezone.localdate(m.fecha_envio), m.sala) for m in messages)
+    daily_active = Counter()
+
+    with transaction.atomic():
+        #filas en cero para los usuarios nuevos; luego bloquearlas en orden de id para no cruzarse con otros procesos
+        EstadisticaChatUsuario.objects.bulk_create(
+            [EstadisticaChatUsuario(usuario_id=usuario_id) for usuario_id in by_user],
+            ignore_conflicts=True,
+        )
+        rows = EstadisticaChatUsuario.objects.select_for_update().filter(usuario_id__in=by_user).order_by('usuario_id')
+
+        updated = []
+        for row in rows:
+            last = row.ultimo_mensaje
+            for message in sorted(by_user[row.usuario_id], key=lambda m: m.fecha_envio):
+                day = timezone.localdate(message.fecha_envio)
+                if last is None or timezone.localdate(last) < day:
+                    #primer mensaje del usuario en este dia
+                    daily_active[(day, message.sala)] += 1
+                if last is None or message.fecha_envio > last:
+                    last = message.fecha_envio
+                    row.usuario_nombre = message.usuario_nombre or row.usuario_nombre
+            row.mensajes += len(by_user[row.usuario_id])
+            row.ultimo_mensaje = last
+            updated.append(row)
+        EstadisticaChatUsuario.objects.bulk_update(updated, ['usuario_nombre', 'mensajes', 'ultimo_mensaje'])
+
+        EstadisticaChatDiaria.objects.bulk_create(
+            [EstadisticaChatDiaria(fecha=day, sala=sala) for day, sala in daily_messages],
+            ignore_conflicts=True,
+        )
+        for (day, sala), count in daily_messages.items():
+            EstadisticaChatDiaria.objects.filter(fecha=day, sala=sala).update(
+                mensajes=F('mensajes') + count,
+                usuarios_activos=F('usuarios_activos') + daily_active[(day, sala)],
+            )
+
+
+class DeletedMessages:
+    """mensajes borrados acumulados (por dia/sala y por usuario) para descontarlos de una vez al final"""
+
+    def __init__(self):
+        self.per_day = Counter()
+        self.per_user = Counter()
+
+    def add(self, usuario_id, sala, fecha_envio):
+        self.per_day[(timezone.localdate(fecha_envio), sala)] += 1
+        self.per_user[usuario_id] += 1
+
+    def apply(self):
+        """restar los mensajes y recalcular lo que no se puede restar: usuarios activos de los dias tocados
+        (un usuario sigue activo si le queda otro mensaje ese dia) y ultimo mensaje de cada usuario"""
+        if not self.per_user:
+            return
+        with transaction.atomic():
+            for (day, sala), count in self.per_day.items():
+                EstadisticaChatDiaria.objects.filter(fecha=day, sala=sala).update(
+                    mensajes=Greatest(F('mensajes') - count, 0)
+                )
+            for day in {day for day, _ in self.per_day}:
+                _recount_active_users(day)
+
+            rows = list(EstadisticaChatUsuario.objects.select_for_update().filter(usuario_id__in=self.per_user))
+            last = dict(
+                ChatMessage.objects.filter(usuario_id__in=self.per_user).values('usuario_id')
+                .annotate(last=Max('fecha_envio')).values_list('usuario_id', 'last')
+            )
+            for row in rows:
+                row.mensajes = max(row.mensajes - self.per_user[row.usuario_id], 0)
+                row.ultimo_mensaje = last.get(row.usuario_id)
+            EstadisticaChatUsuario.objects.bulk_update(rows, ['mensajes', 'ultimo_mensaje'], batch_size=500)
+
+
+def _recount_active_users(day):
+    """usuarios activos del dia como en rebuild_stats: cada usuario cuenta una vez, en la sala de su primer mensaje"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    rows = ChatMessage.objects.filter(fecha_envio__gte=start, fecha_envio__lt=start + timedelta(days=1)).order_by(
+        'fecha_envio', 'id'
+    ).values_list('usuario_id', 'sala')
+    seen = set()
+    active = Counter()
+    for usuario_id, sala in rows.iterator(chunk_size=5000):
+        if usuario_id not in seen:
+            seen.add(usuario_id)
+            active[sala] += 1
+    for row in EstadisticaChatDiaria.objects.filter(fecha=day):
+        if row.usuarios_activos != active[row.sala]:
+            row.usuarios_activos = active[row.sala]
+            row.save(update_fields=['usuarios_activos'])
+
+
+def forget_messages(messages):
+    """descontar mensajes recien eliminados (llamar despues del delete)"""
+    deleted = DeletedMessages()
+    for message in messages:
+        deleted.add(message.usuario_id, message.sala, message.fecha_envio)
+    deleted.apply()
+
+
+def record_infraction(infraccion):
+    """sumar la infraccion al contador del usuario. llamar dentro de la transaccion que la crea"""
+    EstadisticaChatUsuario.objects.bulk_create(
+        [EstadisticaChatUsuario(usuario_id=infraccion.usuario_id, usuario_nombre=infraccion.usuario_nombre)],
+        ignore_conflicts=True,
+    )
+    EstadisticaChatUsuario.objects.filter(usuario_id=infraccion.usuario_id).update(
+        infracciones=F('infracciones') + 1,
+        ultima_infraccion=infraccion,
+    )
+
+
+def day_totals(day=None):
+    """mensajes y usuarios distintos de un dia (todas las salas)"""
+    totals = EstadisticaChatDiaria.objects.filter(fecha=day or timezone.localdate()).aggregate(
+        mensajes=Sum('mensajes'), usuarios_activos=Sum('usuarios_activos')
+    )
+    return totals['mensajes'] or 0, totals['usuarios_activos'] or 0
+
+
+def top_users(limit=10):
+    """usuarios con mas mensajes, con el usuario ya cargado (estado de bloqueo)"""
+    return EstadisticaChatUsuario.objects.select_related('usuario').filter(mensajes__gt=0).order_by('-mensajes', 'usuario_id')[:limit]
+
+
+def rebuild_stats(models=None):
+    """recalcular todos los contadores desde mensajes e infracciones. devuelve (dias, usuarios).
+    models: (ChatMessage, InfraccionUsuario, EstadisticaChatDiaria, EstadisticaChatUsuario) historicos desde una migracion"""
+    message_model, infraction_model, daily_model, user_model = models or (
+        ChatMessage, InfraccionUsuario, EstadisticaChatDiaria, EstadisticaChatUsuario
+    )
+    daily_messages = Counter()
+    daily_active = Counter()
+    users = {}
+    seen_days = set()
+
+    rows = message_model.objects.order_by('fecha_envio', 'id').values_list(
+        'usuario_id', 'usuario_nombre', 'sala', 'fecha_envio'
+    )
+    for usuario_id, usuario_nombre, sala, fecha in rows.iterator(chunk_size=5000):
+        day = timezone.localdate(fecha)
+        daily_messages[(day, sala)] += 1
+        if (usuario_id, day) not in seen_days:
+            seen_days.add((usuario_id, day))
+            daily_active[(day, sala)] += 1
+        user = users.setdefault(usuario_id, user_model(usuario_id=usuario_id))
+        user.usuario_nombre = usuario_nombre or user.usuario_nombre
+        user.mensajes += 1
+        user.ultimo_mensaje = fecha
+
+    infracciones = infraction_model.objects.order_by('fecha_infraccion', 'id').values_list(
+        'id', 'usuario_id', 'usuario_nombre'
+    )
+    for infraccion_id, usuario_id, usuario_nombre in infracciones.iterator(chunk_size=5000):
+        user = users.setdefault(usuario_id, user_model(usuario_id=usuario_id, usuario_nombre=usuario_nombre))
+        user.infracciones += 1
+        user.ultima_infraccion_id = infraccion_id
+
+    with transaction.atomic():
+        daily_model.objects.all().delete()
+        user_model.objects.all().delete()
+        daily_model.objects.bulk_create([
+            daily_model(fecha=day, sala=sala, mensajes=count, usuarios_activos=daily_active[(day, sala)])
+            for (day, sala), count in daily_messages.items()
+        ], batch_size=500)
+        user_model.objects.bulk_create(users.values(), batch_size=500)
+    return len(daily_messages), len(users)
@@ -0,0 +1,72 @@
+"""contador rolling de strikes por usuario, O(1) por infraccion. cada infraccion cuenta 1 entero y el contador
+olvida un strike por cada periodo completo de vida_media_strikes_horas"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InfraccionUsuario, StrikeUsuario
+
+
+def decay(strikes, since, now, period_hours):
+    """strikes vigentes en now y nuevo inicio del periodo en curso. se descuenta un strike entero por cada
+    periodo completo transcurrido desde since; el resto del periodo se conserva para no perder avance"""
+    if not period_hours or strikes <= 0:
+        return max(strikes, 0), (since if strikes > 0 else now)
+    period = timedelta(hours=period_hours)
+    steps = int(max(now - since, timedelta(0)) // period)
+    if steps >= strikes:
+        return 0, now
+    return strikes - steps, since + steps * period
+
+
+def reached_threshold(strikes, threshold):
+    """el contador alcanzo el umbral de bloqueo (mismo criterio que el conteo de infracciones anterior)"""
+    return strikes >= threshold
+
+
+def add_strike(id_usuario, period_hours, now=None):
+    """sumar un strike al contador del usuario. llamar dentro de la misma transaccion que crea la infraccion.
+    devuelve el valor actual del contador"""
+    now = now or timezone.now()
+    counter, created = StrikeUsuario.objects.select_for_update().get_or_create(
+        usuario_id=id_usuario,
+        defaults={'strikes': 1, 'total_infracciones': 1, 'fecha_actualizacion': now}
+    )
+    if not created:
+        strikes, since = decay(counter.strikes, counter.fecha_actualizacion, now, period_hours)
+        counter.strikes = strikes + 1
+        counter.total_infracciones += 1
+        counter.fecha_actualizacion = since
+        counter.save(update_fields=['strikes', 'total_infracciones', 'fecha_actualizacion'])
+    return counter.strikes
+
+
+def reset_strikes(id_usuario):
+    """olvidar los strikes acumulados (al desbloquear manualmente a un usuario)"""
+    StrikeUsuario.objects.filter(usuario_id=id_usuario).update(strikes=0, fecha_actualizacion=timezone.now())
+
+
+def rebuild_strikes(period_hours, usuario_ids=None):
+    """recalcular los contadores desde InfraccionUsuario. devuelve el numero de usuarios recalculados"""
+    infracciones = InfraccionUsuario.objects.order_by('usuario_id', 'fecha_infraccion')
+    if usuario_ids:
+        infracciones = infracciones.filter(usuario_id__in=usuario_ids)
+
+    counters = {}
+    for usuario_id, fecha in infracciones.values_list('usuario_id', 'fecha_infraccion').iterator():
+        #repetir add_strike en orden cronologico
+        strikes, since, total = counters.get(usuario_id, (0, fecha, 0))
+        strikes, since = decay(strikes, since, fecha, period_hours)
+        counters[usuario_id] = (strikes + 1, since, total + 1)
+
+    with transaction.atomic():
+        existing = StrikeUsuario.objects.all()
+        if usuario_ids:
+            existing = existing.filter(usuario_id__in=usuario_ids)
+        existing.delete()
+        StrikeUsuario.objects.bulk_create([
+            StrikeUsuario(usuario_id=usuario_id, strikes=strikes, total_infracciones=total, fecha_actualizacion=since)
+            for usuario_id, (strikes, since, total) in counters.items()
+        ], batch_size=500)
+    return len(counters)
@@ -0,0 +1,388 @@
+import asyncio
+import importlib
+import json
+import os
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from .history import RoomHistory
+from .inference import InferenceClient, InferenceServer
+from .metrics import ChatMetrics
+from .moderation import ModerationStage
+from .models import (
+    ChatMessage, ContentFilterConfig, EstadisticaChatDiaria, EstadisticaChatUsuario, InfraccionUsuario, StrikeUsuario,
+)
+from .persistence import MessageWriteBuffer
+from .routing import websocket_urlpatterns
+from .sse import BroadcasterFull, RoomBroadcaster
+from .strikes import add_strike, rebuild_strikes
+from .utils import ContentAnalyzer, content_analyzer
+
+
+class StrikeThresholdTests(TestCase):
+    """el contador con decaimiento debe bloquear en el umbral configurado"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='strikes@test.cl', username='strikes', password='x')
+
+    def _strikes(self, config, gap):
+        now = timezone.now()
+        strikes = 0
+        for step in range(config.strikes_para_bloqueo):
+            strikes = add_strike(self.user.id, config.vida_media_strikes_horas, now=now + gap * step)
+        return strikes
+
+    def test_infracciones_seguidas_bloquean(self):
+        for umbral in (3, 5):
+            for gap in (timedelta(seconds=1), timedelta(hours=1), timedelta(hours=30)):
+                with self.subTest(umbral=umbral, gap=gap):
+                    StrikeUsuario.objects.filter(usuario=self.user).delete()
+                    config = ContentFilterConfig(strikes_para_bloqueo=umbral, vida_media_strikes_horas=168)
+                    strikes = self._strikes(config, gap)
+
+                    self.assertEqual(strikes, umbral)
+                    self.assertTrue(content_analyzer._should_auto_block(self.user.id, strikes, config))
+
+    def test_bloqueo_marca_al_usuario(self):
+        config = ContentFilterConfig(strikes_para_bloqueo=3, vida_media_strikes_horas=168)
+        content_analyzer._should_auto_block(self.user.id, self._strikes(config, timedelta(hours=1)), config)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.chat_bloqueado)
+
+    def test_rebuild_coincide_con_el_contador(self):
+        config = ContentFilterConfig(strikes_para_bloqueo=3, vida_media_strikes_horas=168)
+        now = timezone.now()
+        for horas in (0, 100, 200, 400):
+            fecha = now + timedelta(hours=horas)
+            infraccion = InfraccionUsuario.objects.create(usuario=self.user, usuario_nombre='strikes', mensaje_original='x',
+                                                          tipo_infraccion='toxicidad_ml', accion_tomada='bloqueado')
+            #fecha_infraccion es auto_now_add
+            InfraccionUsuario.objects.filter(pk=infraccion.pk).update(fecha_infraccion=fecha)
+            live = add_strike(self.user.id, config.vida_media_strikes_horas, now=fecha)
+
+        rebuild_strikes(config.vida_media_strikes_horas)
+        self.assertEqual(StrikeUsuario.objects.get(usuario=self.user).strikes, live)
+
+    def test_strikes_decaidos_no_bloquean(self):
+        config = ContentFilterConfig(strikes_para_bloqueo=3, vida_media_strikes_horas=168)
+        now = timezone.now()
+        strikes = 0
+        for semana in range(3):
+            strikes = add_strike(self.user.id, config.vida_media_strikes_horas, now=now + timedelta(weeks=semana))
+
+        self.assertFalse(content_analyzer._should_auto_block(self.user.id, strikes, config))
+
+
+class ChatStatsBackfillTests(TestCase):
+    """la migracion 0011 llena las estadisticas con los mensajes previos a las tablas de contadores"""
+
+    def test_migracion_recalcula_desde_el_historial(self):
+        user = get_user_model().objects.create_user(email='stats@test.cl', username='stats', password='x')
+        for sala in ('general', 'general', 'radio-oriente'):
+            ChatMessage.objects.create(usuario=user, usuario_nombre='stats', contenido='hola', sala=sala)
+        self.assertFalse(EstadisticaChatUsuario.objects.exists())
+
+        migration = importlib.import_module('apps.chat.migrations.0011_recalcular_estadisticas_chat')
+        migration.rebuild_stats(django_apps, None)
+
+        self.assertEqual(EstadisticaChatUsuario.objects.get(usuario=user).mensajes, 3)
+        self.assertEqual(
+            dict(EstadisticaChatDiaria.objects.values_list('sala', 'mensajes')), {'general': 2, 'radio-oriente': 1}
+        )
+
+
+class SlowAnalyzer:
+    """analizador que no alcanza a responder dentro del presupuesto"""
+
+    def analyze_message(self, contenido, id_usuario, usuario_nombre):
+        time.sleep(0.2)
+        return {'allowed': True, 'reason': None, 'score': 0.0, 'infraction_type': None}
+
+
+class ModerationBudgetTests(SimpleTestCase):
+    """sin veredicto a tiempo el mensaje se rechaza salvo que se configure allow, y los allow se cuentan"""
+
+    def _moderate(self, **kwargs):
+        stage = ModerationStage(analyzer=SlowAnalyzer(), budget_ms=20, **kwargs)
+        result = async_to_sync(stage.moderate)('hola', 1, 'oyente')
+        stage.executor.shutdown(wait=True)
+        return stage, result
+
+    def test_por_defecto_rechaza(self):
+        stage, result = self._moderate()
+
+        self.assertFalse(result['allowed'])
+        self.assertEqual(result['fallback'], 'timeout')
+        self.assertEqual(stage.stats()['fallback_allowed'], 0)
+
+    def test_allow_publica_y_cuenta(self):
+        stage, result = self._moderate(fallback='allow')
+
+        self.assertTrue(result['allowed'])
+        self.assertEqual(stage.stats()['fallback_allowed'], 1)
+
+
+class ModerationReadyTests(TestCase):
+    """el probe de readiness no debe dar 200 si el modelo falló al cargar"""
+
+    def _get(self, state):
+        previous = content_analyzer.state
+        content_analyzer.state = state
+        try:
+            return self.client.get(reverse('chat-moderation-ready'))
+        finally:
+            content_analyzer.state = previous
+
+    def test_modelo_con_error_no_esta_listo(self):
+        response = self._get('error')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['ready'])
+
+    def test_modelo_listo(self):
+        self.assertEqual(self._get('ready').status_code, 200)
+
+
+class MessageWriteBufferTests(TestCase):
+    """un lote que falla se reintenta antes de darlo por perdido"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='buffer@test.cl', username='buffer', password='x')
+        self.buffer = MessageWriteBuffer(batch_size=10)
+        self.buffer.retry_backoff = 0
+
+    def _messages(self, count):
+        return [ChatMessage(usuario=self.user, contenido=f'hola {i}', sala='general') for i in range(count)]
+
+    def test_fallo_transitorio_se_reintenta(self):
+        original = ChatMessage.objects.bulk_create
+        calls = []
+
+        def flaky(batch, *args, **kwargs):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return original(batch, *args, **kwargs)
+
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=flaky):
+            self.buffer._write_batch(self._messages(3))
+
+        self.assertEqual(ChatMessage.objects.count(), 3)
+        self.assertEqual(self.buffer.stats()['retried'], 1)
+        self.assertEqual(self.buffer.stats()['failed'], 0)
+
+    def test_fallo_persistente_registra_las_filas_perdidas(self):
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=OperationalError('disk I/O error')):
+            with self.assertLogs('apps.chat.persistence', level='ERROR') as logs:
+                self.buffer._write_batch(self._messages(2))
+
+        self.assertEqual(self.buffer.stats()['failed'], 2)
+        self.assertEqual(self.buffer.stats()['retried'], self.buffer.retries)
+        self.assertEqual(sum('Mensaje del chat perdido' in line for line in logs.output), 2)
+
+    def test_reintento_async_no_duerme_el_hilo_de_base_de_datos(self):
+        original = ChatMessage.objects.bulk_create
+        calls = []
+
+        def flaky(batch, *args, **kwargs):
+            calls.append(len(batch))
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return original(batch, *args, **kwargs)
+
+        async def scenario():
+            self.buffer._ensure_running()
+            self.buffer.pending.extend(self._messages(4))
+            await self.buffer.flush()
+            self.buffer._task.cancel()
+
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=flaky), \
+                mock.patch('apps.chat.persistence.time.sleep', side_effect=AssertionError('sleep bloqueante')):
+            async_to_sync(scenario)()
+
+        self.assertEqual(ChatMessage.objects.count(), 4)
+        self.assertEqual(self.buffer.stats()['retried'], 2)
+
+
+class ChatStreamLimitsTests(SimpleTestCase):
+    """el feed sse anonimo no puede crear salas ni clientes sin limite"""
+
+    def test_sala_invalida_no_resuelve(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse('chat-stream', args=['sala con espacios'])
+        with self.assertRaises(NoReverseMatch):
+            reverse('chat-stream', args=['x' * 51])
+
+    def test_tope_de_salas_y_clientes(self):
+        async def scenario():
+            broadcaster = RoomBroadcaster(channel_layer=InMemoryChannelLayer(), max_rooms=2, max_clients=3)
+            a = broadcaster.subscribe('a')
+            broadcaster.subscribe('b')
+            with self.assertRaises(BroadcasterFull):
+                broadcaster.subscribe('c')
+            #una sala existente sigue aceptando clientes hasta el tope global
+            broadcaster.subscribe('a')
+            with self.assertRaises(BroadcasterFull):
+                broadcaster.subscribe('b')
+            broadcaster.unsubscribe('a', a)
+            broadcaster.subscribe('b')
+            stats = broadcaster.stats()
+            for state in list(broadcaster._rooms.values()):
+                state['task'].cancel()
+            return stats
+
+        stats = async_to_sync(scenario)()
+        self.assertEqual(stats['rooms'], 2)
+        self.assertEqual(stats['clients'], 3)
+        self.assertEqual(stats['rejected'], 2)
+
+
+class RoomHistoryLimitsTests(TestCase):
+    """los rings por sala estan acotados: el nombre de la sala lo elige el cliente"""
+
+    def test_lru_de_salas(self):
+        history = RoomHistory(capacity=10, max_rooms=2)
+        history.backlog('a')
+        history.backlog('b')
+        history.backlog('a')
+        history.backlog('c')
+
+        self.assertEqual(list(history._rooms), ['a', 'c'])
+        self.assertEqual(history.stats()['evictions'], 1)
+
+    def test_ruta_websocket_limita_el_nombre(self):
+        pattern = websocket_urlpatterns[0].pattern
+        self.assertIsNotNone(pattern.match('ws/chat/radio-oriente/'))
+        self.assertIsNone(pattern.match('ws/chat/' + 'x' * 51 + '/'))
+
+
+class ChatMetricsLabelsTests(SimpleTestCase):
+    """las etiquetas por sala de /metrics estan acotadas"""
+
+    def test_salas_extra_se_agregan_en_other(self):
+        metrics = ChatMetrics(known_rooms=['radio-oriente'], max_rooms=2)
+        for index in range(50):
+            metrics.connected(f'sala-{index}')
+            metrics.inbound(f'sala-{index}')
+        metrics.connected('radio-oriente')
+        metrics.disconnected('sala-49')
+
+        self.assertEqual(set(metrics.connections), {'radio-oriente', 'sala-0', 'sala-1', 'other'})
+        self.assertEqual(metrics.connections['other'], 47)
+        self.assertEqual(metrics.messages_in['other'], 48)
+        self.assertEqual(metrics.prometheus().count('chat_connections{'), 4)
+
+
+class FakeToxicityModel:
+    """modelo de prueba con la interfaz de Detoxify.predict(lista): el score depende del texto"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, texts):
+        self.batches.append(len(texts))
+        time.sleep(0.02)
+        return {'toxicity': [int(text.split('-')[1]) / 1000 for text in texts]}
+
+
+class InferenceWorkerTests(SimpleTestCase):
+    """micro-batching del worker con un modelo de prueba"""
+
+    def setUp(self):
+        self.socket_path = os.path.join(tempfile.mkdtemp(), 'toxicity.sock')
+        self.model = FakeToxicityModel()
+
+    def _serve(self, scenario):
+        server = InferenceServer(self.model, self.socket_path, max_batch=8, max_wait_ms=20)
+
+        async def run():
+            task = asyncio.ensure_future(server.serve())
+            while not os.path.exists(self.socket_path):
+                await asyncio.sleep(0.005)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(None, scenario)
+            finally:
+                task.cancel()
+
+        return server, asyncio.run(run())
+
+    def test_agrupa_peticiones_y_responde_a_cada_una(self):
+        texts = [f'msg-{index}' for index in range(40)]
+        client = InferenceClient(self.socket_path)
+
+        def scenario():
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                return list(pool.map(client.predict, texts))
+
+        server, results = self._serve(scenario)
+
+        self.assertEqual([r['toxicity'] for r in results], [index / 1000 for index in range(40)])
+        self.assertEqual(server.requests, 40)
+        self.assertLess(server.batches, 40)
+        self.assertLessEqual(max(self.model.batches), 8)
+
+    def test_peticiones_encadenadas_en_una_conexion(self):
+        #varias lineas sin esperar respuesta: cada respuesta lleva el id de su peticion
+        def scenario():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(5)
+                sock.connect(self.socket_path)
+                sock.sendall(b''.join(
+                    (json.dumps({'id': index, 'text': f'msg-{index}'}) + '\n').encode() for index in range(20)
+                ) + b'{"id": 99, "ping": true}\n')
+                reader = sock.makefile('rb')
+                return [json.loads(reader.readline()) for _ in range(21)]
+
+        _, responses = self._serve(scenario)
+        by_id = {r['id']: r for r in responses}
+
+        self.assertTrue(by_id.pop(99)['pong'])
+        self.assertEqual({i: r['scores']['toxicity'] for i, r in by_id.items()}, {i: i / 1000 for i in range(20)})
+
+    def test_worker_caido_no_marca_listo(self):
+        with override_settings(CHAT_INFERENCE_SOCKET=self.socket_path, CHAT_INFERENCE_MAX_FAILURES=2):
+            analyzer = ContentAnalyzer()
+        analyzer.warm_up(background=False)
+
+        self.assertEqual(analyzer.state, 'error')
+        self.assertFalse(analyzer.is_ready)
+        self.assertEqual(analyzer._analyze_toxicity('hola'), 0.0)
+        self.assertEqual(analyzer.ml_fallbacks, 1)
+
+    def test_fallos_seguidos_pasan_a_error_y_se_recupera(self):
+        with override_settings(CHAT_INFERENCE_SOCKET=self.socket_path, CHAT_INFERENCE_MAX_FAILURES=2):
+            analyzer = ContentAnalyzer()
+
+        def scenario():
+            analyzer.warm_up(background=False)
+            return analyzer.state
+
+        _, state = self._serve(scenario)
+        self.assertEqual(state, 'ready')
+
+        #el worker ya no escucha
+        analyzer._analyze_toxicity('msg-1')
+        self.assertEqual(analyzer.state, 'ready')
+        analyzer._analyze_toxicity('msg-2')
+        self.assertEqual(analyzer.state, 'error')
+        self.assertEqual(analyzer.ml_fallbacks, 2)
+
+        def recovered():
+            analyzer.check_health(interval=0)
+            return analyzer.state
+
+        _, state = self._serve(recovered)
+        self.assertEqual(state, 'ready')
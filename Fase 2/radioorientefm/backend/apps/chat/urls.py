@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from django.http import JsonResponse
 from . import views
 
@@ -9,18 +9,31 @@ def chat_info(request):
             'messages': '/api/chat/messages/',
             'messages_by_room': '/api/chat/messages/{room}/',
             'delete_message': '/api/chat/messages/{id}/delete/',
-            'radio_status': '/api/chat/radio-status/'
+            'clear_messages': '/api/chat/messages/clear/',
+            'clear_status': '/api/chat/messages/clear/{job_id}/',
+            'radio_status': '/api/chat/radio-status/',
+            'moderation_ready': '/api/chat/moderation/ready/',
+            'connections': '/api/chat/connections/',
+            'stream': '/api/chat/stream/{room}/',
+            'metrics': '/api/chat/metrics/'
         }
     })
 
 urlpatterns = [
     path('', chat_info, name='chat-info'),
     path('messages/', views.ChatMessageListView.as_view(), name='chat-messages'),
+    #antes de messages/<sala>/ para que 'clear' no se tome como nombre de sala
+    path('messages/clear/', views.ClearAllMessagesView.as_view(), name='chat-clear-all'),
+    path('messages/clear/<str:job_id>/', views.ClearMessagesStatusView.as_view(), name='chat-clear-status'),
     path('messages/<str:sala>/', views.ChatMessageListView.as_view(), name='chat-messages-sala'),
     path('messages/<int:pk>/delete/', views.ChatMessageDeleteView.as_view(), name='chat-message-delete'),
-    path('messages/clear/', views.ClearAllMessagesView.as_view(), name='chat-clear-all'),
     path('users/<int:user_id>/toggle-block/', views.toggle_user_block, name='chat-toggle-user-block'),
     path('radio-status/', views.RadioStatusView.as_view(), name='radio-status'),
+    path('moderation/ready/', views.ModerationReadyView.as_view(), name='chat-moderation-ready'),
+    path('connections/', views.ConnectionStatsView.as_view(), name='chat-connections'),
+    #mismo patron de sala que la ruta websocket
+    re_path(r'^stream/(?P<sala>[-\w]{1,50})/$', views.chat_stream, name='chat-stream'),
+    path('metrics/', views.ChatMetricsView.as_view(), name='chat-metrics'),
 
     #filtro ml de contenido
     path('filter/config/', views.manage_filter_config, name='chat-filter-config'),
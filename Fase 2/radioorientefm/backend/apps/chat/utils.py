@@ -1,40 +1,129 @@
 """utilidades para analisis de contenido con machine learning"""
 import os
 import re
-from typing import Dict, Tuple
-from .models import ContentFilterConfig, PalabraProhibida, InfraccionUsuario
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from .models import ContentFilterConfig, InfraccionUsuario
+from .inference import InferenceClient
+from .matcher import PalabraMatch, prohibited_word_matcher
+from .config_cache import filter_config_cache
+from .score_cache import ToxicityScoreCache
+from .strikes import add_strike, reached_threshold
+from .stats import record_infraction
+from .spam import SpamDetector
 
 
 class ContentAnalyzer:
     """analizador de contenido con ml para detectar mensajes ofensivos"""
 
     def __init__(self):
-        """inicializar modelo ml de detoxify para español"""
+        """preparar el analizador. el modelo detoxify se carga de forma lazy (warm_up) y no al importar"""
         #detectar si esta en Render
         disable_detoxify = os.getenv('DISABLE_DETOXIFY', 'false').lower() == 'true'
         is_render = os.getenv('RENDER', 'false').lower() == 'true'
-        
+
+        inference_socket = getattr(settings, 'CHAT_INFERENCE_SOCKET', '')
+
+        #scores memoizados por texto normalizado (saludos y frases repetidas no pasan por el modelo)
+        self.score_cache = ToxicityScoreCache(
+            max_bytes=getattr(settings, 'CHAT_TOXICITY_CACHE_BYTES', 4 * 1024 * 1024),
+            ttl=getattr(settings, 'CHAT_TOXICITY_CACHE_TTL', 3600)
+        )
+        #historial reciente por usuario para frenar floods antes de tocar la base de datos o el modelo
+        self.spam_detector = SpamDetector()
+        self.model_version = f"detoxify-{getattr(settings, 'CHAT_TOXICITY_MODEL', 'multilingual')}"
+
+        #estado del modelo: cold, loading, ready, disabled o error
+        self.model = None
+        self.state = 'cold'
+        self._load_lock = threading.Lock()
+        #analisis ml que fallaron y se trataron como score 0.0 (mensaje sin moderacion ml)
+        self.ml_fallbacks = 0
+        self._consecutive_failures = 0
+        self.max_failures = getattr(settings, 'CHAT_INFERENCE_MAX_FAILURES', 3)
+        self._last_probe = 0.0
+
         #desactivar Detoxify en Render automáticamente o si está configurado
         if disable_detoxify or is_render:
             print("Detoxify desactivado (Render o configuración manual)")
-            self.model = None
             self.disabled = True
+            self.state = 'disabled'
+        elif inference_socket:
+            #modelo compartido en el worker local (manage.py run_toxicity_worker)
+            print(f"Usando worker de inferencia en {inference_socket}")
+            #queda en cold hasta que warm_up compruebe que el worker responde
+            self.model = InferenceClient(inference_socket, getattr(settings, 'CHAT_INFERENCE_TIMEOUT_MS', 2000))
+            self.disabled = False
         else:
-            #solo cargar en localhost
-            try:
-                from detoxify import Detoxify
-                print("Cargando modelo Detoxify para análisis de toxicidad...")
-                self.model = Detoxify('multilingual')
-                self.disabled = False
-                print("Detoxify cargado exitosamente")
-            except Exception as e:
-                print(f"Error al cargar modelo Detoxify: {e}")
-                self.model = None
-                self.disabled = True
+            #solo cargar en localhost, al primer uso o con warm_up() al iniciar asgi
+            self.disabled = False
+
+    @property
+    def is_warm(self) -> bool:
+        """true cuando ya no hay carga pendiente (modelo listo, desactivado o fallido)"""
+        return self.state in ('ready', 'disabled', 'error')
+
+    @property
+    def is_ready(self) -> bool:
+        """true cuando el proceso puede recibir trafico: modelo cargado o filtro ml desactivado a proposito.
+        un modelo que fallo al cargar ya no esta 'cargando' (is_warm) pero tampoco esta listo"""
+        return self.state in ('ready', 'disabled')
+
+    def warm_up(self, background: bool = True):
+        """cargar el modelo detoxify. en segundo plano no bloquea el arranque ni el event loop"""
+        with self._load_lock:
+            if self.state != 'cold':
+                return
+            self.state = 'loading'
+
+        if background:
+            threading.Thread(target=self._load_model, name='detoxify-warmup', daemon=True).start()
+        else:
+            self._load_model()
+
+    @property
+    def uses_worker(self) -> bool:
+        return isinstance(self.model, InferenceClient)
+
+    def _probe_worker(self):
+        """ready si el worker de inferencia responde, error si no"""
+        self._last_probe = time.monotonic()
+        if self.model.ping():
+            self._consecutive_failures = 0
+            self.state = 'ready'
+        else:
+            print(f"El worker de inferencia no responde en {self.model.socket_path}")
+            self.state = 'error'
+
+    def check_health(self, interval: float = 5.0):
+        """volver a probar el worker caido (lo llama el probe de readiness, que no recibe trafico mientras falle)"""
+        if self.uses_worker and self.state == 'error' and time.monotonic() - self._last_probe >= interval:
+            self._probe_worker()
+
+    def _load_model(self):
+        if self.uses_worker:
+            self._probe_worker()
+            return
+        try:
+            from detoxify import Detoxify
+            print("Cargando modelo Detoxify para análisis de toxicidad...")
+            started = time.monotonic()
+            self.model = Detoxify(getattr(settings, 'CHAT_TOXICITY_MODEL', 'multilingual'))
+            self.state = 'ready'
+            print(f"Detoxify cargado exitosamente en {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            print(f"Error al cargar modelo Detoxify: {e}")
+            self.model = None
+            self.disabled = True
+            self.state = 'error'
 
     def analyze_message(self, contenido: str, id_usuario: int, usuario_nombre: str) -> Dict:
         """analizar mensaje y determinar si debe ser bloqueado returns: dict con: - allowed: bool - si el mensaje puede publicarse - reason: str - razón del bloqueo (si aplica) - score: float - score de toxicidad (0.0 - 1.0) - infraction_type: str - tipo de infracción"""
-        config = ContentFilterConfig.get_config()
+        #copia local por proceso, invalidada por version compartida al guardar la configuracion
+        config = filter_config_cache.get()
 
         #si el filtro está desactivado, permitir todo
         if not config.activo:
@@ -45,12 +134,29 @@ class ContentAnalyzer:
                 'infraction_type': None
             }
 
+        #0. pre-filtro de spam en memoria (floods y mensajes repetidos)
+        if config.spam_activo:
+            spam = self.spam_detector.check(id_usuario, contenido, config)
+            if spam:
+                if self.spam_detector.should_register(id_usuario, config):
+                    self._register_infraction(
+                        id_usuario, usuario_nombre, contenido,
+                        'spam', 1.0, config.modo_accion, config=config
+                    )
+                return {
+                    'allowed': False,
+                    'reason': 'Estás enviando mensajes demasiado rápido' if spam == 'flood'
+                              else 'No repitas el mismo mensaje',
+                    'score': 0.0,
+                    'infraction_type': 'spam'
+                }
+
         #1. verificar enlaces (si está activado)
         if config.bloquear_enlaces:
             if self._contains_links(contenido):
                 self._register_infraction(
                     id_usuario, usuario_nombre, contenido,
-                    'enlace_prohibido', 1.0, config.modo_accion
+                    'enlace_prohibido', 1.0, config.modo_accion, config=config
                 )
                 return {
                     'allowed': False,
@@ -64,26 +170,42 @@ class ContentAnalyzer:
         if palabra_encontrada:
             self._register_infraction(
                 id_usuario, usuario_nombre, contenido,
-                'palabra_prohibida', 1.0, config.modo_accion
+                'palabra_prohibida', 1.0, config.modo_accion,
+                palabra_prohibida_id=palabra_encontrada.id, config=config
             )
             return {
                 'allowed': False,
                 'reason': f'Contenido no permitido: palabra prohibida detectada',
                 'score': 1.0,
-                'infraction_type': 'palabra_prohibida'
+                'infraction_type': 'palabra_prohibida',
+                'severity': palabra_encontrada.severidad
             }
 
         #3. analisis ml de toxicidad
+        if not self.is_warm:
+            #modelo aun cargando: iniciar la carga en segundo plano y aplicar la politica configurada
+            self.warm_up()
+            if getattr(settings, 'CHAT_MODERATION_COLD_POLICY', 'open') == 'closed':
+                return {
+                    'allowed': False,
+                    'reason': 'El filtro de contenido se está iniciando, intenta nuevamente en unos segundos',
+                    'score': 0.0,
+                    'infraction_type': None,
+                    'cold': True
+                }
+
+        #la cache se vacia si cambio el modelo o el umbral
+        self.score_cache.set_generation((self.model_version, config.umbral_toxicidad))
         toxicity_score = self._analyze_toxicity(contenido)
 
         if toxicity_score >= config.umbral_toxicidad:
-            self._register_infraction(
+            strikes = self._register_infraction(
                 id_usuario, usuario_nombre, contenido,
-                'toxicidad_ml', toxicity_score, config.modo_accion
+                'toxicidad_ml', toxicity_score, config.modo_accion, config=config
             )
 
             #verificar si debe bloquearse automáticamente
-            if self._should_auto_block(id_usuario, config):
+            if self._should_auto_block(id_usuario, strikes, config):
                 return {
                     'allowed': False,
                     'reason': 'Has acumulado demasiadas infracciones. Tu cuenta ha sido bloqueada automáticamente.',
@@ -124,26 +246,26 @@ class ContentAnalyzer:
         return bool(re.search(url_pattern, text, re.IGNORECASE) or
                    re.search(www_pattern, text, re.IGNORECASE))
 
-    def _check_prohibited_words(self, text: str) -> bool:
-        """verificar si el texto contiene palabras prohibidas"""
-        palabras = PalabraProhibida.objects.filter(activa=True)
-        text_lower = text.lower()
-
-        for palabra_obj in palabras:
-            #buscar palabra completa (no como substring)
-            pattern = r'\b' + re.escape(palabra_obj.palabra.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                return True
-
-        return False
+    def _check_prohibited_words(self, text: str) -> Optional[PalabraMatch]:
+        """verificar si el texto contiene palabras prohibidas returns: PalabraMatch (id, palabra, severidad) o None"""
+        #matcher precompilado: se reconstruye solo cuando cambian las palabras (signals)
+        return prohibited_word_matcher.find(text)
 
     def _analyze_toxicity(self, text: str) -> float:
         """analizar toxicidad del texto usando modelo ml returns: float: score de toxicidad (0.0 - 1.0)"""
         if not self.model:
             return 0.0
 
+        cached_score = self.score_cache.get(text)
+        if cached_score is not None:
+            return cached_score
+
         try:
             results = self.model.predict(text)
+            self._consecutive_failures = 0
+            if self.state == 'error':
+                #el worker volvio a responder
+                self.state = 'ready'
 
             #detoxify devuelve múltiples categorias
             #toxicity, severe_toxicity, obscene, threat, insult, identity_attack
@@ -157,42 +279,51 @@ class ContentAnalyzer:
                 results.get('identity_attack', 0)
             ])
 
-            return float(max_score)
+            score = float(max_score)
+            self.score_cache.set(text, score)
+            return score
 
         except Exception as e:
             print(f"Error en análisis ML: {e}")
+            self.ml_fallbacks += 1
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.max_failures and self.state == 'ready':
+                #el probe de readiness pasa a 503 hasta que el modelo responda de nuevo
+                print(f"Análisis ML marcado con error tras {self._consecutive_failures} fallos seguidos")
+                self.state = 'error'
             return 0.0
 
     def _register_infraction(self, id_usuario: int, usuario_nombre: str,
-                           mensaje: str, tipo: str, score: float, accion: str):
-        """registrar infracción en la base de datos"""
+                           mensaje: str, tipo: str, score: float, accion: str,
+                           palabra_prohibida_id: Optional[int] = None,
+                           config: Optional[ContentFilterConfig] = None) -> int:
+        """registrar infracción y sumar el strike en la misma transacción. devuelve los strikes vigentes"""
+        period = config.vida_media_strikes_horas if config is not None else 0
         try:
-            InfraccionUsuario.objects.create(
-                usuario_id=id_usuario,
-                usuario_nombre=usuario_nombre,
-                mensaje_original=mensaje,
-                tipo_infraccion=tipo,
-                score_toxicidad=score,
-                accion_tomada=accion
-            )
+            with transaction.atomic():
+                infraccion = InfraccionUsuario.objects.create(
+                    usuario_id=id_usuario,
+                    usuario_nombre=usuario_nombre,
+                    mensaje_original=mensaje,
+                    tipo_infraccion=tipo,
+                    score_toxicidad=score,
+                    accion_tomada=accion,
+                    palabra_prohibida_id=palabra_prohibida_id
+                )
+                record_infraction(infraccion)
+                return add_strike(id_usuario, period)
         except Exception as e:
             print(f"Error al registrar infracción: {e}")
+            return 0
 
-    def _should_auto_block(self, id_usuario: int, config: ContentFilterConfig) -> bool:
-        """verificar si el usuario debe ser bloqueado automáticamente por acumular demasiadas infracciones"""
-        infracciones_count = InfraccionUsuario.objects.filter(
-            usuario_id=id_usuario
-        ).count()
-
-        if infracciones_count >= config.strikes_para_bloqueo:
+    def _should_auto_block(self, id_usuario: int, strikes: int, config: ContentFilterConfig) -> bool:
+        """verificar si el usuario debe ser bloqueado automáticamente. O(1): usa el contador de strikes"""
+        if reached_threshold(strikes, config.strikes_para_bloqueo):
             #bloquear usuario automáticamente
             try:
-                from django.conf import settings
                 from django.apps import apps
                 UserModel = apps.get_model(settings.AUTH_USER_MODEL)
-                user = UserModel.objects.get(id=id_usuario)
-                user.chat_bloqueado = True
-                user.save()
+                UserModel.objects.filter(id=id_usuario).update(chat_bloqueado=True)
                 return True
             except Exception as e:
                 print(f"Error al bloquear usuario automáticamente: {e}")
@@ -201,5 +332,5 @@ class ContentAnalyzer:
         return False
 
 
-#instancia global del analizador
+#instancia global del analizador (no carga el modelo al importar)
 content_analyzer = ContentAnalyzer()
@@ -0,0 +1,74 @@
+"""contadores de version en la cache compartida para invalidar caches locales de cada proceso"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_version(key):
+    return cache.get(key, 0)
+
+
+def bump_version(key):
+    """incrementar la version: los demas procesos recargan en su proxima revision"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+class VersionedLocalCache:
+    """valor cargado una vez por proceso y recargado solo cuando cambia la version compartida"""
+
+    #cada cuanto revisar la version compartida (segundos)
+    version_check_interval = 1.0
+
+    def __init__(self, version_key, loader):
+        self.version_key = version_key
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.version_check_interval:
+            self.hits += 1
+            return self._value
+
+        version = get_version(self.version_key)
+        self._checked_at = now
+        if version == self._version:
+            self.hits += 1
+            return self._value
+
+        self.misses += 1
+        value = self.loader()
+        with self._lock:
+            self._value = value
+            self._version = version
+        return value
+
+    def invalidate(self):
+        """descartar la copia local y avisar al resto de procesos al confirmar la transaccion en curso.
+        si se avisara antes (dentro de post_save), otro proceso podria recargar las filas viejas y fijarlas
+        bajo la version nueva hasta el siguiente cambio. fuera de una transaccion se aplica de inmediato"""
+        transaction.on_commit(self._invalidate_now)
+
+    def _invalidate_now(self):
+        with self._lock:
+            self._value = None
+            self._version = None
+        bump_version(self.version_key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
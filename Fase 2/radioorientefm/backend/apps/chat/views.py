@@ -1,3 +1,6 @@
+import asyncio
+import hashlib
+import json
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
@@ -8,11 +11,26 @@ from rest_framework.decorators import api_view, permission_classes, authenticati
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from django.utils.decorators import method_decorator
+from asgiref.sync import async_to_sync, sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from channels.layers import get_channel_layer
 from .models import ChatMessage, ContentFilterConfig, PalabraProhibida, InfraccionUsuario
 from .serializers import ChatMessageSerializer
-from apps.radio.models import EstacionRadio
+from apps.radio.state import get_station, station_status
+from .moderation import get_moderation_stage
+from .config_cache import filter_config_cache
 from .utils import content_analyzer
+from .strikes import reset_strikes
+from .history import get_room_history, message_payload
+from .frames import chat_message_event
+from .outbound import get_outbound_registry
+from .sse import KEEPALIVE, BroadcasterFull, get_room_broadcaster, history_frame
+from .metrics import get_chat_metrics
+from .purge import get_room_purge, get_purge_job
+from .stats import forget_messages, record_messages
 
 class ChatMessageListView(generics.ListCreateAPIView):
     serializer_class = ChatMessageSerializer
@@ -22,8 +40,9 @@ class ChatMessageListView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         sala = self.kwargs.get('sala', 'radio-oriente')
+        #id__gt: los mensajes de una limpieza en curso ya no se muestran
         return ChatMessage.objects.filter(
-            sala=sala
+            sala=sala, id__gt=get_room_history().floor(sala)
         ).order_by('-fecha_envio')[:200]
 
     def perform_create(self, serializer):
@@ -31,21 +50,20 @@ class ChatMessageListView(generics.ListCreateAPIView):
         if self.request.user.chat_bloqueado:
             raise ValidationError({'detail': 'Has sido bloqueado del chat. Contacta con un administrador.'})
 
-        #verificar si la radio está online
-        try:
-            radio = EstacionRadio.objects.first()
-            if not radio or not radio.activo:
-                raise ValidationError({'detail': 'El chat solo está disponible cuando la radio está en vivo'})
-        except EstacionRadio.DoesNotExist:
-            raise ValidationError({'detail': 'No se pudo verificar el estado de la radio'})
+        #verificar si la radio está online (estado cacheado, sin consulta por mensaje)
+        radio = get_station()
+        if not radio or not radio.activo:
+            raise ValidationError({'detail': 'El chat solo está disponible cuando la radio está en vivo'})
 
-        #analizar contenido con machine learning
+        #analizar contenido con machine learning (veredicto completo: rest no aplica el presupuesto del websocket)
         contenido = serializer.validated_data.get('contenido', '')
-        analysis = content_analyzer.analyze_message(
-            contenido=contenido,
-            id_usuario=self.request.user.id,
-            usuario_nombre=self.request.user.username
-        )
+        metrics = get_chat_metrics()
+        with metrics.timer(metrics.moderation):
+            analysis = get_moderation_stage().moderate_sync(
+                contenido=contenido,
+                id_usuario=self.request.user.id,
+                usuario_nombre=self.request.user.username
+            )
 
         #si el mensaje no está permitido, bloquear
         if not analysis['allowed']:
@@ -64,13 +82,21 @@ class ChatMessageListView(generics.ListCreateAPIView):
         warning = analysis.get('warning')
 
         sala = self.kwargs.get('sala', 'radio-oriente')
-        serializer.save(
+        message = serializer.save(
             usuario=self.request.user,
             usuario_nombre=self.request.user.username,
             sala=sala,
-            tipo='user'
+            tipo='user',
+            secuencia=get_room_history().next_sequence(sala)
         )
 
+        #historial en memoria, contadores del dashboard y difusion a los clientes websocket de la sala
+        get_room_history().append([message])
+        record_messages([message])
+        metrics.inbound(sala)
+        with metrics.timer(metrics.group_send):
+            async_to_sync(get_channel_layer().group_send)(f'chat_{sala}', chat_message_event(message_payload(message)))
+
         #agregar advertencia al contexto si existe
         if warning:
             self.warning_message = warning
@@ -82,22 +108,104 @@ class ChatMessageDeleteView(generics.DestroyAPIView):
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     queryset = ChatMessage.objects.all()
 
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        get_room_history().invalidate(instance.sala)
+        forget_messages([instance])
+
 class RadioStatusView(APIView):
     """vista para verificar si la radio está online"""
     permission_classes = []
 
     def get(self, request):
+        #consultado cada pocos segundos por cada oyente: sin base de datos, con etag y max-age
+        payload = station_status()
+        etag = quote_etag(hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest())
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(payload)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.RADIO_STATUS_MAX_AGE)
+        return response
+
+class ModerationReadyView(APIView):
+    """readiness del filtro ml: 200 cuando el modelo está listo, 503 mientras carga o si falló la carga"""
+    permission_classes = []
+
+    def get(self, request):
+        content_analyzer.check_health()
+        ready = content_analyzer.is_ready
+        return Response({
+            'ready': ready,
+            'state': content_analyzer.state,
+            'ml_fallbacks': content_analyzer.ml_fallbacks,
+            'cold_policy': settings.CHAT_MODERATION_COLD_POLICY,
+        }, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+async def chat_stream(request, sala):
+    """feed sse de solo lectura de la sala (sin autenticacion ni websocket).
+    envia el historial reciente y luego los mensajes y la presencia en vivo.
+    la ruta solo acepta nombres de sala como los del websocket; 503 si se alcanzo el tope de salas o clientes"""
+    broadcaster = get_room_broadcaster()
+    try:
+        client = broadcaster.subscribe(sala)
+    except BroadcasterFull:
+        response = HttpResponse('Demasiadas conexiones al chat, intenta nuevamente más tarde', status=503)
+        response['Retry-After'] = str(settings.CHAT_SSE_KEEPALIVE)
+        return response
+
+    try:
+        since_seq = int(request.headers.get('Last-Event-ID') or request.GET.get('since_seq') or 0) or None
+    except ValueError:
+        since_seq = None
+    try:
+        messages, truncated = await sync_to_async(get_room_history().backlog)(sala, since_seq=since_seq)
+    except BaseException:
+        broadcaster.unsubscribe(sala, client)
+        raise
+
+    async def stream():
         try:
-            radio = EstacionRadio.objects.first()
-            return Response({
-                'is_online': radio.activo if radio else False,
-                'listeners_count': radio.listeners_count if radio else 0
-            })
-        except EstacionRadio.DoesNotExist:
-            return Response({
-                'is_online': False,
-                'listeners_count': 0
-            })
+            yield history_frame(messages, truncated)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(client.queue.get(), timeout=settings.CHAT_SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            broadcaster.unsubscribe(sala, client)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    #nginx: no almacenar el stream en buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+class ChatMetricsView(APIView):
+    """metricas del chat de este proceso en formato de texto prometheus (solo staff)"""
+    permission_classes = [IsAdminUser]
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        return HttpResponse(
+            get_chat_metrics().prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+class ConnectionStatsView(APIView):
+    """metricas de las colas de salida websocket de este proceso (profundidad y descartes por conexion)"""
+    permission_classes = [IsAdminUser]
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        stats = get_outbound_registry().stats()
+        stats['sse'] = get_room_broadcaster().stats()
+        return Response(stats)
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
@@ -112,6 +220,9 @@ def toggle_user_block(request, user_id):
 
         user.chat_bloqueado = not user.chat_bloqueado
         user.save()
+        if not user.chat_bloqueado:
+            #al desbloquear se parte de cero para no volver a bloquearlo con la siguiente infraccion
+            reset_strikes(user.id)
 
         return Response({
             'success': True,
@@ -125,30 +236,23 @@ def toggle_user_block(request, user_id):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 class ClearAllMessagesView(generics.GenericAPIView):
-    """vista para limpiar todos los mensajes del chat"""
+    """vista para limpiar todos los mensajes del chat (borrado por lotes en segundo plano)"""
     serializer_class = ChatMessageSerializer
     permission_classes = [IsAdminUser]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
 
     def post(self, request, *args, **kwargs):
-        print(f"=== CLEAR ALL MESSAGES ===")
-        print(f"User: {request.user}")
-        print(f"Is authenticated: {request.user.is_authenticated}")
-        print(f"Is staff: {request.user.is_staff if request.user.is_authenticated else 'N/A'}")
-
         try:
             #obtener sala del request
             sala = request.data.get('sala', 'radio-oriente') if request.data else 'radio-oriente'
-            print(f"Eliminando mensajes de sala: {sala}")
-
-            deleted_count = ChatMessage.objects.filter(sala=sala).delete()[0]
-            print(f"Mensajes eliminados: {deleted_count}")
+            job = get_room_purge().start(sala)
 
             return Response({
                 'success': True,
-                'deleted_count': deleted_count,
-                'message': f'Se eliminaron {deleted_count} mensajes correctamente'
-            })
+                'job': job,
+                'status_url': f"/api/chat/messages/clear/{job['job_id']}/",
+                'message': 'Limpieza del chat iniciada, los mensajes se eliminarán en segundo plano'
+            }, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             import traceback
             error_trace = traceback.format_exc()
@@ -160,6 +264,18 @@ class ClearAllMessagesView(generics.GenericAPIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ClearMessagesStatusView(APIView):
+    """progreso de una limpieza del chat"""
+    permission_classes = [IsAdminUser]
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request, job_id):
+        job = get_purge_job(job_id)
+        if job is None:
+            return Response({'detail': 'Trabajo de limpieza no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job)
+
+
 #============== filtro de contenido ml ==============
 
 @api_view(['GET', 'POST'])
@@ -167,24 +283,40 @@ class ClearAllMessagesView(generics.GenericAPIView):
 @permission_classes([IsAdminUser])
 def manage_filter_config(request):
     """obtener o actualizar configuracion del filtro ml"""
-    config = ContentFilterConfig.get_config()
-
     if request.method == 'GET':
+        config = filter_config_cache.get()
         return Response({
             'activo': config.activo,
             'umbral_toxicidad': config.umbral_toxicidad,
             'bloquear_enlaces': config.bloquear_enlaces,
             'modo_accion': config.modo_accion,
             'strikes_para_bloqueo': config.strikes_para_bloqueo,
+            'vida_media_strikes_horas': config.vida_media_strikes_horas,
+            'spam_activo': config.spam_activo,
+            'spam_ventana_segundos': config.spam_ventana_segundos,
+            'spam_max_mensajes': config.spam_max_mensajes,
+            'spam_max_repetidos': config.spam_max_repetidos,
+            'spam_distancia_simhash': config.spam_distancia_simhash,
+            'cache': filter_config_cache.stats(),
+            'score_cache': content_analyzer.score_cache.stats(),
+            'spam': content_analyzer.spam_detector.stats(),
         })
 
     elif request.method == 'POST':
         try:
+            #leer la fila actual (no la copia cacheada) antes de modificarla; post_save invalida la cache
+            config = ContentFilterConfig.get_config()
             config.activo = request.data.get('activo', config.activo)
             config.umbral_toxicidad = float(request.data.get('umbral_toxicidad', config.umbral_toxicidad))
             config.bloquear_enlaces = request.data.get('bloquear_enlaces', config.bloquear_enlaces)
             config.modo_accion = request.data.get('modo_accion', config.modo_accion)
             config.strikes_para_bloqueo = int(request.data.get('strikes_para_bloqueo', config.strikes_para_bloqueo))
+            config.vida_media_strikes_horas = int(request.data.get('vida_media_strikes_horas', config.vida_media_strikes_horas))
+            config.spam_activo = request.data.get('spam_activo', config.spam_activo)
+            config.spam_ventana_segundos = int(request.data.get('spam_ventana_segundos', config.spam_ventana_segundos))
+            config.spam_max_mensajes = int(request.data.get('spam_max_mensajes', config.spam_max_mensajes))
+            config.spam_max_repetidos = int(request.data.get('spam_max_repetidos', config.spam_max_repetidos))
+            config.spam_distancia_simhash = int(request.data.get('spam_distancia_simhash', config.spam_distancia_simhash))
             config.save()
 
             return Response({
@@ -196,6 +328,12 @@ def manage_filter_config(request):
                     'bloquear_enlaces': config.bloquear_enlaces,
                     'modo_accion': config.modo_accion,
                     'strikes_para_bloqueo': config.strikes_para_bloqueo,
+                    'vida_media_strikes_horas': config.vida_media_strikes_horas,
+                    'spam_activo': config.spam_activo,
+                    'spam_ventana_segundos': config.spam_ventana_segundos,
+                    'spam_max_mensajes': config.spam_max_mensajes,
+                    'spam_max_repetidos': config.spam_max_repetidos,
+                    'spam_distancia_simhash': config.spam_distancia_simhash,
                 }
             })
         except Exception as e:
@@ -311,24 +449,21 @@ def get_blocked_users(request):
         from django.apps import apps
         UserModel = apps.get_model(User)
 
-        #obtener todos los usuarios bloqueados
-        blocked_users = UserModel.objects.filter(chat_bloqueado=True).order_by('username')
+        #usuarios bloqueados con sus contadores en una sola consulta
+        blocked_users = UserModel.objects.filter(chat_bloqueado=True).select_related(
+            'estadisticas_chat__ultima_infraccion'
+        ).order_by('username')
 
-        #para cada usuario, contar sus infracciones
         users_data = []
         for user in blocked_users:
-            infracciones_count = InfraccionUsuario.objects.filter(usuario_id=user.id).count()
-
-            #obtener ultima infracción
-            ultima_infraccion = InfraccionUsuario.objects.filter(
-                usuario_id=user.id
-            ).order_by('-fecha_infraccion').first()
+            stats = getattr(user, 'estadisticas_chat', None)
+            ultima_infraccion = stats.ultima_infraccion if stats else None
 
             users_data.append({
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
-                'infracciones_count': infracciones_count,
+                'infracciones_count': stats.infracciones if stats else 0,
                 'ultima_infraccion': {
                     'tipo': ultima_infraccion.tipo_infraccion,
                     'fecha': ultima_infraccion.fecha_infraccion.isoformat(),
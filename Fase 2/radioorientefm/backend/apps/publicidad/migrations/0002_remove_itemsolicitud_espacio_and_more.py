@@ -10,6 +10,16 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
+        #quitar primero los indices de los campos que se eliminan: sqlite rehace la tabla al quitar un campo y
+        #fallaba al recrear un indice sobre el campo ya eliminado (bases nuevas y base de datos de pruebas)
+        migrations.RemoveIndex(
+            model_name='itemsolicitud',
+            name='item_solici_espacio_80b5f7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemsolicitud',
+            name='item_solici_solicit_f6ca04_idx',
+        ),
         migrations.RemoveField(
             model_name='itemsolicitud',
             name='espacio',
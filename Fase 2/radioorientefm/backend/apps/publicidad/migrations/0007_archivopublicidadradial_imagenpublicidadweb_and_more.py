@@ -181,6 +181,32 @@ class Migration(migrations.Migration):
                 'ordering': ['orden', 'nombre'],
             },
         ),
+        #quitar los indices antes que sus campos: sqlite rehace la tabla al quitar un campo y fallaba al recrear
+        #un indice sobre el campo ya eliminado (bases nuevas y base de datos de pruebas)
+        migrations.RemoveIndex(
+            model_name='imagenpublicidad',
+            name='imagen_publ_item_id_503e91_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemsolicitud',
+            name='item_solici_solicit_f6ca04_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemsolicitud',
+            name='item_solici_ubicaci_b670a6_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='publicidad',
+            name='publicidad_item_so_1e93c5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='publicidadradial',
+            name='publicidad__horario_0c7320_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='solicitudpublicidad',
+            name='solicitud_p_usuario_abf381_idx',
+        ),
         migrations.RemoveField(
             model_name='imagenpublicidad',
             name='item',
@@ -213,10 +239,6 @@ class Migration(migrations.Migration):
             name='publicidad',
             options={'ordering': ['-fecha_creacion'], 'verbose_name': 'Publicidad', 'verbose_name_plural': 'Publicidades'},
         ),
-        migrations.RemoveIndex(
-            model_name='publicidad',
-            name='publicidad_item_so_1e93c5_idx',
-        ),
         migrations.RemoveField(
             model_name='publicidad',
             name='archivo_media',
@@ -27,6 +27,20 @@ class Migration(migrations.Migration):
                 'db_table': 'publicidad_radial',
             },
         ),
+        #quitar los indices antes que sus campos: sqlite rehace la tabla al quitar un campo y fallaba al recrear
+        #un indice sobre el campo ya eliminado (bases nuevas y base de datos de pruebas)
+        migrations.RemoveIndex(
+            model_name='itemsolicitudradial',
+            name='item_solici_solicit_b9be7c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='itemsolicitudradial',
+            name='item_solici_ubicaci_13c9c2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='solicitudpublicidadradial',
+            name='solicitud_p_usuario_a11f17_idx',
+        ),
         migrations.RemoveField(
             model_name='archivopublicidadradial',
             name='item',
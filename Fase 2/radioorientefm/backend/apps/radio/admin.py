@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EstacionRadio, GeneroMusical, Conductor, Programa, HorarioPrograma, ProgramaConductor
+from .models import EstacionRadio, GeneroMusical, Conductor, Programa, HorarioPrograma, ProgramaConductor, OyentesRadioMinuto, SesionEscucha
 
 @admin.register(EstacionRadio)
 class EstacionRadioAdmin(admin.ModelAdmin):
@@ -35,3 +35,14 @@ class HorarioProgramaAdmin(admin.ModelAdmin):
 class ProgramaConductorAdmin(admin.ModelAdmin):
     list_display = ('programa', 'conductor')
     list_filter = ('programa',)
+
+@admin.register(OyentesRadioMinuto)
+class OyentesRadioMinutoAdmin(admin.ModelAdmin):
+    list_display = ('minuto', 'oyentes', 'pico')
+    date_hierarchy = 'minuto'
+
+@admin.register(SesionEscucha)
+class SesionEscuchaAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'usuario', 'inicio', 'fin', 'duracion_segundos')
+    list_filter = ('inicio',)
+    date_hierarchy = 'inicio'
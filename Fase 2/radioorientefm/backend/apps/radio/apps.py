@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RadioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.radio'
+
+    def ready(self):
+        """importar señales cuando la aplicación esté lista"""
+        import apps.radio.signals  # noqa
@@ -0,0 +1,348 @@
+"""importacion y exportacion de la programacion semanal completa (json o csv).
+la importacion valida solapes con un barrido de intervalos sobre el estado final, compara contra los horarios
+existentes y aplica solo la diferencia en una transaccion con operaciones masivas y un unico aviso de cambio"""
+import csv
+import io
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import HorarioPrograma, Programa
+from .schedule import DIAS, find_overlaps, invalidate_schedule
+from .signals import schedule_signals_muted
+
+CSV_FIELDS = ['id', 'programa_id', 'programa', 'dia_semana', 'hora_inicio', 'hora_fin', 'activo']
+UPDATE_FIELDS = ['programa_id', 'dia_semana', 'hora_inicio', 'hora_fin', 'activo']
+BATCH_SIZE = 500
+
+
+def _row(horario):
+    return {
+        'id': horario.id,
+        'programa_id': horario.programa_id,
+        'programa': horario.programa.nombre,
+        'dia_semana': horario.dia_semana,
+        'hora_inicio': horario.hora_inicio.strftime('%H:%M'),
+        'hora_fin': horario.hora_fin.strftime('%H:%M'),
+        'activo': horario.activo,
+    }
+
+
+def export_rows():
+    """todos los horarios de la semana en el formato que acepta la importacion"""
+    horarios = HorarioPrograma.objects.select_related('programa').order_by('dia_semana', 'hora_inicio', 'id')
+    return [_row(h) for h in horarios]
+
+
+def export_csv():
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(export_rows())
+    return output.getvalue()
+
+
+def parse_csv(text):
+    """filas del csv como diccionarios (mismas columnas que la exportacion)"""
+    if text.startswith('\ufeff'):
+        #bom de excel
+        text = text[1:]
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _parse_time(value):
+    value = str(value or '').strip()
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def parse_flag(value, default=True):
+    """booleano desde json, csv o query string"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'si', 'sí', 'on', 'yes')
+
+
+def _parse_id(value):
+    if value is None or value == '':
+        return None
+    return int(value)
+
+
+def slot_error(dia, hora_inicio, hora_fin):
+    """problema de un horario suelto (None si es valido). misma regla para la importacion y el dashboard:
+    con inicio igual a fin el horario se leeria como un bloque de 24 horas"""
+    if not 0 <= dia <= 6:
+        return 'dia_semana debe estar entre 0 (domingo) y 6 (sábado)'
+    if hora_inicio == hora_fin:
+        return 'la hora de inicio y de fin no pueden ser iguales'
+    return None
+
+
+def clean_rows(rows):
+    """validar y normalizar las filas. los programas se resuelven por id o por nombre con una sola consulta"""
+    programas = {p.id: p for p in Programa.objects.only('id', 'nombre', 'activo')}
+    por_nombre = {}
+    for programa in programas.values():
+        por_nombre.setdefault(programa.nombre.strip().lower(), []).append(programa)
+
+    cleaned = []
+    errors = []
+    seen_ids = set()
+    for fila, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(f'Fila {fila}: formato inválido')
+            continue
+        try:
+            horario_id = _parse_id(row.get('id'))
+            programa_id = _parse_id(row.get('programa_id'))
+            dia = int(row.get('dia_semana'))
+        except (TypeError, ValueError):
+            errors.append(f'Fila {fila}: id, programa_id y dia_semana deben ser números')
+            continue
+
+        if programa_id is None:
+            candidatos = por_nombre.get(str(row.get('programa') or '').strip().lower(), [])
+            if len(candidatos) != 1:
+                errors.append(f"Fila {fila}: programa '{row.get('programa')}' no encontrado o ambiguo, indique programa_id")
+                continue
+            programa = candidatos[0]
+        else:
+            programa = programas.get(programa_id)
+            if programa is None:
+                errors.append(f'Fila {fila}: el programa {programa_id} no existe')
+                continue
+
+        try:
+            hora_inicio = _parse_time(row.get('hora_inicio'))
+            hora_fin = _parse_time(row.get('hora_fin'))
+        except ValueError:
+            errors.append(f'Fila {fila}: formato de hora inválido, use HH:MM')
+            continue
+        error = slot_error(dia, hora_inicio, hora_fin)
+        if error:
+            errors.append(f'Fila {fila}: {error}')
+            continue
+        if horario_id is not None:
+            if horario_id in seen_ids:
+                errors.append(f'Fila {fila}: el horario {horario_id} aparece más de una vez')
+                continue
+            seen_ids.add(horario_id)
+
+        cleaned.append({
+            'fila': fila,
+            'id': horario_id,
+            'programa': programa,
+            'dia_semana': dia,
+            'hora_inicio': hora_inicio,
+            'hora_fin': hora_fin,
+            'activo': parse_flag(row.get('activo')),
+        })
+
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def plan_changes(cleaned, existing, replace=True):
+    """diferencia entre las filas limpias y los horarios existentes (queryset).
+    sin id, una fila se empareja con un horario existente del mismo programa, dia y hora de inicio.
+    con replace los horarios existentes que no aparecen se eliminan; sin replace se conservan"""
+    current = {h.id: h for h in existing.select_related('programa')}
+    by_natural_key = {}
+    for horario in current.values():
+        by_natural_key.setdefault((horario.programa_id, horario.dia_semana, horario.hora_inicio), []).append(horario)
+
+    errors = [
+        f"Fila {row['fila']}: el horario {row['id']} no existe"
+        for row in cleaned if row['id'] is not None and row['id'] not in current
+    ]
+    if errors:
+        raise ValidationError(errors)
+
+    claimed = {row['id'] for row in cleaned if row['id'] is not None}
+    to_create, to_update, unchanged = [], [], []
+    for row in cleaned:
+        horario = current.get(row['id']) if row['id'] is not None else None
+        if horario is None:
+            key = (row['programa'].id, row['dia_semana'], row['hora_inicio'])
+            horario = next((h for h in by_natural_key.get(key, []) if h.id not in claimed), None)
+            if horario is not None:
+                claimed.add(horario.id)
+        if horario is None:
+            to_create.append((row, HorarioPrograma(
+                programa=row['programa'],
+                dia_semana=row['dia_semana'],
+                hora_inicio=row['hora_inicio'],
+                hora_fin=row['hora_fin'],
+                activo=row['activo'],
+            )))
+            continue
+
+        before = _row(horario)
+        horario.programa = row['programa']
+        horario.dia_semana = row['dia_semana']
+        horario.hora_inicio = row['hora_inicio']
+        horario.hora_fin = row['hora_fin']
+        horario.activo = row['activo']
+        after = _row(horario)
+        if before == after:
+            unchanged.append((row, horario))
+        else:
+            to_update.append((row, horario, before))
+
+    kept = [h for h in current.values() if h.id not in claimed]
+    return {
+        'create': to_create,
+        'update': to_update,
+        'unchanged': unchanged,
+        'delete': kept if replace else [],
+        'kept': [] if replace else kept,
+    }
+
+
+def _label(row=None, horario=None):
+    if row is not None:
+        programa, dia, inicio, fin = row['programa'], row['dia_semana'], row['hora_inicio'], row['hora_fin']
+        origen = f"Fila {row['fila']}"
+    else:
+        programa, dia, inicio, fin = horario.programa, horario.dia_semana, horario.hora_inicio, horario.hora_fin
+        origen = f'Horario #{horario.id}'
+    return f"{origen} ({programa.nombre}, {DIAS[dia]} {inicio.strftime('%H:%M')}-{fin.strftime('%H:%M')})"
+
+
+def find_conflicts(rows, others=()):
+    """solapes del estado final: filas propuestas mas horarios existentes que se mantienen.
+    solo cuentan los horarios activos de programas activos (los que salen al aire)"""
+    slots = [
+        (('fila', index), row['dia_semana'], row['hora_inicio'], row['hora_fin'])
+        for index, row in enumerate(rows) if row['activo'] and row['programa'].activo
+    ]
+    slots.extend(
+        (('horario', index), h.dia_semana, h.hora_inicio, h.hora_fin)
+        for index, h in enumerate(others) if h.activo and h.programa.activo
+    )
+
+    def label(key):
+        kind, index = key
+        return _label(row=rows[index]) if kind == 'fila' else _label(horario=others[index])
+
+    return [f'{label(a)} se solapa con {label(b)}' for a, b in find_overlaps(slots)]
+
+
+def _summary(plan, applied):
+    return {
+        'aplicado': applied,
+        'creados': len(plan['create']),
+        'actualizados': len(plan['update']),
+        'eliminados': len(plan['delete']),
+        'sin_cambios': len(plan['unchanged']),
+        'cambios': {
+            'creados': [
+                {**_row(horario), 'fila': row['fila']}
+                for row, horario in plan['create']
+            ],
+            'actualizados': [
+                {'id': horario.id, 'fila': row['fila'], 'antes': before, 'despues': _row(horario)}
+                for row, horario, before in plan['update']
+            ],
+            'eliminados': [_row(horario) for horario in plan['delete']],
+        },
+    }
+
+
+def _apply(plan):
+    """una transaccion: borrado, bulk_update y bulk_create. bulk_update y bulk_create no disparan señales, pero
+    delete() envia post_delete por fila: se silencian y el indice y el aviso se actualizan una sola vez al confirmar"""
+    with schedule_signals_muted():
+        if plan['delete']:
+            HorarioPrograma.objects.filter(id__in=[h.id for h in plan['delete']]).delete()
+        if plan['update']:
+            HorarioPrograma.objects.bulk_update([h for _, h, _ in plan['update']], UPDATE_FIELDS, batch_size=BATCH_SIZE)
+        if plan['create']:
+            HorarioPrograma.objects.bulk_create([h for _, h in plan['create']], batch_size=BATCH_SIZE)
+
+
+def _announce(summary, titulo, enlace):
+    from apps.notifications.signals import crear_notificacion_para_staff
+
+    invalidate_schedule()
+    crear_notificacion_para_staff(
+        tipo='programa',
+        titulo=titulo,
+        mensaje=(
+            f"{summary['creados']} horarios nuevos, {summary['actualizados']} modificados "
+            f"y {summary['eliminados']} eliminados"
+        ),
+        enlace=enlace,
+        content_type='horario',
+    )
+
+
+def import_schedule(rows, replace=True, dry_run=False):
+    """importar la semana. lanza ValidationError con la lista de problemas (formato o solapes) sin tocar nada.
+    con dry_run solo se devuelve la diferencia"""
+    cleaned = clean_rows(rows)
+    with transaction.atomic():
+        plan = plan_changes(cleaned, HorarioPrograma.objects.select_for_update(), replace=replace)
+        conflicts = find_conflicts(cleaned, plan['kept'])
+        if conflicts:
+            raise ValidationError(conflicts)
+        if dry_run:
+            return _summary(plan, applied=False)
+
+        _apply(plan)
+        summary = _summary(plan, applied=True)
+        if plan['create'] or plan['update'] or plan['delete']:
+            transaction.on_commit(lambda: _announce(summary, 'Programación semanal actualizada', '/dashboard/radio/'))
+    return summary
+
+
+def program_slot_rows(programa, dias, hora_inicio, hora_fin):
+    """filas de importacion para un programa que sale los dias indicados en el mismo horario.
+    lanza ValidationError con las mismas reglas que clean_rows"""
+    rows = []
+    errors = []
+    for fila, dia in enumerate(dias, start=1):
+        try:
+            dia = int(dia)
+        except (TypeError, ValueError):
+            errors.append(f'Fila {fila}: dia_semana debe ser un número')
+            continue
+        error = slot_error(dia, hora_inicio, hora_fin)
+        if error:
+            errors.append(f'{DIAS[dia]}: {error}' if 0 <= dia <= 6 else f'Fila {fila}: {error}')
+            continue
+        rows.append({'fila': fila, 'id': None, 'programa': programa, 'dia_semana': dia,
+                     'hora_inicio': hora_inicio, 'hora_fin': hora_fin, 'activo': True})
+    if errors:
+        raise ValidationError(errors)
+    return rows
+
+
+def set_program_schedule(programa, rows):
+    """reemplazar los horarios de un programa aplicando solo la diferencia, con un unico aviso.
+    los solapes se validan dentro de la transaccion con los horarios bloqueados (como import_schedule),
+    asi dos ediciones simultaneas no pueden dejar la semana solapada. lanza ValidationError con los conflictos"""
+    with transaction.atomic():
+        locked = list(HorarioPrograma.objects.select_for_update().select_related('programa'))
+        others = [h for h in locked if h.programa_id != programa.id]
+        conflicts = find_conflicts(rows, others)
+        if conflicts:
+            raise ValidationError(conflicts)
+
+        plan = plan_changes(rows, HorarioPrograma.objects.filter(programa_id=programa.id))
+        _apply(plan)
+        summary = _summary(plan, applied=True)
+        if plan['create'] or plan['update'] or plan['delete']:
+            transaction.on_commit(lambda: _announce(
+                summary, f'Horarios actualizados: {programa.nombre}', f'/dashboard/radio/?programa={programa.id}'
+            ))
+    return summary
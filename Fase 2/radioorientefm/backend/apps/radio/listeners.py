@@ -0,0 +1,115 @@
+"""conteo de oyentes concurrentes del reproductor con heartbeats, sin escribir en la base de datos por heartbeat.
+cada sesion suma una vez por intervalo a un contador en la cache compartida; las sesiones que dejan de latir
+desaparecen solas al cambiar de intervalo (ttl). el mantenimiento periodico (maintenance.py) guarda una fila por minuto
+con el promedio y el pico; el heartbeat solo toca la cache"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+#minutos hacia atras que se recuperan si el mantenimiento estuvo detenido
+MAX_BACKFILL_MINUTES = 10
+
+FLUSHED_KEY = 'radio:oyentes:minuto_guardado'
+
+
+class ListenerTracker:
+    """los clientes laten cada `heartbeat` segundos; los contadores usan intervalos del doble para no perder latidos"""
+
+    def __init__(self, heartbeat=None, clock=time.time):
+        self.heartbeat = heartbeat or getattr(settings, 'RADIO_LISTENER_HEARTBEAT', 15)
+        self.bucket_seconds = self.heartbeat * 2
+        self.clock = clock
+        self.heartbeats = 0
+        self.flushed_rows = 0
+
+    def _bucket(self, now):
+        return int(now // self.bucket_seconds)
+
+    @staticmethod
+    def _counter_key(bucket):
+        return f'radio:oyentes:intervalo:{bucket}'
+
+    def beat(self, session_id):
+        """registrar un latido del reproductor y devolver los oyentes actuales"""
+        now = self.clock()
+        bucket = self._bucket(now)
+        session_key = f'radio:oyente:{session_id}'
+        self.heartbeats += 1
+
+        if cache.get(session_key) != bucket:
+            #primer latido de la sesion en este intervalo
+            cache.set(session_key, bucket, self.bucket_seconds * 2)
+            counter = self._counter_key(bucket)
+            #conservar los contadores lo suficiente para guardar minutos atrasados
+            cache.add(counter, 0, (MAX_BACKFILL_MINUTES + 2) * 60)
+            try:
+                cache.incr(counter)
+            except ValueError:
+                cache.set(counter, 1, (MAX_BACKFILL_MINUTES + 2) * 60)
+        return self.count(now)
+
+    def count(self, now=None):
+        """oyentes concurrentes: el intervalo anterior (completo) o el actual si ya tiene mas"""
+        bucket = self._bucket(now or self.clock())
+        values = cache.get_many([self._counter_key(bucket - 1), self._counter_key(bucket)])
+        return max(values.values(), default=0)
+
+    def flush_pending(self, now, renew=None):
+        """guardar los minutos completos que falten hasta `now` (epoch). lo llama el mantenimiento, bajo su lock;
+        renew() se llama tras cada minuto guardado y corta el backfill si el lock ya no es nuestro"""
+        minute = int(now // 60)
+        last = cache.get(FLUSHED_KEY)
+        if last is not None and last >= minute - 1:
+            return 0
+        start = minute - MAX_BACKFILL_MINUTES if last is None else max(last + 1, minute - MAX_BACKFILL_MINUTES)
+        saved = 0
+        for pending in range(start, minute):
+            saved += self.flush_minutes([pending])
+            cache.set(FLUSHED_KEY, pending, None)
+            if renew is not None and not renew():
+                break
+        return saved
+
+    def flush_minutes(self, minutes):
+        """guardar promedio y pico de los intervalos de cada minuto (indices epoch/60) con oyentes"""
+        from .models import OyentesRadioMinuto
+
+        rows = []
+        for minute in minutes:
+            first = self._bucket(minute * 60)
+            last = self._bucket(minute * 60 + 59)
+            keys = [self._counter_key(b) for b in range(first, last + 1)]
+            values = cache.get_many(keys)
+            counts = [values.get(k, 0) for k in keys]
+            if not any(counts):
+                continue
+            rows.append(OyentesRadioMinuto(
+                minuto=datetime.fromtimestamp(minute * 60, tz=dt_timezone.utc),
+                oyentes=round(sum(counts) / len(counts)),
+                pico=max(counts),
+            ))
+        if rows:
+            OyentesRadioMinuto.objects.bulk_create(rows, ignore_conflicts=True)
+            self.flushed_rows += len(rows)
+        return len(rows)
+
+    def stats(self):
+        return {
+            'listeners': self.count(),
+            'heartbeats': self.heartbeats,
+            'flushed_rows': self.flushed_rows,
+            'heartbeat_interval': self.heartbeat,
+        }
+
+
+_tracker = None
+
+
+def get_listener_tracker():
+    """obtener contador de oyentes unico del proceso"""
+    global _tracker
+    if _tracker is None:
+        _tracker = ListenerTracker()
+    return _tracker
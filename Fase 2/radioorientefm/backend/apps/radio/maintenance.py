@@ -0,0 +1,103 @@
+"""mantenimiento periodico de las estadisticas de escucha, fuera de las peticiones de heartbeat:
+guardar los minutos de oyentes, cerrar sesiones inactivas y consolidar las horas completas.
+lo corre un hilo de fondo por proceso (asgi) o el comando run_radio_maintenance; un lock en la cache compartida
+asegura que un solo proceso trabaje a la vez y se renueva en cada paso de un backfill largo"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_LOCK_KEY = 'radio:oyentes:mantenimiento'
+
+
+class CacheLock:
+    """lock con dueño en la cache compartida. renew() extiende la expiracion mientras el trabajo sigue;
+    release() solo borra el lock si todavia es nuestro (no el de otro proceso que lo tomo tras expirar)"""
+
+    def __init__(self, key, ttl):
+        self.key = key
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+
+    def acquire(self):
+        return cache.add(self.key, self.token, self.ttl)
+
+    def renew(self):
+        """true si el lock sigue siendo nuestro"""
+        if cache.get(self.key) != self.token:
+            return False
+        return cache.touch(self.key, self.ttl)
+
+    def release(self):
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+def run_maintenance(now=None):
+    """una pasada completa (now en epoch). devuelve false si otro proceso la esta haciendo"""
+    from .listeners import get_listener_tracker
+    from .rollups import rollup_pending
+    from .sessions import get_session_recorder
+
+    now = now or time.time()
+    lock = CacheLock(MAINTENANCE_LOCK_KEY, settings.RADIO_MAINTENANCE_LOCK_TTL)
+    if not lock.acquire():
+        return False
+    try:
+        get_listener_tracker().flush_pending(now, renew=lock.renew)
+        get_session_recorder().close_stale(now)
+        if lock.renew():
+            rollup_pending(now, renew=lock.renew)
+    finally:
+        lock.release()
+    return True
+
+
+class MaintenanceThread:
+    """hilo daemon que corre run_maintenance cada `interval` segundos"""
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.RADIO_MAINTENANCE_INTERVAL
+        self.runs = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='radio-maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            #el hilo usa su propia conexion: descartarla si quedo caida entre pasadas
+            close_old_connections()
+            try:
+                if run_maintenance():
+                    self.runs += 1
+            except Exception as e:
+                logger.warning(f"Radio listening maintenance failed: {e}")
+            finally:
+                close_old_connections()
+
+
+_thread = None
+
+
+def start_maintenance_thread():
+    """iniciar el hilo de mantenimiento unico del proceso"""
+    global _thread
+    if _thread is None:
+        _thread = MaintenanceThread()
+    _thread.start()
+    return _thread
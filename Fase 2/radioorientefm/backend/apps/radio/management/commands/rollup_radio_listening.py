@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.radio.rollups import rollup_hour
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los rollups horarios de escucha (minutos y oyentes únicos por hora y por programa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Horas completas hacia atrás a recalcular (por defecto 24).',
+        )
+
+    def handle(self, *args, **options):
+        current_hour = int(timezone.now().timestamp() // 3600)
+        sesiones = 0
+        for hour_index in range(current_hour - options['horas'], current_hour):
+            sesiones += rollup_hour(hour_index)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups recalculados para {options['horas']} horas ({sesiones} segmentos de sesión)"
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.radio.maintenance import run_maintenance
+
+
+class Command(BaseCommand):
+    help = 'Guarda los minutos de oyentes, cierra sesiones inactivas y consolida las horas completas de escucha'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cada',
+            type=int,
+            default=0,
+            help='Repetir cada N segundos en vez de hacer una sola pasada (por defecto 0).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            if run_maintenance():
+                self.stdout.write(self.style.SUCCESS('Mantenimiento de escucha completado'))
+            else:
+                self.stdout.write(self.style.WARNING('Otro proceso está haciendo el mantenimiento'))
+            if not options['cada']:
+                return
+            time.sleep(options['cada'])
@@ -9,16 +9,13 @@ def remove_foto_url_if_exists(apps, schema_editor):
     #verificar si el campo existe en la base de datos
     if hasattr(Conductor, 'foto_url'):
         field = Conductor._meta.get_field('foto_url')
-        with schema_editor.connection.cursor() as cursor:
-            table_name = Conductor._meta.db_table
-            column_name = field.column
-            cursor.execute(
-                "SELECT column_name FROM information_schema.columns WHERE table_name=%s AND column_name=%s",
-                [table_name, column_name]
-            )
-            if cursor.fetchone():
-                #si la columna existe, la eliminamos
-                schema_editor.remove_field(Conductor, field)
+        connection = schema_editor.connection
+        #introspeccion de django en vez de information_schema: sqlite no la tiene
+        with connection.cursor() as cursor:
+            columns = [c.name for c in connection.introspection.get_table_description(cursor, Conductor._meta.db_table)]
+        if field.column in columns:
+            #si la columna existe, la eliminamos
+            schema_editor.remove_field(Conductor, field)
 
 
 class Migration(migrations.Migration):
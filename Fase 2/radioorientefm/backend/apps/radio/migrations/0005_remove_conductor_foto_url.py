@@ -9,9 +9,15 @@ class Migration(migrations.Migration):
         ('radio', '0004_remove_conductor_foto_url'),
     ]
 
+    #la columna ya la quita 0004 si existe: aqui solo se actualiza el estado (en una base nueva fallaba al
+    #intentar quitarla dos veces)
     operations = [
-        migrations.RemoveField(
-            model_name='conductor',
-            name='foto_url',
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='conductor',
+                    name='foto_url',
+                ),
+            ],
         ),
     ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radio', '0009_estacionradio_live_stream_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OyentesRadioMinuto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minuto', models.DateTimeField(unique=True)),
+                ('oyentes', models.PositiveIntegerField(default=0)),
+                ('pico', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Oyentes por Minuto',
+                'verbose_name_plural': 'Oyentes por Minuto',
+                'db_table': 'oyentes_radio_minuto',
+                'ordering': ['-minuto'],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radio', '0010_oyentes_radio_minuto'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OyentesRadioHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(unique=True)),
+                ('minutos_escucha', models.FloatField(default=0)),
+                ('sesiones', models.PositiveIntegerField(default=0)),
+                ('oyentes_unicos', models.PositiveIntegerField(default=0)),
+                ('hll', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Oyentes por Hora',
+                'verbose_name_plural': 'Oyentes por Hora',
+                'db_table': 'oyentes_radio_hora',
+                'ordering': ['-hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OyentesProgramaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField()),
+                ('minutos_escucha', models.FloatField(default=0)),
+                ('oyentes_unicos', models.PositiveIntegerField(default=0)),
+                ('hll', models.BinaryField()),
+                ('programa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='oyentes_por_hora', to='radio.programa')),
+            ],
+            options={
+                'verbose_name': 'Oyentes por Programa y Hora',
+                'verbose_name_plural': 'Oyentes por Programa y Hora',
+                'db_table': 'oyentes_programa_hora',
+                'unique_together': {('hora', 'programa')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SesionEscucha',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(max_length=64)),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+                ('duracion_segundos', models.PositiveIntegerField(default=0)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sesiones_escucha', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Sesión de Escucha',
+                'verbose_name_plural': 'Sesiones de Escucha',
+                'db_table': 'sesion_escucha',
+                'indexes': [models.Index(fields=['inicio'], name='sesion_escu_inicio_b52cb3_idx'), models.Index(fields=['fin'], name='sesion_escu_fin_aa651f_idx'), models.Index(fields=['session_id'], name='sesion_escu_session_72abfb_idx')],
+            },
+        ),
+    ]
@@ -79,7 +79,8 @@ class Programa(models.Model):
     def save(self, *args, **kwargs):
         #si no hay una estación asignada, asigna la primera estación disponible
         if not self.estacion_id:
-            estacion = EstacionRadio.objects.first()
+            from .state import get_station
+            estacion = get_station()
             if estacion:
                 self.estacion = estacion
         super().save(*args, **kwargs)
@@ -93,23 +94,14 @@ class Programa(models.Model):
         return self.nombre
 
     def get_dias_display(self):
-        """retorna los días de la semana en formato legible"""
-        dias_map = {
-            0: 'Dom', 1: 'Lun', 2: 'Mar', 3: 'Mié',
-            4: 'Jue', 5: 'Vie', 6: 'Sáb'
-        }
-        horarios = self.horarios.filter(activo=True).order_by('dia_semana')
-        if not horarios:
-            return "Sin horario"
-        dias = [dias_map[h.dia_semana] for h in horarios]
-        return ", ".join(dias)
+        """retorna los días de la semana en formato legible (desde el indice de programacion, sin consultas)"""
+        from .schedule import get_schedule
+        return get_schedule().dias_display(self.id)
 
     def get_horario_display(self):
         """retorna el horario en formato legible"""
-        horarios = self.horarios.filter(activo=True).first()
-        if not horarios:
-            return "Sin horario"
-        return f"{horarios.hora_inicio.strftime('%H:%M')} - {horarios.hora_fin.strftime('%H:%M')}"
+        from .schedule import get_schedule
+        return get_schedule().horario_display(self.id)
 
 class ProgramaConductor(models.Model):
     """relación muchos a muchos entre programas y conductores"""
@@ -168,3 +160,81 @@ class ReproduccionRadio(models.Model):
 
     def __str__(self):
         return f"{self.usuario.username} - {self.estacion.nombre} - {self.fecha_reproduccion}"
+
+class OyentesRadioMinuto(models.Model):
+    """serie de tiempo compacta de oyentes concurrentes: una fila por minuto con oyentes"""
+    minuto = models.DateTimeField(unique=True)
+    #promedio de oyentes concurrentes en el minuto
+    oyentes = models.PositiveIntegerField(default=0)
+    pico = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'oyentes_radio_minuto'
+        ordering = ['-minuto']
+        verbose_name = 'Oyentes por Minuto'
+        verbose_name_plural = 'Oyentes por Minuto'
+
+    def __str__(self):
+        return f"{self.minuto:%Y-%m-%d %H:%M} - {self.oyentes} oyentes (pico {self.pico})"
+
+class SesionEscucha(models.Model):
+    """sesion de escucha del reproductor: desde el primer hasta el ultimo heartbeat"""
+    session_id = models.CharField(max_length=64)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sesiones_escucha'
+    )
+    inicio = models.DateTimeField()
+    #null mientras la sesion sigue abierta
+    fin = models.DateTimeField(null=True, blank=True)
+    duracion_segundos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'sesion_escucha'
+        verbose_name = 'Sesión de Escucha'
+        verbose_name_plural = 'Sesiones de Escucha'
+        indexes = [
+            models.Index(fields=['inicio']),
+            models.Index(fields=['fin']),
+            models.Index(fields=['session_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} - {self.inicio:%Y-%m-%d %H:%M} ({self.duracion_segundos}s)"
+
+class OyentesRadioHora(models.Model):
+    """rollup horario de las sesiones de escucha. hll: registros hyperloglog de los oyentes de la hora"""
+    hora = models.DateTimeField(unique=True)
+    minutos_escucha = models.FloatField(default=0)
+    sesiones = models.PositiveIntegerField(default=0)
+    oyentes_unicos = models.PositiveIntegerField(default=0)
+    hll = models.BinaryField()
+
+    class Meta:
+        db_table = 'oyentes_radio_hora'
+        ordering = ['-hora']
+        verbose_name = 'Oyentes por Hora'
+        verbose_name_plural = 'Oyentes por Hora'
+
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H:00} - {self.oyentes_unicos} oyentes"
+
+class OyentesProgramaHora(models.Model):
+    """rollup horario por programa al aire (minutos escuchados y oyentes unicos)"""
+    hora = models.DateTimeField()
+    programa = models.ForeignKey(Programa, on_delete=models.CASCADE, related_name='oyentes_por_hora')
+    minutos_escucha = models.FloatField(default=0)
+    oyentes_unicos = models.PositiveIntegerField(default=0)
+    hll = models.BinaryField()
+
+    class Meta:
+        db_table = 'oyentes_programa_hora'
+        unique_together = ['hora', 'programa']
+        verbose_name = 'Oyentes por Programa y Hora'
+        verbose_name_plural = 'Oyentes por Programa y Hora'
+
+    def __str__(self):
+        return f"{self.programa_id} {self.hora:%Y-%m-%d %H:00} - {self.minutos_escucha:.0f} min"
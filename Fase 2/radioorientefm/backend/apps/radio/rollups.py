@@ -0,0 +1,137 @@
+"""rollups horarios de las sesiones de escucha: minutos escuchados y oyentes unicos (hyperloglog) por hora y por
+programa al aire. el dashboard lee estas tablas y combina los hll en vez de recorrer las sesiones"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .hll import HyperLogLog
+from .models import OyentesProgramaHora, OyentesRadioHora, SesionEscucha
+from .schedule import get_schedule, week_second
+
+#ultima hora (epoch / 3600) ya consolidada
+ROLLED_UP_KEY = 'radio:oyentes:hora_consolidada'
+#horas hacia atras que se recuperan si el proceso estuvo detenido
+MAX_BACKFILL_HOURS = 24
+
+
+def _hour_start(hour_index):
+    return datetime.fromtimestamp(hour_index * 3600, tz=dt_timezone.utc)
+
+
+def _listener_key(session_id, usuario_id):
+    #un usuario con sesion iniciada cuenta una vez aunque escuche desde varios dispositivos
+    return f'u{usuario_id}' if usuario_id else f's{session_id}'
+
+
+def _programs_by_minute(hour_start):
+    """programa al aire en cada minuto de la hora (indice semanal de programacion). none si no hay programa"""
+    schedule = get_schedule()
+    return [schedule.program_at(week_second(hour_start + timedelta(minutes=minute))) for minute in range(60)]
+
+
+def rollup_hour(hour_index, now=None):
+    """consolidar una hora (indice epoch / 3600). idempotente: reemplaza los rollups existentes de esa hora"""
+    start = _hour_start(hour_index)
+    end = start + timedelta(hours=1)
+    now = now or timezone.now()
+
+    sesiones = SesionEscucha.objects.filter(inicio__lt=end).filter(
+        Q(fin__gt=start) | Q(fin__isnull=True)
+    ).values_list('session_id', 'usuario_id', 'inicio', 'fin')
+
+    programs = _programs_by_minute(start)
+    total_hll = HyperLogLog()
+    total_seconds = 0.0
+    session_count = 0
+    program_seconds = defaultdict(float)
+    program_hll = defaultdict(HyperLogLog)
+
+    for session_id, usuario_id, inicio, fin in sesiones.iterator(chunk_size=2000):
+        #sesion abierta: sigue latiendo hasta ahora
+        seg_start = max(inicio, start)
+        seg_end = min(fin or now, end)
+        if seg_end <= seg_start:
+            continue
+        listener = _listener_key(session_id, usuario_id)
+        session_count += 1
+        total_hll.add(listener)
+        total_seconds += (seg_end - seg_start).total_seconds()
+
+        #repartir los segundos entre los programas de cada minuto cubierto
+        first = int((seg_start - start).total_seconds() // 60)
+        last = int(((seg_end - start).total_seconds() - 1) // 60)
+        seen = set()
+        for minute in range(first, last + 1):
+            programa_id = programs[minute]
+            if programa_id is None:
+                continue
+            minute_start = start + timedelta(minutes=minute)
+            overlap = min(seg_end, minute_start + timedelta(minutes=1)) - max(seg_start, minute_start)
+            program_seconds[programa_id] += overlap.total_seconds()
+            if programa_id not in seen:
+                seen.add(programa_id)
+                program_hll[programa_id].add(listener)
+
+    with transaction.atomic():
+        OyentesRadioHora.objects.filter(hora=start).delete()
+        OyentesProgramaHora.objects.filter(hora=start).delete()
+        if session_count:
+            OyentesRadioHora.objects.create(
+                hora=start,
+                minutos_escucha=round(total_seconds / 60, 2),
+                sesiones=session_count,
+                oyentes_unicos=total_hll.count(),
+                hll=total_hll.to_bytes(),
+            )
+            OyentesProgramaHora.objects.bulk_create([
+                OyentesProgramaHora(
+                    hora=start,
+                    programa_id=programa_id,
+                    minutos_escucha=round(seconds / 60, 2),
+                    oyentes_unicos=program_hll[programa_id].count(),
+                    hll=program_hll[programa_id].to_bytes(),
+                )
+                for programa_id, seconds in program_seconds.items()
+            ])
+    return session_count
+
+
+def rollup_pending(now, renew=None):
+    """consolidar las horas completas que falten (now en epoch). lo llama el mantenimiento, bajo su lock;
+    renew() se llama tras cada hora y corta el backfill si el lock ya no es nuestro"""
+    current_hour = int(now // 3600)
+    last = cache.get(ROLLED_UP_KEY)
+    if last is not None and last >= current_hour - 1:
+        return 0
+    first = current_hour - 1 if last is None else max(last + 1, current_hour - MAX_BACKFILL_HOURS)
+    done = 0
+    for hour_index in range(first, current_hour):
+        rollup_hour(hour_index, now=datetime.fromtimestamp(now, tz=dt_timezone.utc))
+        cache.set(ROLLED_UP_KEY, hour_index, None)
+        done += 1
+        if renew is not None and not renew():
+            break
+    return done
+
+
+def listening_summary(since=None):
+    """minutos escuchados y oyentes unicos desde `since` (todo el historial si es none), leyendo solo rollups"""
+    rows = OyentesRadioHora.objects.all()
+    if since is not None:
+        rows = rows.filter(hora__gte=since)
+
+    minutes = 0.0
+    merged = None
+    for minutos, hll in rows.values_list('minutos_escucha', 'hll').iterator():
+        minutes += minutos
+        sketch = HyperLogLog.from_bytes(bytes(hll))
+        merged = sketch if merged is None else merged.merge(sketch)
+    return {
+        'minutos_escucha': int(round(minutes)),
+        'oyentes_unicos': merged.count() if merged is not None else 0,
+    }
+
@@ -0,0 +1,195 @@
+"""indice semanal de la programacion en memoria. los horarios activos se aplanan a intervalos en segundos de la
+semana (domingo 00:00 = 0) ordenados por inicio; "que suena ahora" y "que sigue" son una busqueda bisect.
+se reconstruye una vez por cambio de Programa, HorarioPrograma, ProgramaConductor o Conductor (version compartida)"""
+import bisect
+import hashlib
+import json
+from collections import defaultdict
+
+from django.utils import timezone
+
+from apps.chat.versioning import VersionedLocalCache
+
+VERSION_CACHE_KEY = 'radio:programacion:version'
+
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+DIAS_CORTOS = {0: 'Dom', 1: 'Lun', 2: 'Mar', 3: 'Mié', 4: 'Jue', 5: 'Vie', 6: 'Sáb'}
+DIAS = ['Domingo', 'Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+
+
+def _seconds(t):
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def week_second(dt):
+    """segundo de la semana en hora local de la radio. dia_semana: 0 = domingo"""
+    local = timezone.localtime(dt) if timezone.is_aware(dt) else dt
+    dia = (local.weekday() + 1) % 7
+    return dia * DAY_SECONDS + _seconds(local.time())
+
+
+def slot_intervals(dia, hora_inicio, hora_fin):
+    """intervalos [inicio, fin) en segundos de la semana que ocupa un horario"""
+    start = dia * DAY_SECONDS + _seconds(hora_inicio)
+    end = dia * DAY_SECONDS + _seconds(hora_fin)
+    if end <= start:
+        #horario nocturno: sigue el dia siguiente
+        end += DAY_SECONDS
+    if end > WEEK_SECONDS:
+        #sabado por la noche: la cola cae al comienzo de la semana
+        return [(start, WEEK_SECONDS), (0, end - WEEK_SECONDS)]
+    return [(start, end)]
+
+
+def find_overlaps(slots):
+    """barrido de intervalos sobre la semana. slots: [(clave, dia, hora_inicio, hora_fin)].
+    devuelve pares (clave, clave) que se pisan; cada horario se compara con el que llega mas lejos antes que el"""
+    intervals = sorted(
+        ((start, end, key)
+         for key, dia, hora_inicio, hora_fin in slots
+         for start, end in slot_intervals(dia, hora_inicio, hora_fin)),
+        key=lambda i: (i[0], i[1]),
+    )
+    overlaps = []
+    seen = set()
+    reach_end, reach_key = -1, None
+    for start, end, key in intervals:
+        if start < reach_end and reach_key != key and (reach_key, key) not in seen:
+            seen.add((reach_key, key))
+            overlaps.append((reach_key, key))
+        if end > reach_end:
+            reach_end, reach_key = end, key
+    return overlaps
+
+
+class ScheduleSnapshot:
+    """foto inmutable de la programacion: intervalos ordenados, programas ya serializados y grilla semanal"""
+
+    def __init__(self, programs, slots, displays=None):
+        #programs: {programa_id: dict serializado}; slots: [(programa_id, horario_id, dia, hora_inicio, hora_fin)]
+        #displays: {programa_id: (dias, horario)} para los textos del admin
+        self.programs = programs
+        self.displays = displays or {}
+        intervals = []
+        for programa_id, horario_id, dia, hora_inicio, hora_fin in slots:
+            slot = (programa_id, horario_id, hora_inicio, hora_fin)
+            intervals.extend((start, end, slot) for start, end in slot_intervals(dia, hora_inicio, hora_fin))
+        intervals.sort(key=lambda i: (i[0], i[1]))
+        self.intervals = intervals
+        self.starts = [i[0] for i in intervals]
+
+        self.grid = self._build_grid(slots)
+        self.etag = hashlib.md5(json.dumps(self.grid, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _build_grid(self, slots):
+        days = defaultdict(list)
+        for programa_id, horario_id, dia, hora_inicio, hora_fin in sorted(slots, key=lambda s: (s[2], s[3])):
+            program = self.programs[programa_id]
+            days[dia].append({
+                'horario_id': horario_id,
+                'programa_id': programa_id,
+                'nombre': program['nombre'],
+                'hora_inicio': hora_inicio.strftime('%H:%M'),
+                'hora_fin': hora_fin.strftime('%H:%M'),
+                'conductores': [c['conductor_nombre'] for c in program['conductores']],
+            })
+        return [{'dia_semana': dia, 'dia': DIAS[dia], 'programas': days.get(dia, [])} for dia in range(7)]
+
+    def _entry(self, index):
+        start, end, (programa_id, horario_id, hora_inicio, hora_fin) = self.intervals[index]
+        return {
+            'programa': self.programs[programa_id],
+            'horario_id': horario_id,
+            'hora_inicio': hora_inicio.strftime('%H:%M'),
+            'hora_fin': hora_fin.strftime('%H:%M'),
+        }
+
+    def _current_index(self, second):
+        index = bisect.bisect_right(self.starts, second) - 1
+        if index >= 0 and second < self.intervals[index][1]:
+            return index
+        return None
+
+    def program_at(self, second):
+        """id del programa al aire en ese segundo de la semana (o None)"""
+        index = self._current_index(second)
+        return self.intervals[index][2][0] if index is not None else None
+
+    def now_and_next(self, dt=None):
+        """(actual, siguiente, segundos hasta el siguiente) para el instante dt (ahora por defecto)"""
+        if not self.intervals:
+            return None, None, None
+        second = week_second(dt or timezone.now())
+        current = self._current_index(second)
+        if current is not None:
+            _, on_air_until, (current_program, current_slot, _, _) = self.intervals[current]
+
+        #primer intervalo que empieza despues de ahora y no continua el bloque actual: la cola del mismo horario
+        #(sabado a domingo) o un horario del mismo programa pegado al final. otra emision del programa mas tarde si cuenta
+        index = bisect.bisect_right(self.starts, second)
+        for step in range(len(self.intervals)):
+            candidate = (index + step) % len(self.intervals)
+            start, end, (programa_id, horario_id, _, _) = self.intervals[candidate]
+            if current is not None and (
+                horario_id == current_slot
+                or (programa_id == current_program and start == on_air_until % WEEK_SECONDS)
+            ):
+                on_air_until = end
+                continue
+            starts_in = (start - second) % WEEK_SECONDS
+            return (
+                self._entry(current) if current is not None else None,
+                self._entry(candidate),
+                starts_in,
+            )
+        return self._entry(current) if current is not None else None, None, None
+
+    def program_ids_for_day(self, dia):
+        """programas activos con horario ese dia, en orden de id (como el filtro por dia anterior; otro dia: ninguno)"""
+        if not 0 <= dia <= 6:
+            return []
+        return sorted({slot['programa_id'] for slot in self.grid[dia]['programas']})
+
+    def dias_display(self, programa_id):
+        return self.displays.get(programa_id, ('Sin horario', 'Sin horario'))[0]
+
+    def horario_display(self, programa_id):
+        return self.displays.get(programa_id, ('Sin horario', 'Sin horario'))[1]
+
+
+def _build_snapshot():
+    from .models import Programa
+    from .serializers import ProgramaSerializer
+
+    #una sola carga con prefetch; sin request las fotos quedan como rutas relativas
+    queryset = Programa.objects.prefetch_related('horarios', 'conductores__conductor').order_by('id')
+    programs = {}
+    displays = {}
+    slots = []
+    for programa in queryset:
+        #misma salida que ProgramaSerializer: por_dia mantiene su contrato
+        programs[programa.id] = dict(ProgramaSerializer(programa).data)
+        horarios = sorted((h for h in programa.horarios.all() if h.activo), key=lambda h: (h.dia_semana, h.hora_inicio))
+        displays[programa.id] = (
+            ', '.join(DIAS_CORTOS[h.dia_semana] for h in horarios) or 'Sin horario',
+            f"{horarios[0].hora_inicio.strftime('%H:%M')} - {horarios[0].hora_fin.strftime('%H:%M')}"
+            if horarios else 'Sin horario',
+        )
+        if programa.activo:
+            slots.extend((programa.id, h.id, h.dia_semana, h.hora_inicio, h.hora_fin) for h in horarios)
+    return ScheduleSnapshot(programs, slots, displays)
+
+
+_schedule = VersionedLocalCache(VERSION_CACHE_KEY, _build_snapshot)
+
+
+def get_schedule():
+    """indice vigente (se reconstruye solo si cambio la programacion)"""
+    return _schedule.get()
+
+
+def invalidate_schedule():
+    """reconstruir el indice en este y en los demas procesos"""
+    _schedule.invalidate()
@@ -0,0 +1,134 @@
+"""sesiones de escucha a partir de los heartbeats del reproductor.
+una fila por sesion al empezar; el ultimo latido vive en la cache y la fila se cierra al parar o al dejar de latir"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .models import SesionEscucha
+
+#el estado en cache dura mas que cualquier pausa tolerada: la sesion se cierra por inactividad, no por expiracion
+SESSION_STATE_TTL = 6 * 3600
+
+
+#firma de los ids de sesion que entrega el servidor: un cliente no puede inventar sesiones para inflar oyentes
+SESSION_SIGNER_SALT = 'radio.sesion-escucha'
+SESSION_TOKEN_MAX_LENGTH = 128
+
+
+def issue_session_token():
+    """id de sesion nuevo firmado por el servidor"""
+    return signing.Signer(salt=SESSION_SIGNER_SALT).sign(uuid.uuid4().hex)
+
+
+def session_from_token(token):
+    """id de sesion si el token lo emitio este servidor, None si no"""
+    if not token or len(token) > SESSION_TOKEN_MAX_LENGTH:
+        return None
+    try:
+        return signing.Signer(salt=SESSION_SIGNER_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def _state_key(session_id):
+    return f'radio:sesion:{session_id}'
+
+
+def _from_timestamp(ts):
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+class SessionRecorder:
+    """una sesion se da por terminada tras `stale_after` segundos sin latidos"""
+
+    def __init__(self, stale_after=None):
+        heartbeat = getattr(settings, 'RADIO_LISTENER_HEARTBEAT', 15)
+        self.stale_after = stale_after or heartbeat * 3
+        self.opened = 0
+        self.closed = 0
+
+    def touch(self, session_id, usuario_id, now):
+        """registrar un latido (now en epoch). crea la fila solo al empezar una sesion"""
+        key = _state_key(session_id)
+        state = cache.get(key)
+        if state is not None and now - state['ultimo'] <= self.stale_after:
+            state['ultimo'] = now
+            cache.set(key, state, SESSION_STATE_TTL)
+            return state['id']
+
+        if state is not None:
+            #volvio a sonar despues de una pausa larga: cerrar la sesion anterior y abrir otra
+            self._close([(state['id'], state['inicio'], state['ultimo'])])
+
+        sesion = SesionEscucha.objects.create(
+            session_id=session_id,
+            usuario_id=usuario_id,
+            inicio=_from_timestamp(now),
+        )
+        cache.set(key, {'id': sesion.id, 'inicio': now, 'ultimo': now}, SESSION_STATE_TTL)
+        self.opened += 1
+        return sesion.id
+
+    def end(self, session_id, now):
+        """el reproductor se detuvo: cerrar la sesion en su ultimo latido"""
+        key = _state_key(session_id)
+        state = cache.get(key)
+        if state is None:
+            return
+        cache.delete(key)
+        fin = now if now - state['ultimo'] <= self.stale_after else state['ultimo']
+        self._close([(state['id'], state['inicio'], fin)])
+
+    def close_stale(self, now):
+        """cerrar las sesiones abiertas que dejaron de latir. una consulta y un bulk_update por llamada"""
+        open_sessions = list(SesionEscucha.objects.filter(fin__isnull=True).values_list('id', 'session_id', 'inicio'))
+        if not open_sessions:
+            return 0
+
+        states = cache.get_many([_state_key(session_id) for _, session_id, _ in open_sessions])
+        to_close = []
+        stale_keys = []
+        for sesion_id, session_id, inicio in open_sessions:
+            state = states.get(_state_key(session_id))
+            if state is not None and state['id'] == sesion_id:
+                if now - state['ultimo'] <= self.stale_after:
+                    continue
+                to_close.append((sesion_id, state['inicio'], state['ultimo']))
+                stale_keys.append(_state_key(session_id))
+            else:
+                #sin estado (cache reiniciada o sesion reemplazada): cerrar en el inicio conocido
+                to_close.append((sesion_id, inicio.timestamp(), inicio.timestamp()))
+        cache.delete_many(stale_keys)
+        return self._close(to_close)
+
+    def _close(self, sessions):
+        """sessions: [(id, inicio_epoch, fin_epoch)]"""
+        rows = [
+            SesionEscucha(id=sesion_id, fin=_from_timestamp(fin), duracion_segundos=int(max(fin - inicio, 0)))
+            for sesion_id, inicio, fin in sessions
+        ]
+        if rows:
+            SesionEscucha.objects.bulk_update(rows, ['fin', 'duracion_segundos'], batch_size=500)
+            self.closed += len(rows)
+        return len(rows)
+
+    def stats(self):
+        return {
+            'opened': self.opened,
+            'closed': self.closed,
+            'stale_after': self.stale_after,
+        }
+
+
+_recorder = None
+
+
+def get_session_recorder():
+    """obtener registro de sesiones unico del proceso"""
+    global _recorder
+    if _recorder is None:
+        _recorder = SessionRecorder()
+    return _recorder
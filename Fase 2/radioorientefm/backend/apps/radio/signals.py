@@ -0,0 +1,43 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import EstacionRadio, Programa, HorarioPrograma, ProgramaConductor, Conductor
+from .state import invalidate_station
+from .schedule import invalidate_schedule
+
+_muted = threading.local()
+
+
+@contextmanager
+def schedule_signals_muted():
+    """las señales por fila de la programacion no invalidan el indice en este hilo; quien lo usa invalida una vez"""
+    previous = getattr(_muted, 'schedule', False)
+    _muted.schedule = True
+    try:
+        yield
+    finally:
+        _muted.schedule = previous
+
+
+@receiver(post_save, sender=EstacionRadio)
+@receiver(post_delete, sender=EstacionRadio)
+def invalidar_estado_estacion(sender, instance, **kwargs):
+    """recargar el estado de la estacion en todos los procesos"""
+    invalidate_station()
+
+
+@receiver(post_save, sender=Programa)
+@receiver(post_delete, sender=Programa)
+@receiver(post_save, sender=HorarioPrograma)
+@receiver(post_delete, sender=HorarioPrograma)
+@receiver(post_save, sender=ProgramaConductor)
+@receiver(post_delete, sender=ProgramaConductor)
+@receiver(post_save, sender=Conductor)
+@receiver(post_delete, sender=Conductor)
+def invalidar_programacion(sender, instance, **kwargs):
+    """reconstruir el indice semanal de programacion en todos los procesos"""
+    if getattr(_muted, 'schedule', False):
+        return
+    invalidate_schedule()
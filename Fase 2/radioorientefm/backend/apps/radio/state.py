@@ -0,0 +1,35 @@
+"""estado de la estacion cacheado por proceso. chat, estado de la radio y programas lo leen sin consultar la base
+de datos; cualquier guardado de EstacionRadio lo invalida en todos los procesos (contador de version compartido)"""
+from apps.chat.versioning import VersionedLocalCache
+
+VERSION_CACHE_KEY = 'radio:estacion:version'
+
+
+def _load_station():
+    from .models import EstacionRadio
+    return EstacionRadio.objects.order_by('id').first()
+
+
+_station = VersionedLocalCache(VERSION_CACHE_KEY, _load_station)
+
+
+def get_station():
+    """estacion vigente (o None). instancia compartida: solo lectura, para modificarla leerla de la base de datos"""
+    return _station.get()
+
+
+def invalidate_station():
+    """recargar la estacion en este y en los demas procesos"""
+    _station.invalidate()
+
+
+def station_status():
+    """estado publico para los oyentes (mismo formato que /api/chat/radio-status/).
+    listeners_count es el conteo en vivo de los heartbeats del reproductor"""
+    from .listeners import get_listener_tracker
+
+    station = get_station()
+    return {
+        'is_online': station.activo if station else False,
+        'listeners_count': get_listener_tracker().count() if station else 0,
+    }
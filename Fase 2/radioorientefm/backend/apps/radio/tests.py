@@ -0,0 +1,333 @@
+from datetime import datetime, time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.throttling import ScopedRateThrottle
+
+from .bulk_schedule import import_schedule
+from .hll import HyperLogLog
+from .listeners import FLUSHED_KEY, ListenerTracker
+from .maintenance import MAINTENANCE_LOCK_KEY, CacheLock, run_maintenance
+from .models import HorarioPrograma, OyentesRadioMinuto, Programa, SesionEscucha
+from .schedule import VERSION_CACHE_KEY, ScheduleSnapshot, find_overlaps, get_schedule, week_second
+from .serializers import ProgramaSerializer
+
+
+class ListenerHeartbeatTests(TestCase):
+    """los oyentes se cuentan solo con sesiones emitidas por el servidor"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse('radio-listener-heartbeat')
+
+    def _beat(self, session_id=None, client=None):
+        return (client or self.client).post(self.url, {'session_id': session_id}, format='json')
+
+    def test_sin_sesion_emite_una_y_no_cuenta(self):
+        response = self._beat()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['session_id'])
+        self.assertEqual(response.data['listeners_count'], 0)
+        self.assertFalse(SesionEscucha.objects.exists())
+
+    def test_sesion_emitida_cuenta(self):
+        token = self._beat().data['session_id']
+        response = self._beat(token)
+
+        self.assertEqual(response.data['listeners_count'], 1)
+        self.assertEqual(response.data['session_id'], token)
+        self.assertEqual(SesionEscucha.objects.count(), 1)
+
+    def test_sesiones_inventadas_no_inflan_el_conteo(self):
+        for index in range(20):
+            response = self._beat(f'inventada-{index}')
+            self.assertNotEqual(response.data['session_id'], f'inventada-{index}')
+
+        self.assertEqual(response.data['listeners_count'], 0)
+        self.assertFalse(SesionEscucha.objects.exists())
+
+    def test_usuario_cuenta_una_vez_en_varios_dispositivos(self):
+        user = get_user_model().objects.create_user(email='oyente@test.cl', username='oyente', password='x')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+
+        for _ in range(3):
+            token = self._beat(client=client).data['session_id']
+            response = self._beat(token, client=client)
+
+        self.assertEqual(response.data['listeners_count'], 1)
+        self.assertEqual(SesionEscucha.objects.filter(usuario=user).count(), 3)
+
+    def test_throttle_por_ip(self):
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'radio_heartbeat': '5/min'}):
+            statuses = [self._beat().status_code for _ in range(7)]
+
+        self.assertEqual(statuses, [200] * 5 + [429] * 2)
+
+
+class ListenerMaintenanceTests(TestCase):
+    """el heartbeat solo toca la cache; los minutos se guardan en el mantenimiento"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1_700_000_000.0
+        self.tracker = ListenerTracker(heartbeat=15, clock=lambda: self.now)
+
+    def test_heartbeat_no_escribe_en_la_base_de_datos(self):
+        self.tracker.beat('a')
+        self.now += 180
+        with self.assertNumQueries(0):
+            self.tracker.beat('a')
+            self.tracker.beat('b')
+
+        self.assertEqual(self.tracker.count(), 2)
+        self.assertFalse(OyentesRadioMinuto.objects.exists())
+
+    def test_mantenimiento_guarda_los_minutos_pendientes(self):
+        cache.set(FLUSHED_KEY, int(self.now // 60) - 1, None)
+        for _ in range(3):
+            for session in ('a', 'b'):
+                self.tracker.beat(session)
+            self.now += 60
+
+        with mock.patch('apps.radio.listeners.get_listener_tracker', return_value=self.tracker):
+            self.assertTrue(run_maintenance(self.now))
+
+        self.assertEqual(OyentesRadioMinuto.objects.count(), 3)
+        self.assertEqual(set(OyentesRadioMinuto.objects.values_list('pico', flat=True)), {2})
+        self.assertEqual(cache.get(FLUSHED_KEY), int(self.now // 60) - 1)
+        self.assertIsNone(cache.get(MAINTENANCE_LOCK_KEY))
+
+    def test_un_solo_proceso_hace_el_mantenimiento(self):
+        other = CacheLock(MAINTENANCE_LOCK_KEY, 60)
+        self.assertTrue(other.acquire())
+
+        self.assertFalse(run_maintenance(self.now))
+        self.assertEqual(cache.get(MAINTENANCE_LOCK_KEY), other.token)
+
+    def test_lock_ajeno_no_se_libera_ni_renueva(self):
+        lock = CacheLock(MAINTENANCE_LOCK_KEY, 60)
+        self.assertTrue(lock.acquire())
+        #expiro y otro proceso lo tomo
+        cache.set(MAINTENANCE_LOCK_KEY, 'otro', 60)
+
+        self.assertFalse(lock.renew())
+        lock.release()
+        self.assertEqual(cache.get(MAINTENANCE_LOCK_KEY), 'otro')
+
+
+class ScheduleImportTests(TestCase):
+    """la importacion masiva aplica la diferencia e invalida el indice una sola vez"""
+
+    def setUp(self):
+        self.programa = Programa.objects.create(nombre='Matinal')
+
+    def _row(self, dia, inicio, fin, **extra):
+        return {'programa_id': self.programa.id, 'dia_semana': dia, 'hora_inicio': inicio, 'hora_fin': fin, **extra}
+
+    def test_reemplazo_invalida_una_vez(self):
+        for dia in range(1, 4):
+            HorarioPrograma.objects.create(programa=self.programa, dia_semana=dia, hora_inicio=time(8), hora_fin=time(9))
+
+        with mock.patch('apps.chat.versioning.bump_version') as bump, self.captureOnCommitCallbacks(execute=True):
+            summary = import_schedule([self._row(5, '10:00', '11:00')])
+
+        self.assertEqual((summary['creados'], summary['eliminados']), (1, 3))
+        self.assertEqual(bump.call_args_list, [mock.call(VERSION_CACHE_KEY)])
+        self.assertEqual(list(HorarioPrograma.objects.values_list('dia_semana', flat=True)), [5])
+
+    def test_solape_rechaza_sin_tocar_nada(self):
+        HorarioPrograma.objects.create(programa=self.programa, dia_semana=3, hora_inicio=time(8), hora_fin=time(9))
+
+        with self.assertRaises(ValidationError) as error:
+            import_schedule([self._row(1, '08:00', '10:00'), self._row(1, '09:30', '11:00')])
+
+        self.assertEqual(len(error.exception.messages), 1)
+        self.assertEqual(list(HorarioPrograma.objects.values_list('dia_semana', flat=True)), [3])
+
+    def test_solape_con_horarios_que_se_mantienen(self):
+        HorarioPrograma.objects.create(programa=self.programa, dia_semana=1, hora_inicio=time(8), hora_fin=time(9))
+
+        with self.assertRaises(ValidationError):
+            import_schedule([self._row(1, '08:30', '09:30')], replace=False)
+        #pegado al final no es solape
+        summary = import_schedule([self._row(1, '09:00', '10:00')], replace=False)
+
+        self.assertEqual(summary['creados'], 1)
+        self.assertEqual(HorarioPrograma.objects.count(), 2)
+
+
+def _snapshot(*slots):
+    """slots: (programa_id, dia, hora_inicio, hora_fin); cada uno es un horario distinto"""
+    programs = {p: {'id': p, 'nombre': f'Programa {p}', 'conductores': []} for p, _, _, _ in slots}
+    return ScheduleSnapshot(programs, [
+        (programa_id, horario_id, dia, time(*inicio), time(*fin))
+        for horario_id, (programa_id, dia, inicio, fin) in enumerate(slots, start=1)
+    ])
+
+
+class NowAndNextTests(SimpleTestCase):
+    """que suena y que sigue desde el indice semanal"""
+
+    #lunes 19 de octubre de 2026 (dia_semana 1)
+    MONDAY = datetime(2026, 10, 19)
+
+    def _at(self, hour, minute=0):
+        return self.MONDAY.replace(hour=hour, minute=minute)
+
+    def test_programa_que_sale_dos_veces_el_mismo_dia(self):
+        schedule = _snapshot((1, 1, (8,), (9,)), (1, 1, (18,), (19,)), (2, 2, (8,), (9,)))
+
+        actual, siguiente, empieza_en = schedule.now_and_next(self._at(8, 30))
+
+        self.assertEqual(actual['programa']['id'], 1)
+        self.assertEqual((siguiente['programa']['id'], siguiente['hora_inicio']), (1, '18:00'))
+        self.assertEqual(empieza_en, 9.5 * 3600)
+
+    def test_horario_pegado_del_mismo_programa_es_continuacion(self):
+        schedule = _snapshot((1, 1, (8,), (9,)), (1, 1, (9,), (10,)), (2, 1, (10,), (11,)))
+
+        actual, siguiente, empieza_en = schedule.now_and_next(self._at(8, 30))
+
+        self.assertEqual(actual['hora_inicio'], '08:00')
+        self.assertEqual(siguiente['programa']['id'], 2)
+        self.assertEqual(empieza_en, 1.5 * 3600)
+
+    def test_nocturno_del_sabado_sigue_el_domingo(self):
+        schedule = _snapshot((1, 6, (23,), (2,)), (2, 0, (6,), (7,)))
+        sunday = datetime(2026, 10, 18, 1)
+
+        actual, siguiente, empieza_en = schedule.now_and_next(sunday)
+
+        self.assertEqual(actual['programa']['id'], 1)
+        self.assertEqual(siguiente['programa']['id'], 2)
+        self.assertEqual(empieza_en, 5 * 3600)
+
+    def test_sin_programa_al_aire(self):
+        schedule = _snapshot((1, 1, (8,), (9,)))
+
+        actual, siguiente, empieza_en = schedule.now_and_next(self._at(7))
+
+        self.assertIsNone(actual)
+        self.assertEqual(siguiente['programa']['id'], 1)
+        self.assertEqual(empieza_en, 3600)
+
+
+class ProgramasPorDiaTests(TestCase):
+    """por_dia mantiene la salida de ProgramaSerializer aunque lea del indice"""
+
+    def setUp(self):
+        cache.clear()
+        #el indice se invalida al confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            self.programa = Programa.objects.create(nombre='Matinal')
+            HorarioPrograma.objects.create(programa=self.programa, dia_semana=1, hora_inicio=time(8), hora_fin=time(9))
+        self.url = reverse('programa-por-dia')
+
+    def test_misma_forma_que_el_serializer(self):
+        response = self.client.get(self.url, {'dia': 1})
+
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(set(response.data['results'][0]), set(ProgramaSerializer.Meta.fields))
+        self.assertEqual(get_schedule().dias_display(self.programa.id), 'Lun')
+
+    def test_dia_fuera_de_rango_no_devuelve_programas(self):
+        response = self.client.get(self.url, {'dia': 9})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+
+class ScheduleIndexTests(SimpleTestCase):
+    """intervalos semanales, barrido de solapes y programa al aire"""
+
+    def test_semana_empieza_el_domingo(self):
+        self.assertEqual(week_second(datetime(2026, 10, 18)), 0)
+        self.assertEqual(week_second(datetime(2026, 10, 19, 1)), 25 * 3600)
+
+    def test_barrido_detecta_solapes(self):
+        slots = [('a', 1, time(8), time(10)), ('b', 1, time(9), time(11)), ('c', 1, time(11), time(12))]
+
+        self.assertEqual(find_overlaps(slots), [('a', 'b')])
+
+    def test_nocturno_del_sabado_se_solapa_con_el_domingo(self):
+        slots = [('sabado', 6, time(23), time(2)), ('domingo', 0, time(1), time(3))]
+
+        self.assertEqual(find_overlaps(slots), [('sabado', 'domingo')])
+
+    def test_programa_al_aire(self):
+        schedule = _snapshot((1, 1, (8,), (9,)), (2, 6, (23,), (1,)))
+
+        self.assertEqual(schedule.program_at(week_second(datetime(2026, 10, 19, 8, 59))), 1)
+        self.assertIsNone(schedule.program_at(week_second(datetime(2026, 10, 19, 9))))
+        self.assertEqual(schedule.program_at(week_second(datetime(2026, 10, 18, 0, 30))), 2)
+        self.assertEqual(schedule.program_ids_for_day(1), [1])
+
+
+class HyperLogLogTests(SimpleTestCase):
+    """oyentes unicos aproximados y combinables"""
+
+    #tres errores tipicos de la precision por defecto (1.04 / sqrt(2048) ~ 2.3%)
+    TOLERANCE = 0.07
+
+    def test_estimacion_dentro_del_error(self):
+        sketch = HyperLogLog()
+        for index in range(10000):
+            sketch.add(f's{index}')
+            #repetidos no suman
+            sketch.add(f's{index}')
+
+        self.assertAlmostEqual(sketch.count(), 10000, delta=10000 * self.TOLERANCE)
+
+    def test_combinar_equivale_a_la_union(self):
+        morning, evening, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for index in range(3000):
+            morning.add(f'u{index}')
+            union.add(f'u{index}')
+        for index in range(2000, 5000):
+            evening.add(f'u{index}')
+            union.add(f'u{index}')
+
+        merged = HyperLogLog.from_bytes(morning.to_bytes()).merge(evening)
+
+        self.assertEqual(merged.to_bytes(), union.to_bytes())
+        self.assertAlmostEqual(merged.count(), 5000, delta=5000 * self.TOLERANCE)
+
+    def test_precision_distinta_no_se_combina(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=10).merge(HyperLogLog())
+
+
+class ListenerTrackerTests(SimpleTestCase):
+    """oyentes concurrentes por intervalo en la cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1_700_000_010.0
+        self.tracker = ListenerTracker(heartbeat=15, clock=lambda: self.now)
+
+    def test_varios_latidos_de_una_sesion_cuentan_una_vez(self):
+        for _ in range(3):
+            self.tracker.beat('a')
+            self.now += 5
+
+        self.assertEqual(self.tracker.beat('b'), 2)
+
+    def test_sesion_que_deja_de_latir_desaparece(self):
+        self.tracker.beat('a')
+        self.tracker.beat('b')
+        self.now += 30
+
+        self.assertEqual(self.tracker.beat('a'), 2)
+        self.now += 30
+        self.tracker.beat('a')
+
+        self.assertEqual(self.tracker.count(), 1)
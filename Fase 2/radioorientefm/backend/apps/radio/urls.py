@@ -20,7 +20,11 @@ def radio_info(request):
             'program_detail': '/api/radio/programs/{id}/',
             'news': '/api/radio/news/',
             'news_detail': '/api/radio/news/{id}/',
-            'update_song': '/api/radio/update-song/'
+            'update_song': '/api/radio/update-song/',
+            'listener_heartbeat': '/api/radio/escuchando/',
+            'now_playing': '/api/radio/ahora/',
+            'schedule': '/api/radio/programacion/',
+            'schedule_bulk': '/api/radio/programacion/masiva/'
         }
     })
 
@@ -33,6 +37,10 @@ urlpatterns = [
     path('programs/', views.ProgramListView.as_view(), name='program-list'),
     path('programs/<int:pk>/', views.ProgramDetailView.as_view(), name='program-detail'),
     path('update-song/', views.update_current_song, name='update-current-song'),
+    path('escuchando/', views.ListenerHeartbeatView.as_view(), name='radio-listener-heartbeat'),
+    path('ahora/', views.NowPlayingView.as_view(), name='radio-now-playing'),
+    path('programacion/', views.ScheduleGridView.as_view(), name='radio-schedule-grid'),
+    path('programacion/masiva/', views.ScheduleBulkView.as_view(), name='radio-schedule-bulk'),
     path('locutores/activos/', views.LocutoresActivosListView.as_view(), name='api_locutores_activos'),
     path('programas/', views.ProgramaListView.as_view(), name='api_programas_list'),
 ]
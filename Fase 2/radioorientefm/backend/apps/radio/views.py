@@ -1,11 +1,24 @@
+import csv
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from rest_framework.throttling import ScopedRateThrottle
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from apps.common.pagination import StandardResultsSetPagination
 from .models import EstacionRadio, GeneroMusical, Conductor, Programa, ProgramaConductor, HorarioPrograma
+from .state import get_station
+from .schedule import get_schedule
+from .bulk_schedule import export_csv, export_rows, import_schedule, parse_csv, parse_flag
+from .listeners import get_listener_tracker
+from .sessions import get_session_recorder, issue_session_token, session_from_token
 from .serializers import (
     EstacionRadioSerializer, GeneroMusicalSerializer, ConductorSerializer,
     ProgramaSerializer, ProgramaDetailSerializer, ProgramLegacySerializer,
@@ -51,18 +64,18 @@ class ProgramaViewSet(viewsets.ModelViewSet):
 
         try:
             dia = int(dia)
-            queryset = self.queryset.filter(horarios__dia_semana=dia, horarios__activo=True).distinct()
+            #programas ya serializados en el indice semanal: sin join ni distinct por peticion
+            schedule = get_schedule()
+            programas = [with_absolute_photos(schedule.programs[p], request) for p in schedule.program_ids_for_day(dia)]
 
             #aplicar paginacion
             paginator = StandardResultsSetPagination()
-            page = paginator.paginate_queryset(queryset, request)
+            page = paginator.paginate_queryset(programas, request)
 
             if page is not None:
-                serializer = self.get_serializer(page, many=True)
-                return paginator.get_paginated_response(serializer.data)
+                return paginator.get_paginated_response(page)
 
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
+            return Response(programas)
         except ValueError:
             return Response({'error': 'El parámetro dia debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -72,6 +85,90 @@ class HorarioProgramaViewSet(viewsets.ModelViewSet):
     serializer_class = HorarioProgramaSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+def with_absolute_photos(programa, request):
+    """copia del programa serializado en el indice con las fotos de conductores como url absoluta"""
+    return {
+        **programa,
+        'conductores': [
+            {**c, 'conductor_foto': request.build_absolute_uri(c['conductor_foto']) if c['conductor_foto'] else None}
+            for c in programa['conductores']
+        ],
+    }
+
+class NowPlayingView(APIView):
+    """programa al aire y el siguiente, desde el indice semanal en memoria (bisect, sin consultas)"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        actual, siguiente, empieza_en = get_schedule().now_and_next()
+        if actual is not None:
+            actual = {**actual, 'programa': with_absolute_photos(actual['programa'], request)}
+        if siguiente is not None:
+            siguiente = {
+                **siguiente,
+                'programa': with_absolute_photos(siguiente['programa'], request),
+                'empieza_en_segundos': empieza_en,
+            }
+        return Response({
+            'ahora': actual,
+            'siguiente': siguiente,
+            'hora_servidor': timezone.localtime().isoformat(),
+        })
+
+class ScheduleGridView(APIView):
+    """grilla semanal completa ya serializada (misma foto que /ahora/), con etag"""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        schedule = get_schedule()
+        etag = quote_etag(schedule.etag)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(schedule.grid)
+        response['ETag'] = etag
+        return response
+
+class ScheduleBulkView(APIView):
+    """exportar (get) o importar (post) la programacion semanal completa en json o csv.
+    post acepta {'horarios': [...]} o un archivo csv en 'archivo'; 'reemplazar' (por defecto si) elimina los
+    horarios que no vengan y 'simular' solo devuelve la diferencia"""
+    permission_classes = [IsAdminUser]
+    authentication_classes = [TokenAuthentication, SessionAuthentication]
+
+    def get(self, request):
+        if request.query_params.get('formato') == 'csv':
+            response = HttpResponse(export_csv(), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = 'attachment; filename="programacion.csv"'
+            return response
+        return Response({'horarios': export_rows()})
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if archivo is not None:
+            try:
+                rows = parse_csv(archivo.read().decode('utf-8'))
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({'success': False, 'errores': [f'CSV inválido: {e}']}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('horarios')
+            if not isinstance(rows, list):
+                return Response({
+                    'success': False,
+                    'errores': ["Envíe 'horarios' como lista o un archivo CSV en 'archivo'"]
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        flags = {**request.query_params.dict(), **{k: request.data.get(k) for k in ('reemplazar', 'simular') if k in request.data}}
+        try:
+            summary = import_schedule(
+                rows,
+                replace=parse_flag(flags.get('reemplazar'), default=True),
+                dry_run=parse_flag(flags.get('simular'), default=False),
+            )
+        except DjangoValidationError as e:
+            return Response({'success': False, 'errores': e.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, **summary})
+
 #views de compatibilidad para el frontend existente
 class RadioStationView(generics.RetrieveUpdateAPIView):
     """vista de compatibilidad para estación de radio"""
@@ -80,6 +177,11 @@ class RadioStationView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_object(self):
+        #lecturas desde el estado cacheado; las actualizaciones trabajan sobre la fila de la base de datos
+        if self.request.method in SAFE_METHODS:
+            station = get_station()
+            if station is not None and station.id == 1:
+                return station
         station, created = EstacionRadio.objects.get_or_create(
             id=1,
             defaults={
@@ -102,6 +204,49 @@ class ProgramDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProgramLegacySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+class ListenerHeartbeatView(APIView):
+    """latido del reproductor mientras suena la radio. sin login: cuenta oyentes anonimos por sesion del navegador.
+    el session_id lo emite el servidor (firmado): sin uno valido se responde uno nuevo y el latido no cuenta.
+    con sesion iniciada el oyente cuenta una vez aunque escuche desde varios dispositivos.
+    con estado 'fin' cierra la sesion de escucha (pausa)"""
+    permission_classes = [AllowAny]
+    #solo token: sin sesion de django no hace falta csrf
+    authentication_classes = [TokenAuthentication]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'radio_heartbeat'
+
+    def post(self, request):
+        token = str(request.data.get('session_id') or '')
+        session_id = session_from_token(token)
+
+        tracker = get_listener_tracker()
+        recorder = get_session_recorder()
+        now = tracker.clock()
+        if request.data.get('estado') == 'fin':
+            if session_id is not None:
+                recorder.end(session_id, now)
+            return Response({'listeners_count': tracker.count(now)})
+
+        if session_id is None:
+            return Response({
+                'session_id': issue_session_token(),
+                'listeners_count': tracker.count(now),
+                'heartbeat': tracker.heartbeat,
+            })
+
+        if request.user.is_authenticated:
+            usuario_id = request.user.id
+            listener_key = f'usuario-{usuario_id}'
+        else:
+            usuario_id = None
+            listener_key = session_id
+        recorder.touch(session_id, usuario_id, now)
+        return Response({
+            'session_id': token,
+            'listeners_count': tracker.beat(listener_key),
+            'heartbeat': tracker.heartbeat,
+        })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_current_song(request):
@@ -0,0 +1,98 @@
+"""microbenchmark de difusion del chat: cpu por mensaje segun el tamaño de la sala.
+compara serializar el frame en cada consumer destinatario (antes) con serializarlo una vez en el emisor (ahora).
+uso desde backend/:
+    python -m benchmarks.broadcast --sizes 10 100 1000 2000 --json broadcast.json"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'radio_oriente.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.chat.consumers import ChatConsumer  # noqa: E402
+from apps.chat.frames import chat_message_event  # noqa: E402
+
+PAYLOAD = {
+    'message': 'hola a todos, que buena la musica de esta tarde en radio oriente',
+    'user_name': 'oyente_123',
+    'username': 'oyente_123',
+    'timestamp': '2026-10-18T21:15:03.123456+00:00',
+}
+
+
+class SinkConsumer(ChatConsumer):
+    """consumer sin websocket: send solo cuenta bytes"""
+
+    def __init__(self):
+        self.sent_bytes = 0
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.sent_bytes += len(text_data or bytes_data or '')
+
+
+async def legacy_chat_message(consumer, event):
+    #handler anterior: cada destinatario vuelve a serializar el evento
+    await consumer.send(text_data=json.dumps({
+        'message': event['message'],
+        'user_name': event['user_name'],
+        'username': event['username'],
+        'timestamp': event['timestamp'],
+    }))
+
+
+async def fan_out_legacy(consumers):
+    event = {'type': 'chat_message', **PAYLOAD}
+    for consumer in consumers:
+        await legacy_chat_message(consumer, event)
+
+
+async def fan_out_once(consumers):
+    event = chat_message_event(PAYLOAD)
+    for consumer in consumers:
+        await consumer.chat_message(event)
+
+
+def measure(fan_out, consumers, messages):
+    loop = asyncio.new_event_loop()
+    try:
+        started = time.process_time()
+        for _ in range(messages):
+            loop.run_until_complete(fan_out(consumers))
+        return (time.process_time() - started) / messages
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 2000])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--json', help='guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        consumers = [SinkConsumer() for _ in range(size)]
+        legacy = measure(fan_out_legacy, consumers, args.messages)
+        once = measure(fan_out_once, consumers, args.messages)
+        rows.append({
+            'room_size': size,
+            'legacy_cpu_us_per_message': round(legacy * 1e6, 1),
+            'serialize_once_cpu_us_per_message': round(once * 1e6, 1),
+            'speedup': round(legacy / once, 2) if once else None,
+        })
+
+    results = {'benchmark': 'broadcast', 'messages': args.messages, 'results': rows}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
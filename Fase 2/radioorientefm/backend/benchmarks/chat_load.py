@@ -0,0 +1,163 @@
+"""prueba de carga en proceso de ChatConsumer con WebsocketCommunicator (sin red ni daphne).
+simula n oyentes que se conectan, reciben mensajes difundidos a la sala y se desconectan.
+los mensajes se inyectan en el grupo con el mismo evento que emite receive() despues de moderar,
+asi el resultado mide conexion y fan-out y no el filtro de contenido.
+uso desde backend/:
+    python -m benchmarks.chat_load --clients 2000 --messages 200 --json chat_load.json"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'radio_oriente.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from channels.layers import get_channel_layer  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from apps.chat.frames import chat_message_event  # noqa: E402
+from apps.chat.routing import websocket_urlpatterns  # noqa: E402
+
+from .common import latency_summary, rss_bytes, write_results  # noqa: E402
+
+BENCH_PREFIX = 'bench:'
+
+
+class Listener:
+    def __init__(self, application, room, index):
+        self.communicator = WebsocketCommunicator(application, f'/ws/chat/{room}/')
+        self.communicator.scope['user'] = AnonymousUser()
+        self.index = index
+        self.received = 0
+        self.task = None
+
+    async def connect(self):
+        started = time.perf_counter()
+        connected, _ = await self.communicator.connect(timeout=30)
+        if not connected:
+            raise RuntimeError(f'Conexion {self.index} rechazada')
+        return time.perf_counter() - started
+
+    async def listen(self, sent_at, latencies):
+        while True:
+            frame = json.loads(await self.communicator.receive_from(timeout=3600))
+            message = frame.get('message', '')
+            if frame.get('type') is None and message.startswith(BENCH_PREFIX):
+                latencies.append(time.perf_counter() - sent_at[int(message[len(BENCH_PREFIX):])])
+                self.received += 1
+
+
+async def connect_all(listeners, concurrency):
+    times = []
+    for start in range(0, len(listeners), concurrency):
+        batch = listeners[start:start + concurrency]
+        times.extend(await asyncio.gather(*(listener.connect() for listener in batch)))
+    return times
+
+
+async def run(args):
+    application = URLRouter(websocket_urlpatterns)
+    group = f'chat_{args.room}'
+    channel_layer = get_channel_layer()
+
+    gc.collect()
+    rss_before = rss_bytes()
+
+    listeners = [Listener(application, args.room, i) for i in range(args.clients)]
+    join_started = time.perf_counter()
+    connect_times = await connect_all(listeners, args.concurrency)
+    join_elapsed = time.perf_counter() - join_started
+
+    gc.collect()
+    rss_connected = rss_bytes()
+
+    sent_at = {}
+    latencies = []
+    for listener in listeners:
+        listener.task = asyncio.ensure_future(listener.listen(sent_at, latencies))
+    #drenar presencia e historial iniciales
+    await asyncio.sleep(0.5)
+
+    expected = args.clients * args.messages
+    chat_started = time.perf_counter()
+    for seq in range(args.messages):
+        sent_at[seq] = time.perf_counter()
+        await channel_layer.group_send(group, chat_message_event({
+            'message': f'{BENCH_PREFIX}{seq}',
+            'user_name': 'bench',
+            'username': 'bench',
+            'timestamp': '2026-01-01T00:00:00+00:00',
+        }))
+        if args.interval_ms:
+            await asyncio.sleep(args.interval_ms / 1000)
+
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    chat_elapsed = time.perf_counter() - chat_started
+
+    for listener in listeners:
+        listener.task.cancel()
+
+    leave_started = time.perf_counter()
+    for start in range(0, len(listeners), args.concurrency):
+        await asyncio.gather(*(l.communicator.disconnect() for l in listeners[start:start + args.concurrency]))
+    leave_elapsed = time.perf_counter() - leave_started
+
+    memory_per_connection = None
+    if rss_before is not None and rss_connected is not None and args.clients:
+        memory_per_connection = round((rss_connected - rss_before) / args.clients)
+
+    return {
+        'connect': {
+            **latency_summary(connect_times),
+            'connections_per_s': round(args.clients / join_elapsed, 1) if join_elapsed else None,
+        },
+        'fan_out': {
+            **latency_summary(latencies),
+            'expected_deliveries': expected,
+            'lost_deliveries': expected - len(latencies),
+            'messages_per_s': round(len(latencies) / chat_elapsed, 1) if chat_elapsed else None,
+        },
+        'leave': {'total_s': round(leave_elapsed, 3)},
+        'memory': {
+            'rss_before_bytes': rss_before,
+            'rss_connected_bytes': rss_connected,
+            'bytes_per_connection': memory_per_connection,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--interval-ms', type=float, default=20, help='pausa entre mensajes difundidos (0 = rafaga)')
+    parser.add_argument('--concurrency', type=int, default=200, help='conexiones simultaneas por tanda')
+    parser.add_argument('--room', default='bench-load')
+    parser.add_argument('--drain-timeout', type=float, default=30)
+    parser.add_argument('--json', help='guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {
+        'clients': args.clients,
+        'messages': args.messages,
+        'interval_ms': args.interval_ms,
+        'concurrency': args.concurrency,
+        'channel_layer': settings.CHANNEL_LAYERS['default']['BACKEND'],
+        'send_queue_max': settings.CHAT_SEND_QUEUE_MAX,
+    }
+    write_results('chat_load', config, results, args.json)
+
+
+if __name__ == '__main__':
+    main()
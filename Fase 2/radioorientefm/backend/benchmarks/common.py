@@ -0,0 +1,89 @@
+"""utilidades compartidas de los benchmarks de carga: percentiles, memoria del proceso y salida json comparable"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(samples, pct):
+    """percentil por rango mas cercano (sin numpy)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples_s):
+    """resumen en milisegundos"""
+    if not samples_s:
+        return {'count': 0, 'p50_ms': None, 'p99_ms': None, 'max_ms': None, 'mean_ms': None}
+    return {
+        'count': len(samples_s),
+        'p50_ms': round(percentile(samples_s, 50) * 1000, 3),
+        'p99_ms': round(percentile(samples_s, 99) * 1000, 3),
+        'max_ms': round(max(samples_s) * 1000, 3),
+        'mean_ms': round(sum(samples_s) / len(samples_s) * 1000, 3),
+    }
+
+
+def rss_bytes(pid=None):
+    """memoria residente actual de un proceso (linux /proc). None si no esta disponible"""
+    path = f'/proc/{pid or "self"}/status'
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """contexto para comparar resultados entre versiones"""
+    info = {
+        'git_revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    try:
+        import django
+        import channels
+        info['django'] = django.get_version()
+        info['channels'] = channels.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def write_results(name, config, results, path=None):
+    """imprimir y opcionalmente guardar el resultado con un formato estable"""
+    document = {
+        'benchmark': name,
+        'config': config,
+        'environment': environment(),
+        'results': results,
+    }
+    text = json.dumps(document, indent=2)
+    print(text)
+    if path:
+        Path(path).write_text(text)
+    return document
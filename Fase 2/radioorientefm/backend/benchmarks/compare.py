@@ -0,0 +1,46 @@
+"""comparar dos resultados json del mismo benchmark (por ejemplo entre versiones).
+uso: python -m benchmarks.compare base.json nuevo.json"""
+import argparse
+import json
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        items = {}
+        for key, child in value.items():
+            items.update(flatten(child, f'{prefix}{key}.'))
+        return items
+    if isinstance(value, list):
+        items = {}
+        for index, child in enumerate(value):
+            items.update(flatten(child, f'{prefix}{index}.'))
+        return items
+    return {prefix[:-1]: value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base.get('benchmark') != new.get('benchmark'):
+        raise SystemExit(f"Benchmarks distintos: {base.get('benchmark')} vs {new.get('benchmark')}")
+
+    base_values = flatten(base['results'])
+    new_values = flatten(new['results'])
+    print(f"{'metrica':50} {'base':>14} {'nuevo':>14} {'cambio':>9}")
+    for key in sorted(base_values.keys() | new_values.keys()):
+        old, current = base_values.get(key), new_values.get(key)
+        if not isinstance(old, (int, float)) or not isinstance(current, (int, float)) or isinstance(old, bool):
+            continue
+        change = f'{(current - old) / old * 100:+.1f}%' if old else ''
+        print(f'{key:50} {old:>14} {current:>14} {change:>9}')
+
+
+if __name__ == '__main__':
+    main()
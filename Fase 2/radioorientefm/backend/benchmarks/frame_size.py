@@ -0,0 +1,67 @@
+"""comparacion de bytes por frame del chat: json (por defecto) vs subprotocolo msgpack compacto.
+uso desde backend/:
+    python -m benchmarks.frame_size --history 50 --json frame_size.json"""
+import argparse
+import json
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'radio_oriente.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.chat.frames import encode, encode_compact, msgpack_available  # noqa: E402
+
+MESSAGE = {
+    'id': 184233,
+    'message': 'saludos desde puente alto!! que buen tema',
+    'user_name': 'oyente_123',
+    'username': 'oyente_123',
+    'timestamp': '2026-10-18T21:15:03.123456+00:00',
+}
+
+
+def frames(history_size):
+    history = [dict(MESSAGE, id=MESSAGE['id'] + i) for i in range(history_size)]
+    return {
+        'chat_message': MESSAGE,
+        'presence': {'type': 'presence', 'users_online': 1342},
+        'history': {'type': 'history', 'messages': history, 'truncated': False},
+        'error': {
+            'type': 'error',
+            'message': 'Contenido no permitido: palabra prohibida detectada',
+            'infraction_type': 'palabra_prohibida',
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, default=50, help='mensajes en el frame de historial')
+    parser.add_argument('--json', help='guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    if not msgpack_available():
+        raise SystemExit('msgpack no está instalado (pip install msgpack)')
+
+    rows = []
+    for name, payload in frames(args.history).items():
+        json_bytes = len(encode(payload).encode('utf-8'))
+        msgpack_bytes = len(encode_compact(payload))
+        rows.append({
+            'frame': name,
+            'json_bytes': json_bytes,
+            'msgpack_bytes': msgpack_bytes,
+            'saved_pct': round(100 * (1 - msgpack_bytes / json_bytes), 1),
+        })
+
+    results = {'benchmark': 'frame_size', 'history_size': args.history, 'results': rows}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""benchmark de arranque del backend.
+mide en procesos nuevos: tiempo de importar la aplicacion asgi, tiempo hasta que el filtro ml queda listo
+y tiempo de un comando de manage.py (check). uso desde backend/:
+    python -m benchmarks.startup --runs 5 --json startup.json"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+ASGI_PROBE = '''
+import json, os, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'radio_oriente.settings')
+from radio_oriente import asgi
+imported = time.perf_counter()
+from apps.chat.utils import content_analyzer
+#versiones anteriores cargaban el modelo al importar y no tienen is_warm
+while not getattr(content_analyzer, 'is_warm', True):
+    time.sleep(0.01)
+warm = time.perf_counter()
+print(json.dumps({'asgi_import_s': imported - started, 'moderation_warm_s': warm - started}))
+'''
+
+
+def run_asgi_probe():
+    output = subprocess.run(
+        [sys.executable, '-c', ASGI_PROBE], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_manage_check():
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, 'manage.py', 'check'], cwd=BACKEND_DIR,
+        capture_output=True, check=True
+    )
+    return time.perf_counter() - started
+
+
+def summarize(samples):
+    return {
+        'median_s': round(statistics.median(samples), 4),
+        'min_s': round(min(samples), 4),
+        'max_s': round(max(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help='guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    asgi_import, moderation_warm, manage_check = [], [], []
+    for _ in range(args.runs):
+        probe = run_asgi_probe()
+        asgi_import.append(probe['asgi_import_s'])
+        moderation_warm.append(probe['moderation_warm_s'])
+        manage_check.append(run_manage_check())
+
+    results = {
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'asgi_import': summarize(asgi_import),
+        'moderation_warm': summarize(moderation_warm),
+        'manage_check': summarize(manage_check),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""driver multi-cliente contra un daphne local: miles de websockets reales que se conectan, chatean y se van.
+usa autobahn (dependencia de daphne) para no agregar paquetes. ejemplo:
+    daphne -p 8001 radio_oriente.asgi:application &
+    python -m benchmarks.ws_driver --url ws://127.0.0.1:8001/ws/chat/bench/ --clients 2000 \\
+        --cookie "sessionid=<sesion de un usuario de prueba>" --messages 100 --server-pid $! --json ws_driver.json
+sin --cookie los clientes son anonimos: se mide conexion, memoria y presencia, pero no se puede chatear.
+el filtro de spam limita mensajes por usuario: repetir --cookie con varias cuentas o desactivarlo para la prueba"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from urllib.parse import urlparse
+
+from autobahn.asyncio.websocket import WebSocketClientFactory, WebSocketClientProtocol
+
+from .common import latency_summary, rss_bytes, write_results
+
+BENCH_PREFIX = 'bench:'
+
+
+class BenchProtocol(WebSocketClientProtocol):
+    #asignados por el driver en la factory
+    driver = None
+
+    def onOpen(self):
+        self.driver.opened(self)
+
+    def onMessage(self, payload, isBinary):
+        if isBinary:
+            return
+        self.driver.frame(json.loads(payload))
+
+    def onClose(self, wasClean, code, reason):
+        self.driver.closed(self, code)
+
+
+class Driver:
+    def __init__(self, args):
+        self.args = args
+        self.url = urlparse(args.url)
+        self.connect_times = []
+        self.latencies = []
+        self.sent_at = {}
+        self.errors = 0
+        self.frames_received = 0
+        self.rejected = 0
+        self.pending_opens = {}
+        self.closed_count = 0
+
+    def opened(self, protocol):
+        future = self.pending_opens.pop(protocol, None)
+        if future is not None and not future.done():
+            future.set_result(time.perf_counter())
+
+    def frame(self, data):
+        self.frames_received += 1
+        message = data.get('message', '')
+        if data.get('type') is None and message.startswith(BENCH_PREFIX):
+            seq = int(message[len(BENCH_PREFIX):])
+            sent = self.sent_at.get(seq)
+            if sent is not None:
+                self.latencies.append(time.perf_counter() - sent)
+        elif data.get('type') == 'error':
+            self.rejected += 1
+
+    def closed(self, protocol, code):
+        self.closed_count += 1
+        future = self.pending_opens.pop(protocol, None)
+        if future is not None and not future.done():
+            future.set_exception(ConnectionError(f'cerrado antes de abrir ({code})'))
+
+    def factory(self, cookie=None):
+        headers = {'Cookie': cookie} if cookie else None
+        factory = WebSocketClientFactory(self.args.url, headers=headers, origin=self.args.origin)
+        factory.protocol = type('DriverProtocol', (BenchProtocol,), {'driver': self})
+        return factory
+
+    async def open_one(self, factory):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        port = self.url.port or (443 if self.url.scheme == 'wss' else 80)
+        _, protocol = await loop.create_connection(factory, self.url.hostname, port, ssl=self.url.scheme == 'wss')
+        future = loop.create_future()
+        self.pending_opens[protocol] = future
+        if protocol.state == protocol.STATE_OPEN:
+            self.opened(protocol)
+        opened_at = await asyncio.wait_for(future, timeout=self.args.connect_timeout)
+        self.connect_times.append(opened_at - started)
+        return protocol
+
+    async def open_all(self, factories):
+        protocols = []
+        for start in range(0, len(factories), self.args.concurrency):
+            batch = factories[start:start + self.args.concurrency]
+            results = await asyncio.gather(*(self.open_one(f) for f in batch), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    self.errors += 1
+                else:
+                    protocols.append(result)
+        return protocols
+
+    async def run(self):
+        args = self.args
+        rss_before = rss_bytes(args.server_pid) if args.server_pid else None
+
+        cookies = args.cookie or []
+        senders = itertools.cycle(cookies) if cookies else None
+        factories = [self.factory(next(senders) if senders and i < len(cookies) else None)
+                     for i in range(args.clients)]
+
+        join_started = time.perf_counter()
+        protocols = await self.open_all(factories)
+        join_elapsed = time.perf_counter() - join_started
+        await asyncio.sleep(1)
+        rss_connected = rss_bytes(args.server_pid) if args.server_pid else None
+
+        chat_elapsed = 0.0
+        sender_protocols = protocols[:len(cookies)]
+        if sender_protocols:
+            chat_started = time.perf_counter()
+            for seq in range(args.messages):
+                protocol = sender_protocols[seq % len(sender_protocols)]
+                self.sent_at[seq] = time.perf_counter()
+                protocol.sendMessage(json.dumps({'message': f'{BENCH_PREFIX}{seq}'}).encode())
+                if args.interval_ms:
+                    await asyncio.sleep(args.interval_ms / 1000)
+            expected = len(protocols) * args.messages
+            deadline = time.perf_counter() + args.drain_timeout
+            while len(self.latencies) < expected and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+            chat_elapsed = time.perf_counter() - chat_started
+
+        leave_started = time.perf_counter()
+        for protocol in protocols:
+            protocol.sendClose()
+        deadline = time.perf_counter() + args.drain_timeout
+        while self.closed_count < len(protocols) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        leave_elapsed = time.perf_counter() - leave_started
+
+        memory_per_connection = None
+        if rss_before is not None and rss_connected is not None and protocols:
+            memory_per_connection = round((rss_connected - rss_before) / len(protocols))
+
+        expected = len(protocols) * args.messages if sender_protocols else 0
+        return {
+            'connect': {
+                **latency_summary(self.connect_times),
+                'failed': self.errors,
+                'connections_per_s': round(len(protocols) / join_elapsed, 1) if join_elapsed else None,
+            },
+            'fan_out': {
+                **latency_summary(self.latencies),
+                'expected_deliveries': expected,
+                'lost_deliveries': expected - len(self.latencies),
+                'rejected_by_moderation': self.rejected,
+                'messages_per_s': round(len(self.latencies) / chat_elapsed, 1) if chat_elapsed else None,
+            },
+            'leave': {'total_s': round(leave_elapsed, 3)},
+            'memory': {
+                'server_rss_before_bytes': rss_before,
+                'server_rss_connected_bytes': rss_connected,
+                'bytes_per_connection': memory_per_connection,
+            },
+            'frames_received': self.frames_received,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='ws://127.0.0.1:8001/ws/chat/bench/')
+    parser.add_argument('--origin', default='http://127.0.0.1:8001')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--interval-ms', type=float, default=50)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--cookie', action='append', help='cookie de sesion de un usuario emisor (se puede repetir)')
+    parser.add_argument('--server-pid', type=int, help='pid de daphne para medir memoria por conexion')
+    parser.add_argument('--connect-timeout', type=float, default=30)
+    parser.add_argument('--drain-timeout', type=float, default=30)
+    parser.add_argument('--json', help='guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    results = asyncio.run(Driver(args).run())
+    config = {
+        'url': args.url,
+        'clients': args.clients,
+        'senders': len(args.cookie or []),
+        'messages': args.messages,
+        'interval_ms': args.interval_ms,
+        'concurrency': args.concurrency,
+    }
+    write_results('ws_driver', config, results, args.json)
+
+
+if __name__ == '__main__':
+    main()
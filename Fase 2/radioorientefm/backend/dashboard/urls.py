@@ -97,6 +97,7 @@ urlpatterns = [
     #chat moderation
     path('chat/delete-message/<int:message_id>/', views.delete_message, name='delete_message'),
     path('chat/clear/', views.clear_chat_messages, name='clear_chat_messages'),
+    path('chat/metrics/', views.chat_metrics, name='dashboard_chat_metrics'),
 
     #notificaciones
     path('notificaciones/', views.dashboard_notificaciones, name='dashboard_notificaciones'),
@@ -34,7 +34,15 @@ from apps.users.models import User
 from apps.articulos.models import Articulo, Categoria
 from .models import Notificacion
 from apps.radio.models import Programa, EstacionRadio, HorarioPrograma, GeneroMusical, ReproduccionRadio, Conductor, ProgramaConductor
+from apps.radio.state import get_station
+from apps.radio.rollups import listening_summary
+from apps.radio.bulk_schedule import program_slot_rows, set_program_schedule
+from django.core.exceptions import ValidationError
 from apps.chat.models import ChatMessage, InfraccionUsuario
+from apps.chat.history import get_room_history
+from apps.chat.purge import get_room_purge
+from apps.chat.stats import day_totals as chat_day_totals, top_users as chat_top_users, forget_messages as chat_forget_messages
+from apps.chat.metrics import get_chat_metrics
 from apps.contact.models import Contacto, Suscripcion, Estado, TipoAsunto
 from apps.emergente.models import BandaEmergente, BandaLink, Integrante, BandaIntegrante
 from apps.ubicacion.models import Pais, Ciudad, Comuna
@@ -253,10 +261,7 @@ def dashboard_radio(request):
     programs_page_number = request.GET.get('programs_page', 1)
     programs = programs_paginator.get_page(programs_page_number)
 
-    try:
-        station = EstacionRadio.objects.first()
-    except EstacionRadio.DoesNotExist:
-        station = None
+    station = get_station()
 
     articulos_recientes = Articulo.objects.filter(
         publicado=True
@@ -286,50 +291,23 @@ def dashboard_radio(request):
 def dashboard_chat(request):
     """moderación del chat"""
     messages = ChatMessage.objects.all().order_by('-fecha_envio')[:50]
-    now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
 
-    messages_today = ChatMessage.objects.filter(
-        fecha_envio__gte=today_start,
-        fecha_envio__lte=today_end
-    ).count()
-
-    active_users_today = ChatMessage.objects.filter(
-        fecha_envio__gte=today_start,
-        fecha_envio__lte=today_end
-    ).values('usuario_id').distinct().count()
+    #contadores incrementales: no se recorre la tabla mensajes en cada carga
+    messages_today, active_users_today = chat_day_totals()
 
-    from django.db.models import Count
-    top_users = ChatMessage.objects.values('usuario_id', 'usuario_nombre').annotate(
-        message_count=Count('id')
-    ).order_by('-message_count')[:10]
-
-    User = get_user_model()
-    top_users_list = []
-    for user_data in top_users:
-        if user_data['usuario_id']:
-            try:
-                user_obj = User.objects.get(id=user_data['usuario_id'])
-                top_users_list.append({
-                    'id': user_data['usuario_id'],
-                    'username': user_data['usuario_nombre'],
-                    'message_count': user_data['message_count'],
-                    'is_blocked': user_obj.chat_bloqueado
-                })
-            except User.DoesNotExist:
-                top_users_list.append({
-                    'id': user_data['usuario_id'],
-                    'username': user_data['usuario_nombre'],
-                    'message_count': user_data['message_count'],
-                    'is_blocked': False
-                })
+    top_users_list = [{
+        'id': stats.usuario_id,
+        'username': stats.usuario_nombre or stats.usuario.username,
+        'message_count': stats.mensajes,
+        'is_blocked': stats.usuario.chat_bloqueado
+    } for stats in chat_top_users(10)]
 
     context = {
         'messages': messages,
         'messages_today': messages_today,
         'active_users_today': active_users_today,
         'top_users': top_users_list,
+        'chat_metrics': get_chat_metrics().snapshot(),
     }
 
     return render(request, 'dashboard/chat.html', context)
@@ -347,15 +325,15 @@ def clear_chat_messages(request):
         data = json.loads(request.body) if request.body else {}
         sala = data.get('sala', 'radio-oriente')
 
-        print(f"Eliminando mensajes de sala: {sala}")
-        deleted_count = ChatMessage.objects.filter(sala=sala).delete()[0]
-        print(f"Mensajes eliminados: {deleted_count}")
+        #borrado por lotes en segundo plano: la respuesta no espera a que termine
+        job = get_room_purge().start(sala)
 
         return JsonResponse({
             'success': True,
-            'deleted_count': deleted_count,
-            'message': f'Se eliminaron {deleted_count} mensajes correctamente'
-        })
+            'job': job,
+            'status_url': f"/api/chat/messages/clear/{job['job_id']}/",
+            'message': 'Limpieza del chat iniciada, los mensajes se eliminarán en segundo plano'
+        }, status=202)
     except Exception as e:
         print(f"ERROR: {str(e)}")
         traceback.print_exc()
@@ -624,6 +602,8 @@ def api_dashboard_stats(request):
     total_publicidad = Publicidad.objects.filter(activo=True).count()
     total_bandas_emergentes = filter_by_date(BandaEmergente.objects.all(), 'fecha_envio').count()
     total_reproducciones_unicas = filter_by_date(ReproduccionRadio.objects.all(), 'fecha_reproduccion').count()
+    #escucha: desde los rollups horarios (no se recorren las sesiones)
+    listening = listening_summary(start_date)
 
     #kpis - período anterior para comparación
     users_change = 0
@@ -715,6 +695,8 @@ def api_dashboard_stats(request):
             'total_publicidad': total_publicidad,
             'total_bandas_emergentes': total_bandas_emergentes,
             'total_reproducciones_unicas': total_reproducciones_unicas,
+            'minutos_escucha': listening['minutos_escucha'],
+            'oyentes_unicos': listening['oyentes_unicos'],
             'users_change': round(users_change, 1),
             'messages_change': round(messages_change, 1),
         },
@@ -985,58 +967,32 @@ def dashboard_chat(request):
     #obtener todos los mensajes
     messages = ChatMessage.objects.all().order_by('-fecha_envio')[:50]
 
-    #estadisticas del dia
-    now = timezone.now()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-
-    messages_today = ChatMessage.objects.filter(
-        fecha_envio__gte=today_start,
-        fecha_envio__lte=today_end
-    ).count()
+    #estadisticas del dia (contadores incrementales: no se recorre la tabla mensajes en cada carga)
+    messages_today, active_users_today = chat_day_totals()
 
-    #usuarios unicos activos hoy (basado en mensajes)
-    active_users_today = ChatMessage.objects.filter(
-        fecha_envio__gte=today_start,
-        fecha_envio__lte=today_end
-    ).values('usuario_id').distinct().count()
-
-    #obtener usuarios mas activos (top 10 con mas mensajes)
-    from django.db.models import Count
-    top_users = ChatMessage.objects.values('usuario_id', 'usuario_nombre').annotate(
-        message_count=Count('id')
-    ).order_by('-message_count')[:10]
-
-    #obtener informacion de bloqueo para cada usuario
-    User = get_user_model()
-    top_users_list = []
-    for user_data in top_users:
-        if user_data['usuario_id']:
-            try:
-                user_obj = User.objects.get(id=user_data['usuario_id'])
-                top_users_list.append({
-                    'id': user_data['usuario_id'],
-                    'username': user_data['usuario_nombre'],
-                    'message_count': user_data['message_count'],
-                    'is_blocked': user_obj.chat_bloqueado
-                })
-            except User.DoesNotExist:
-                top_users_list.append({
-                    'id': user_data['usuario_id'],
-                    'username': user_data['usuario_nombre'],
-                    'message_count': user_data['message_count'],
-                    'is_blocked': False
-                })
+    top_users_list = [{
+        'id': stats.usuario_id,
+        'username': stats.usuario_nombre or stats.usuario.username,
+        'message_count': stats.mensajes,
+        'is_blocked': stats.usuario.chat_bloqueado
+    } for stats in chat_top_users(10)]
 
     context = {
         'messages': messages,
         'messages_today': messages_today,
         'active_users_today': active_users_today,
         'top_users': top_users_list,
+        'chat_metrics': get_chat_metrics().snapshot(),
     }
 
     return render(request, 'dashboard/chat.html', context)
 
+@login_required
+@user_passes_test(is_staff_user)
+def chat_metrics(request):
+    """metricas en vivo del chat para el panel de moderación"""
+    return JsonResponse(get_chat_metrics().snapshot())
+
 @require_http_methods(["POST"])
 @login_required
 @user_passes_test(is_staff_user)
@@ -1050,15 +1006,15 @@ def clear_chat_messages(request):
         data = json.loads(request.body) if request.body else {}
         sala = data.get('sala', 'radio-oriente')
 
-        print(f"Eliminando mensajes de sala: {sala}")
-        deleted_count = ChatMessage.objects.filter(sala=sala).delete()[0]
-        print(f"Mensajes eliminados: {deleted_count}")
+        #borrado por lotes en segundo plano: la respuesta no espera a que termine
+        job = get_room_purge().start(sala)
 
         return JsonResponse({
             'success': True,
-            'deleted_count': deleted_count,
-            'message': f'Se eliminaron {deleted_count} mensajes correctamente'
-        })
+            'job': job,
+            'status_url': f"/api/chat/messages/clear/{job['job_id']}/",
+            'message': 'Limpieza del chat iniciada, los mensajes se eliminarán en segundo plano'
+        }, status=202)
     except Exception as e:
         print(f"ERROR: {str(e)}")
         traceback.print_exc()
@@ -1331,6 +1287,8 @@ def api_dashboard_stats(request):
     total_publicidad = Publicidad.objects.filter(activo=True).count()
     total_bandas_emergentes = filter_by_date(BandaEmergente.objects.all(), 'fecha_envio').count()
     total_reproducciones_unicas = filter_by_date(ReproduccionRadio.objects.all(), 'fecha_reproduccion').count()
+    #escucha: desde los rollups horarios (no se recorren las sesiones)
+    listening = listening_summary(start_date)
 
     #kpis - período anterior para comparación
     users_change = 0
@@ -1422,6 +1380,8 @@ def api_dashboard_stats(request):
             'total_publicidad': total_publicidad,
             'total_bandas_emergentes': total_bandas_emergentes,
             'total_reproducciones_unicas': total_reproducciones_unicas,
+            'minutos_escucha': listening['minutos_escucha'],
+            'oyentes_unicos': listening['oyentes_unicos'],
             'users_change': round(users_change, 1),
             'messages_change': round(messages_change, 1),
         },
@@ -2593,22 +2553,16 @@ def create_program(request):
             messages.error(request, 'Formato de hora inválido. Use HH:MM.')
             return redirect('dashboard_radio')
         
+        program = Programa(nombre=nombre, descripcion=descripcion, activo=activo)
         try:
-            program = Programa.objects.create(
-                nombre=nombre,
-                descripcion=descripcion,
-                activo=activo
-            )
-            
-            if dias and hora_inicio_str and hora_fin_str:
-                for dia in dias:
-                    HorarioPrograma.objects.create(
-                        programa=program,
-                        dia_semana=int(dia),
-                        hora_inicio=hora_inicio_obj,
-                        hora_fin=hora_fin_obj,
-                        activo=True
-                    )
+            #mismas reglas que la importacion masiva (dia valido, inicio distinto de fin)
+            horarios = program_slot_rows(program, dias, hora_inicio_obj, hora_fin_obj) if dias else []
+            with transaction.atomic():
+                program.save()
+                
+                if horarios:
+                    #una insercion masiva y un solo aviso; un solape revierte tambien la creacion del programa
+                    set_program_schedule(program, horarios)
             
             if conductor_ids:
                 for conductor_id in conductor_ids:
@@ -2619,6 +2573,9 @@ def create_program(request):
                         pass 
             
             messages.success(request, f'Programa "{nombre}" creado exitosamente.')
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, f'Horario inválido: {error}')
         except Exception as e:
             print("--- ERROR EN CREATE_PROGRAM ---")
             traceback.print_exc()
@@ -2649,31 +2606,29 @@ def edit_program(request, program_id):
         except (ValueError, TypeError):
             messages.error(request, 'Formato de hora inválido. Use HH:MM.')
             return redirect('dashboard_radio')
-            
+        
         try:
-            program.save()
-            
-            if dias and hora_inicio_str and hora_fin_str:
-                program.horarios.all().delete()
-                for dia in dias:
-                    HorarioPrograma.objects.create(
-                        programa=program,
-                        dia_semana=int(dia),
-                        hora_inicio=hora_inicio_obj,
-                        hora_fin=hora_fin_obj,
-                        activo=True
-                    )
-            
-            program.conductores.all().delete()
-            if conductor_ids:
-                for conductor_id in conductor_ids:
-                    try:
-                        conductor = Conductor.objects.get(id=conductor_id)
-                        ProgramaConductor.objects.create(programa=program, conductor=conductor)
-                    except Conductor.DoesNotExist:
-                        pass
+            horarios = program_slot_rows(program, dias, hora_inicio_obj, hora_fin_obj) if dias else []
+            with transaction.atomic():
+                program.save()
+                
+                if dias:
+                    #solapes validados con la programacion bloqueada; solo se escribe la diferencia
+                    set_program_schedule(program, horarios)
+                
+                program.conductores.all().delete()
+                if conductor_ids:
+                    for conductor_id in conductor_ids:
+                        try:
+                            conductor = Conductor.objects.get(id=conductor_id)
+                            ProgramaConductor.objects.create(programa=program, conductor=conductor)
+                        except Conductor.DoesNotExist:
+                            pass
             
             messages.success(request, f'Programa "{program.nombre}" actualizado exitosamente')
+        except ValidationError as e:
+            for error in e.messages:
+                messages.error(request, f'Horario inválido: {error}')
         except Exception as e:
             print("--- ERROR EN EDIT_PROGRAM ---")
             traceback.print_exc()
@@ -2844,6 +2799,8 @@ def delete_message(request, message_id):
         try:
             message = get_object_or_404(ChatMessage, id=message_id)
             message.delete()
+            get_room_history().invalidate(message.sala)
+            chat_forget_messages([message])
             messages.success(request, 'Mensaje eliminado exitosamente')
         except Exception as e:
             messages.error(request, f'Error al eliminar el mensaje: {str(e)}')
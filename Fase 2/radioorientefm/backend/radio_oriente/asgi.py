@@ -9,8 +9,19 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'radio_oriente.settings')
 #validar condiciones
 django.setup()
 
+from django.conf import settings
 from apps.chat import routing
 
+#precargar detoxify en segundo plano: el servidor acepta conexiones mientras el modelo carga
+if settings.CHAT_MODERATION_WARMUP:
+    from apps.chat.utils import content_analyzer
+    content_analyzer.warm_up(background=True)
+
+#estadisticas de escucha: guardar minutos, cerrar sesiones y consolidar horas fuera de los heartbeats
+if settings.RADIO_MAINTENANCE_THREAD:
+    from apps.radio.maintenance import start_maintenance_thread
+    start_maintenance_thread()
+
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
@@ -151,6 +151,10 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'apps.common.pagination.StandardResultsSetPagination',
     'PAGE_SIZE': 20,
+    #el heartbeat del reproductor es anonimo: tope de peticiones por ip (o por usuario con sesion)
+    'DEFAULT_THROTTLE_RATES': {
+        'radio_heartbeat': config('RADIO_HEARTBEAT_THROTTLE', default='60/min'),
+    },
 }
 
 #cors settings
@@ -200,12 +204,120 @@ SESSION_COOKIE_SAMESITE = 'Lax'
 CSRF_COOKIE_SECURE = False
 SESSION_COOKIE_SECURE = False
 
-#channels configuration (desarrollo: capa en memoria)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+#channels configuration (desarrollo: capa en memoria, produccion: redis compartido entre procesos)
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+#cache compartida entre procesos (versiones de invalidacion del chat). sin redis: memoria local del proceso
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+#presencia del chat: segundos sin heartbeat antes de expirar una conexion
+CHAT_PRESENCE_TTL = config('CHAT_PRESENCE_TTL', default=60, cast=int)
+CHAT_PRESENCE_HEARTBEAT = config('CHAT_PRESENCE_HEARTBEAT', default=20, cast=int)
+#como maximo un update de users_online por sala en este intervalo (segundos)
+CHAT_PRESENCE_BROADCAST_INTERVAL = config('CHAT_PRESENCE_BROADCAST_INTERVAL', default=2.0, cast=float)
+
+#historial en memoria por sala enviado al conectar por websocket (ultimos n mensajes)
+CHAT_HISTORY_SIZE = config('CHAT_HISTORY_SIZE', default=200, cast=int)
+#salas con historial en memoria por proceso; se descarta la usada hace mas tiempo (lru)
+CHAT_HISTORY_MAX_ROOMS = config('CHAT_HISTORY_MAX_ROOMS', default=50, cast=int)
+
+#metricas por sala: salas con etiqueta propia siempre (separadas por coma) y tope de otras salas etiquetadas;
+#las demas se suman en room="other"
+CHAT_METRICS_ROOMS_STR = config('CHAT_METRICS_ROOMS', default='radio-oriente,general')
+CHAT_METRICS_ROOMS = [room.strip() for room in CHAT_METRICS_ROOMS_STR.split(',') if room.strip()]
+CHAT_METRICS_MAX_ROOMS = config('CHAT_METRICS_MAX_ROOMS', default=20, cast=int)
+
+#cola de salida por conexion: frames pendientes maximos y politica con clientes lentos (drop_oldest o disconnect)
+CHAT_SEND_QUEUE_MAX = config('CHAT_SEND_QUEUE_MAX', default=100, cast=int)
+CHAT_SEND_OVERFLOW = config('CHAT_SEND_OVERFLOW', default='drop_oldest')
+#con disconnect: frames descartados antes de cerrar la conexion
+CHAT_SEND_DISCONNECT_AFTER = config('CHAT_SEND_DISCONNECT_AFTER', default=50, cast=int)
+
+#estado de la radio consultado por los oyentes: segundos que el navegador puede reutilizar la respuesta
+RADIO_STATUS_MAX_AGE = config('RADIO_STATUS_MAX_AGE', default=5, cast=int)
+
+#segundos entre heartbeats del reproductor para contar oyentes concurrentes
+RADIO_LISTENER_HEARTBEAT = config('RADIO_LISTENER_HEARTBEAT', default=15, cast=int)
+
+#mantenimiento de estadisticas de escucha (minutos de oyentes, cierre de sesiones, rollups horarios) fuera de los
+#heartbeats: hilo de fondo en cada proceso asgi, segundos entre pasadas y expiracion del lock (se renueva en cada paso).
+#sin asgi (wsgi) desactivar el hilo y programar el comando run_radio_maintenance
+RADIO_MAINTENANCE_THREAD = config('RADIO_MAINTENANCE_THREAD', default=True, cast=bool)
+RADIO_MAINTENANCE_INTERVAL = config('RADIO_MAINTENANCE_INTERVAL', default=60, cast=int)
+RADIO_MAINTENANCE_LOCK_TTL = config('RADIO_MAINTENANCE_LOCK_TTL', default=120, cast=int)
+
+#limpieza del chat en segundo plano: mensajes por lote y pausa entre lotes (ms)
+CHAT_PURGE_BATCH_SIZE = config('CHAT_PURGE_BATCH_SIZE', default=1000, cast=int)
+CHAT_PURGE_PAUSE_MS = config('CHAT_PURGE_PAUSE_MS', default=50, cast=int)
+
+#feed sse de solo lectura: segundos entre comentarios keepalive
+CHAT_SSE_KEEPALIVE = config('CHAT_SSE_KEEPALIVE', default=15, cast=int)
+#el feed es anonimo: tope de salas (una tarea suscrita por sala) y de clientes por proceso; al superarlo responde 503
+CHAT_SSE_MAX_ROOMS = config('CHAT_SSE_MAX_ROOMS', default=20, cast=int)
+CHAT_SSE_MAX_CLIENTS = config('CHAT_SSE_MAX_CLIENTS', default=2000, cast=int)
+
+#persistencia write-behind de mensajes: bulk_create cada n ms o m mensajes
+CHAT_WRITE_FLUSH_MS = config('CHAT_WRITE_FLUSH_MS', default=250, cast=int)
+CHAT_WRITE_BATCH_SIZE = config('CHAT_WRITE_BATCH_SIZE', default=100, cast=int)
+CHAT_WRITE_QUEUE_MAX = config('CHAT_WRITE_QUEUE_MAX', default=5000, cast=int)
+#politica cuando la cola se llena: block, drop_oldest o drop_newest
+CHAT_WRITE_OVERFLOW = config('CHAT_WRITE_OVERFLOW', default='block')
+#reintentos de un lote que falla al guardar (espera exponencial desde n ms) antes de darlo por perdido
+CHAT_WRITE_RETRIES = config('CHAT_WRITE_RETRIES', default=3, cast=int)
+CHAT_WRITE_RETRY_BACKOFF_MS = config('CHAT_WRITE_RETRY_BACKOFF_MS', default=100, cast=int)
+
+#moderacion del chat por websocket en executor acotado: presupuesto por mensaje y politica si se excede.
+#block (por defecto) rechaza el mensaje y el usuario debe reintentar; allow lo publica sin veredicto (la infraccion se
+#registra igual al terminar el analisis tardio, pero el texto ya se difundio; se cuenta en
+#chat_moderation_fallback_allowed_total). los envios por rest siempre esperan el veredicto
+CHAT_MODERATION_WORKERS = config('CHAT_MODERATION_WORKERS', default=2, cast=int)
+CHAT_MODERATION_MAX_PENDING = config('CHAT_MODERATION_MAX_PENDING', default=64, cast=int)
+CHAT_MODERATION_BUDGET_MS = config('CHAT_MODERATION_BUDGET_MS', default=300, cast=int)
+CHAT_MODERATION_FALLBACK = config('CHAT_MODERATION_FALLBACK', default='block')
+#precarga de detoxify al iniciar asgi y politica mientras no esta listo: open (permitir) o closed (rechazar)
+CHAT_MODERATION_WARMUP = config('CHAT_MODERATION_WARMUP', default=True, cast=bool)
+CHAT_MODERATION_COLD_POLICY = config('CHAT_MODERATION_COLD_POLICY', default='open')
+
+#worker de inferencia compartido (manage.py run_toxicity_worker). vacio = cargar detoxify en cada proceso
+CHAT_INFERENCE_SOCKET = config('CHAT_INFERENCE_SOCKET', default='')
+CHAT_INFERENCE_TIMEOUT_MS = config('CHAT_INFERENCE_TIMEOUT_MS', default=2000, cast=int)
+#fallos seguidos del worker antes de marcar el analisis ml con error (readiness en 503)
+CHAT_INFERENCE_MAX_FAILURES = config('CHAT_INFERENCE_MAX_FAILURES', default=3, cast=int)
+CHAT_INFERENCE_MAX_BATCH = config('CHAT_INFERENCE_MAX_BATCH', default=32, cast=int)
+CHAT_INFERENCE_MAX_WAIT_MS = config('CHAT_INFERENCE_MAX_WAIT_MS', default=10, cast=int)
+
+#modelo detoxify y cache de scores para mensajes repetidos (bytes y segundos)
+CHAT_TOXICITY_MODEL = config('CHAT_TOXICITY_MODEL', default='multilingual')
+CHAT_TOXICITY_CACHE_BYTES = config('CHAT_TOXICITY_CACHE_BYTES', default=4 * 1024 * 1024, cast=int)
+CHAT_TOXICITY_CACHE_TTL = config('CHAT_TOXICITY_CACHE_TTL', default=3600, cast=int)
 
 #custom user model
 AUTH_USER_MODEL = 'users.User'
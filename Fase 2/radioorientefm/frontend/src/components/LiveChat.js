@@ -18,6 +18,40 @@ const LiveChat = () => {
   const messagesEndRef = useRef(null);
   const pollingIntervalRef = useRef(null);
   const wsRef = useRef(null);
+  const userRef = useRef(user);
+  userRef.current = user;
+  //ultima secuencia recibida: cursor since_seq al reconectar el websocket
+  const lastSeqRef = useRef(null);
+
+  //el websocket abierto entrega historial y mensajes nuevos; la api rest queda como respaldo
+  const isSocketOpen = () => wsRef.current?.readyState === WebSocket.OPEN;
+
+  const rememberSeq = (list) => {
+    list.forEach(msg => {
+      if (msg.seq != null && (lastSeqRef.current == null || msg.seq > lastSeqRef.current)) {
+        lastSeqRef.current = msg.seq;
+      }
+    });
+  };
+
+  //agregar mensajes sin duplicar los que ya estan (por seq, o por id si no hay seq)
+  const mergeMessages = (prev, incoming) => {
+    const seqs = new Set(prev.filter(msg => msg.seq != null).map(msg => msg.seq));
+    const ids = new Set(prev.map(msg => msg.id));
+    const fresh = incoming.filter(msg => (msg.seq != null ? !seqs.has(msg.seq) : !ids.has(msg.id)));
+    return fresh.length ? [...prev, ...fresh] : prev;
+  };
+
+  //los frames en vivo traen seq pero no id (el id se asigna al guardar en segundo plano)
+  const toChatMessage = (msg) => ({
+    id: msg.id ?? `seq-${msg.seq}`,
+    seq: msg.seq ?? null,
+    message: msg.message,
+    user_name: msg.user_name,
+    username: msg.username,
+    timestamp: msg.timestamp,
+    isOwn: msg.username === userRef.current?.username
+  });
 
   // --- LOGICA DE NOMBRE SEGURO (PRIVACIDAD) ---
   // 1. Calculamos tu nombre para mostrar en mensajes nuevos
@@ -91,7 +125,7 @@ const LiveChat = () => {
   //cargar mensajes cuando se abre el chat
   useEffect(() => {
     if (isOpen && isAuthenticated) {
-      loadMessages();
+      if (!isSocketOpen()) loadMessages();
       startPolling();
     } else {
       stopPolling();
@@ -104,24 +138,35 @@ const LiveChat = () => {
     scrollToBottom();
   }, [messages]);
 
-  //websocket para presencia en tiempo real (usuarios activos en la sala)
+  //websocket para presencia y mensajes en tiempo real; al cortarse reconecta pidiendo solo lo nuevo (since_seq)
   useEffect(() => {
-    try {
-      const rawBase = (import.meta.env.VITE_WS_URL || import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000').toString();
-      const toWs = (u) => {
-        let s = u.trim();
-        if (!/^https?:\/\//i.test(s) && !/^wss?:\/\//i.test(s)) s = 'http://' + s;
-        s = s.replace(/^http:/i, 'ws:').replace(/^https:/i, 'wss:');
-        return s.replace(/\/$/, '') + '/ws/chat/radio-oriente/';
-      };
-      const wsUrl = toWs(rawBase);
-      
-      console.log('Conectando WebSocket a:', wsUrl);
-      const ws = new WebSocket(wsUrl);
-      wsRef.current = ws;
+    let ws = null;
+    let reconnectTimer = null;
+    let retries = 0;
+    let closedByUnmount = false;
+
+    const rawBase = (import.meta.env.VITE_WS_URL || import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000').toString();
+    const toWs = (u) => {
+      let s = u.trim();
+      if (!/^https?:\/\//i.test(s) && !/^wss?:\/\//i.test(s)) s = 'http://' + s;
+      s = s.replace(/^http:/i, 'ws:').replace(/^https:/i, 'wss:');
+      return s.replace(/\/$/, '') + '/ws/chat/radio-oriente/';
+    };
+
+    const connect = () => {
+      try {
+        const wsUrl = toWs(rawBase) + (lastSeqRef.current != null ? `?since_seq=${lastSeqRef.current}` : '');
+        console.log('Conectando WebSocket a:', wsUrl);
+        ws = new WebSocket(wsUrl);
+        wsRef.current = ws;
+      } catch (error) {
+        console.error('Error creando WebSocket:', error);
+        return;
+      }
 
       ws.onopen = () => {
         console.log('WebSocket conectado');
+        retries = 0;
       };
 
       ws.onmessage = (event) => {
@@ -132,6 +177,29 @@ const LiveChat = () => {
           if (data && data.type === 'presence' && typeof data.users_online === 'number') {
             console.log('Actualizando usuarios conectados:', data.users_online);
             setOnlineUsers(data.users_online);
+          } else if (data && data.type === 'cleared') {
+            //la sala fue limpiada por un administrador
+            setMessages([]);
+          } else if (data && data.type === 'history' && Array.isArray(data.messages)) {
+            //backlog al conectar: completo la primera vez, solo lo posterior a since_seq al reconectar
+            const incoming = data.messages.map(toChatMessage);
+            const incremental = lastSeqRef.current != null && !data.truncated;
+            rememberSeq(incoming);
+            setMessages(prev => (incremental ? mergeMessages(prev, incoming) : incoming));
+          } else if (data && !data.type && data.message) {
+            //mensaje nuevo: reemplaza el mensaje optimista propio si existe
+            const incoming = toChatMessage(data);
+            rememberSeq([incoming]);
+            setMessages(prev => {
+              if (mergeMessages(prev, [incoming]) === prev) return prev;
+              const tempIndex = incoming.isOwn
+                ? prev.findIndex(msg => String(msg.id).startsWith('temp-') && msg.message === incoming.message)
+                : -1;
+              if (tempIndex === -1) return [...prev, incoming];
+              const next = [...prev];
+              next[tempIndex] = incoming;
+              return next;
+            });
           }
         } catch (error) {
           console.error('Error parseando mensaje WS:', error);
@@ -141,21 +209,28 @@ const LiveChat = () => {
       ws.onclose = (event) => {
         console.log('WebSocket cerrado:', event.code, event.reason);
         wsRef.current = null;
+        if (closedByUnmount) return;
+        //espera creciente hasta 30 s; mientras tanto la api rest cubre los mensajes
+        const delay = Math.min(30000, 1000 * 2 ** retries);
+        retries += 1;
+        reconnectTimer = setTimeout(connect, delay);
       };
 
       ws.onerror = (error) => {
         console.error('Error WebSocket:', error);
       };
+    };
 
-      return () => {
-        try { 
-          console.log('Cerrando WebSocket');
-          ws.close(); 
-        } catch (_) {}
-      };
-    } catch (error) {
-      console.error('Error creando WebSocket:', error);
-    }
+    connect();
+
+    return () => {
+      closedByUnmount = true;
+      clearTimeout(reconnectTimer);
+      try { 
+        console.log('Cerrando WebSocket');
+        ws?.close(); 
+      } catch (_) {}
+    };
   }, []);
 
   const loadMessages = async () => {
@@ -167,12 +242,14 @@ const LiveChat = () => {
 
       const loadedMessages = messagesData.map(msg => ({
         id: msg.id,
+        seq: msg.secuencia ?? null,
         message: msg.contenido,
         user_name: msg.usuario_nombre,
         username: msg.usuario_nombre,
         timestamp: msg.fecha_envio,
         isOwn: msg.usuario_nombre === user?.username
       }));
+      rememberSeq(loadedMessages);
       setMessages(loadedMessages.reverse());
     } catch (error) {
       console.error('Error loading messages:', error);
@@ -180,9 +257,9 @@ const LiveChat = () => {
   };
 
   const startPolling = () => {
-    //actualizar mensajes cada 3 segundos
+    //actualizar mensajes cada 3 segundos solo si el websocket no esta disponible
     pollingIntervalRef.current = setInterval(() => {
-      loadMessages();
+      if (!isSocketOpen()) loadMessages();
     }, 3000);
   };
 
@@ -224,8 +301,8 @@ const LiveChat = () => {
       await api.post('/api/chat/messages/radio-oriente/', {
         contenido: messageContent
       });
-      //recargar mensajes para obtener el mensaje real del servidor
-      await loadMessages();
+      //recargar mensajes para obtener el mensaje real del servidor (por websocket llega solo)
+      if (!isSocketOpen()) await loadMessages();
     } catch (error) {
       console.error('Error sending message:', error);
       console.error('Error response:', error.response?.data);
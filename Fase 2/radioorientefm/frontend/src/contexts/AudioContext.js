@@ -46,6 +46,60 @@ export const AudioProvider = ({ children }) => {
     }
   }, [volume]);
 
+  //heartbeat mientras suena: el backend cuenta oyentes concurrentes por sesion del navegador.
+  //el id de sesion lo entrega el servidor en la primera respuesta y se guarda para esta pestaña
+  useEffect(() => {
+    if (!isPlaying) return;
+
+    let sessionId = sessionStorage.getItem("radioListenerSession");
+
+    const base = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+    let intervalMs = 15000;
+    let timer = null;
+    let stopped = false;
+
+    //con sesion iniciada el oyente cuenta una vez aunque escuche desde varios dispositivos
+    const token = localStorage.getItem("token");
+    const headers = { "Content-Type": "application/json" };
+    if (token) headers.Authorization = `Token ${token}`;
+
+    const beat = async () => {
+      try {
+        const res = await fetch(`${base}/api/radio/escuchando/`, {
+          method: "POST",
+          headers,
+          body: JSON.stringify({ session_id: sessionId }),
+        });
+        const data = await res.json();
+        if (data.heartbeat) intervalMs = data.heartbeat * 1000;
+        if (data.session_id && data.session_id !== sessionId) {
+          //sesion nueva (o la guardada ya no es valida): el latido cuenta desde el siguiente envio
+          sessionId = data.session_id;
+          sessionStorage.setItem("radioListenerSession", sessionId);
+          if (!stopped) timer = setTimeout(beat, 0);
+          return;
+        }
+      } catch (err) {
+        console.error("Error enviando heartbeat del reproductor:", err);
+      }
+      if (!stopped) timer = setTimeout(beat, intervalMs);
+    };
+
+    beat();
+    return () => {
+      stopped = true;
+      clearTimeout(timer);
+      if (!sessionId) return;
+      //cerrar la sesion de escucha al pausar (keepalive: tambien al cerrar la pestaña)
+      fetch(`${base}/api/radio/escuchando/`, {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ session_id: sessionId, estado: "fin" }),
+        keepalive: true,
+      }).catch(() => {});
+    };
+  }, [isPlaying]);
+
   const togglePlay = () => {
     if (!streamUrl) return;
     if (isPlaying) {